@@ -0,0 +1,229 @@
+# benchmarks/bench_sync.py
+"""
+Measure end-to-end sync throughput against generated CPAP card trees.
+
+Each tree is served by the card emulator over local HTTP and synced three times: a
+cold sync into an empty directory, a no-op sync right after it, and a sync after one
+new night was added to the card. The api runner syncs through ezShare.run with Wi-Fi
+handling disabled, which calls run_after_connection_delay; the cli runner goes through
+cli.run_sync with --no-wifi. Results are printed and stored as JSON so that runs can
+be compared over time.
+
+Usage:
+    python benchmarks/bench_sync.py [--nights 1 30 365 1826] [--runners api cli]
+                                    [--size-scale 0.1] [--latency 0] [--output FILE]
+                                    [--compare PREVIOUS.json]
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import cli  # noqa: E402
+from card_emulator import CardEmulator  # noqa: E402
+from ezshare import ezShare  # noqa: E402
+
+# Default location of result files; ignored by git so that runs do not leave untracked files.
+RESULTS_DIR = pathlib.Path(__file__).resolve().parent / 'results'
+# One night, one month, one year and five years of DATALOG folders.
+DEFAULT_NIGHTS = (1, 30, 365, 1826)
+# Files an AirSense 10 writes per night with their typical size in bytes before scaling.
+NIGHT_FILES = (
+    ('BRP.edf', 2 * 1024 * 1024),
+    ('PLD.edf', 512 * 1024),
+    ('SA2.edf', 256 * 1024),
+    ('EVE.edf', 8 * 1024),
+    ('CSL.edf', 4 * 1024),
+)
+ROOT_FILES = (
+    ('STR.edf', 512 * 1024),
+    ('Identification.tgt', 1024),
+    ('Identification.crc', 4),
+    ('Identification.json', 2048),
+    ('SETTINGS/CurrentSettings.json', 4096),
+)
+SCENARIOS = ('cold', 'noop', 'new_night')
+_PATTERN = bytes(range(256)) * 4096
+
+
+def write_file(path, size, mtime):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open('wb') as f:
+        remaining = size
+        while remaining > 0:
+            chunk = _PATTERN[:min(remaining, len(_PATTERN))]
+            f.write(chunk)
+            remaining -= len(chunk)
+    os.utime(path, (mtime, mtime))
+
+
+def night_timestamp(night):
+    return datetime.datetime.combine(night, datetime.time(8, 0)).timestamp()
+
+
+def add_night(root, night, size_scale):
+    folder = root / 'DATALOG' / night.strftime('%Y%m%d')
+    stamp = night.strftime('%Y%m%d') + '_230000'
+    for suffix, size in NIGHT_FILES:
+        write_file(folder / f'{stamp}_{suffix}', max(1, int(size * size_scale)), night_timestamp(night))
+    os.utime(folder, (night_timestamp(night), night_timestamp(night)))
+    # The card rewrites the summary files every night.
+    for name, size in ROOT_FILES:
+        write_file(root / name, max(1, int(size * size_scale)), night_timestamp(night))
+
+
+def generate_card(root, nights, size_scale, last_night):
+    """Write a card tree with the given number of nights ending at last_night."""
+    for offset in range(nights - 1, -1, -1):
+        add_night(root, last_night - datetime.timedelta(days=offset), size_scale)
+
+
+def run_api(url, target, args):
+    syncer = ezShare()
+    syncer.set_params(
+        path=target, url=url, start_time=None, show_progress=False, verbose=False, overwrite=False,
+        keep_old=False, ssid=None, psk=None, ignore=[], retries=3, connection_delay=0, debug=False,
+        listing_workers=args.listing_workers, download_jobs=args.jobs, incremental=args.incremental,
+        use_wifi=False,
+    )
+    return bool(syncer.run())
+
+
+def run_cli(url, target, args):
+    argv = [
+        '--config', str(target.parent / 'config.json'), '--path', str(target), '--url', url, '--no-wifi',
+        '--connection-delay', '0', '--listing-workers', str(args.listing_workers), '--jobs', str(args.jobs),
+        '--quiet',
+    ]
+    if args.incremental:
+        argv.append('--incremental')
+    return cli.run_cli(argv) == 0
+
+
+RUNNERS = {'api': run_api, 'cli': run_cli}
+
+
+def measure(emulator, runner, target, args):
+    before = dict(emulator.stats)
+    started = time.perf_counter()
+    if not RUNNERS[runner](emulator.url, target, args):
+        raise RuntimeError(f'{runner} sync failed')
+    wall = time.perf_counter() - started
+    stats = {key: emulator.stats[key] - before[key] for key in emulator.stats}
+    return {
+        'wall_s': round(wall, 4),
+        'files': stats['downloads'],
+        'bytes': stats['file_bytes'],
+        'files_per_s': round(stats['downloads'] / wall, 2),
+        'mb_per_s': round(stats['file_bytes'] / wall / 1e6, 3),
+        'listing_requests': stats['listings'],
+    }
+
+
+def bench_tree(nights, runner, args):
+    results = []
+    last_night = datetime.date(2026, 6, 18)
+    with tempfile.TemporaryDirectory() as directory:
+        card = pathlib.Path(directory) / 'card'
+        target = pathlib.Path(directory) / 'sync' / 'SD_card'
+        generate_card(card, nights, args.size_scale, last_night)
+        with CardEmulator(card, latency=args.latency, bandwidth=args.bandwidth) as emulator:
+            for scenario in SCENARIOS:
+                if scenario == 'new_night':
+                    add_night(card, last_night + datetime.timedelta(days=1), args.size_scale)
+                result = measure(emulator, runner, target, args)
+                result.update({'nights': nights, 'runner': runner, 'scenario': scenario})
+                results.append(result)
+                print(format_row(result), flush=True)
+    return results
+
+
+def format_row(result):
+    return (
+        f'{result["nights"]:>7}{result["runner"]:>8}{result["scenario"]:>11}{result["wall_s"]:>10.3f}'
+        f'{result["files"]:>8}{result["files_per_s"]:>10.1f}{result["mb_per_s"]:>9.2f}{result["listing_requests"]:>10}'
+    )
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+            cwd=pathlib.Path(__file__).resolve().parent,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def compare(results, previous_path):
+    with open(previous_path, 'r', encoding='utf-8') as f:
+        previous = {
+            (result['nights'], result['runner'], result['scenario']): result for result in json.load(f)['results']
+        }
+    print(f'\nCompared with {previous_path}:')
+    print(f'{"nights":>7}{"runner":>8}{"scenario":>11}{"wall s":>10}{"before":>10}{"change":>9}')
+    for result in results:
+        old = previous.get((result['nights'], result['runner'], result['scenario']))
+        if old is None or not old['wall_s']:
+            continue
+        change = (result['wall_s'] - old['wall_s']) / old['wall_s'] * 100
+        print(
+            f'{result["nights"]:>7}{result["runner"]:>8}{result["scenario"]:>11}'
+            f'{result["wall_s"]:>10.3f}{old["wall_s"]:>10.3f}{change:>+8.1f}%'
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nights', type=int, nargs='+', default=list(DEFAULT_NIGHTS),
+                        help='Sizes of the generated card trees in DATALOG nights.')
+    parser.add_argument('--runners', nargs='+', choices=sorted(RUNNERS), default=['api', 'cli'],
+                        help='Entry points to sync through.')
+    parser.add_argument('--size-scale', type=float, default=0.1,
+                        help='Factor applied to typical CPAP file sizes; 1.0 writes about 2.8 MB per night.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds the emulator adds to every response.')
+    parser.add_argument('--bandwidth', type=float, help='Emulator bandwidth cap in bytes per second.')
+    parser.add_argument('--listing-workers', type=int, default=cli.DEFAULT_LISTING_WORKERS)
+    parser.add_argument('--jobs', type=int, default=cli.DEFAULT_DOWNLOAD_JOBS)
+    parser.add_argument('--incremental', action='store_true', help='Sync with --incremental.')
+    parser.add_argument('--output', type=pathlib.Path, help='JSON file for the results. Defaults to benchmarks/results/.')
+    parser.add_argument('--compare', type=pathlib.Path, help='Earlier results file to compare wall times with.')
+    args = parser.parse_args(argv)
+
+    created_at = datetime.datetime.now().astimezone()
+    print(f'{"nights":>7}{"runner":>8}{"scenario":>11}{"wall s":>10}{"files":>8}{"files/s":>10}{"MB/s":>9}{"listings":>10}')
+    results = []
+    for nights in args.nights:
+        for runner in args.runners:
+            results.extend(bench_tree(nights, runner, args))
+
+    output = args.output or RESULTS_DIR / f'bench_sync-{created_at.strftime("%Y%m%d-%H%M%S")}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    settings = {key: str(value) if isinstance(value, pathlib.Path) else value for key, value in vars(args).items()}
+    with output.open('w', encoding='utf-8') as f:
+        json.dump({
+            'created_at': created_at.isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': settings,
+            'results': results,
+        }, f, indent=2)
+    print(f'Results saved to {output}')
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
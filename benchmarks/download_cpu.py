@@ -0,0 +1,102 @@
+# benchmarks/download_cpu.py
+"""
+Measure the CPU time download_file spends per megabyte against a local HTTP server.
+
+The download runs in the main thread and the server in a background thread, so the
+CPU time reported with time.thread_time covers only the client side. The 1 KiB
+iter_content loop that download_file used before adaptive chunking is measured as
+a baseline.
+
+Usage:
+    python benchmarks/download_cpu.py [--size-mb 10] [--repeat 5]
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import requests  # noqa: E402
+
+import file_ops  # noqa: E402
+
+
+def start_server(payload):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    return httpd
+
+
+def download_with_iter_content(session, url, target):
+    response = session.get(url, stream=True, timeout=5)
+    response.raise_for_status()
+    with target.open('wb') as f:
+        for data in response.iter_content(1024):
+            f.write(data)
+
+
+def download_with_file_ops(session, url, target):
+    ezshare = SimpleNamespace(retries=1, connection_delay=0, _is_running=True, session=session)
+    if not file_ops.download_file(ezshare, url, target):
+        raise RuntimeError('download_file failed')
+
+
+def measure(download, session, url, directory, repeat):
+    cpu_times = []
+    wall_times = []
+    for attempt in range(repeat):
+        target = pathlib.Path(directory) / f'BRP-{attempt}.EDF'
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        download(session, url, target)
+        cpu_times.append(time.thread_time() - cpu_start)
+        wall_times.append(time.perf_counter() - wall_start)
+        target.unlink()
+    return min(cpu_times), min(wall_times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-mb', type=int, default=10, help='Size of the served file in MiB.')
+    parser.add_argument('--repeat', type=int, default=5, help='Downloads per variant; the fastest is reported.')
+    args = parser.parse_args(argv)
+
+    payload = bytes(range(256)) * (4096 * args.size_mb)
+    httpd = start_server(payload)
+    url = f'http://127.0.0.1:{httpd.server_port}/download?file=BRP.EDF'
+    session = requests.Session()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            print(f'{"variant":<24}{"CPU ms/MB":>12}{"wall ms/MB":>12}')
+            for name, download in (
+                ('iter_content(1024)', download_with_iter_content),
+                ('download_file', download_with_file_ops),
+            ):
+                cpu, wall = measure(download, session, url, directory, args.repeat)
+                print(f'{name:<24}{cpu * 1000 / args.size_mb:>12.2f}{wall * 1000 / args.size_mb:>12.2f}')
+    finally:
+        session.close()
+        httpd.shutdown()
+        httpd.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+# benchmarks/micro_hot_paths.py
+"""
+Micro-benchmarks for the functions a sync runs once per file or per listing line.
+
+- parse_listing_content and parse_directory_listing on card listings with 10 to
+  10,000 entries; the BeautifulSoup document is built outside the timed call.
+- should_download against local trees, answered from the sync manifest, from disk
+  with verify_local, and from disk without a manifest.
+- ezShare.update_progress and update_status through EzShareWorker into its queue.
+
+Each benchmark reports the best time per operation over several repeats, and the
+peak and retained memory of one operation measured with tracemalloc.
+
+Usage:
+    python benchmarks/micro_hot_paths.py [--entries 10 100 1000 10000] [--files 1000 10000]
+                                         [--min-time 0.2] [--repeat 5] [--output FILE]
+"""
+import argparse
+import datetime
+import json
+import os
+import pathlib
+import platform
+import queue
+import sys
+import tempfile
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import bs4  # noqa: E402
+
+import file_ops  # noqa: E402
+from ezshare import ezShare  # noqa: E402
+from sync_manifest import SyncManifest  # noqa: E402
+from worker import EzShareWorker  # noqa: E402
+
+DEFAULT_ENTRIES = (10, 100, 1000, 10000)
+DEFAULT_FILES = (1000, 10000)
+IGNORE = ['.', '..', 'back to photo']
+FILE_TS = datetime.datetime(2026, 6, 18, 8, 0).timestamp()
+
+
+def make_listing(entries):
+    """Build a card listing with one directory per ten entries and files for the rest."""
+    lines = [
+        '   2026- 6-18   10: 0: 0         &lt;DIR&gt;   <a href="dir?dir=A:%5CDATALOG">.</a>',
+        '   2026- 6-18   10: 0: 0         &lt;DIR&gt;   <a href="dir?dir=A:">..</a>',
+    ]
+    for index in range(entries):
+        if index % 10 == 0:
+            name = f'2026{index:04d}'
+            lines.append(
+                f'   2026- 6-18   10: 0: 0         &lt;DIR&gt;   <a href="dir?dir=A:%5CDATALOG%5C{name}">{name}</a>'
+            )
+        else:
+            name = f'20260618_230000_{index:05d}_BRP.edf'
+            lines.append(
+                f'   2026- 6-18   23: 0: 0          {index % 4096}KB   '
+                f'<a href="download?file=DATALOG%5C{name}">{name}</a>'
+            )
+    return ('<html><head><title>ez Share</title></head><body><pre>\n' + '\n'.join(lines) + '\n</pre></body></html>').encode()
+
+
+def measure(func, ops, min_time, repeat):
+    """
+    Time func and measure its memory use.
+
+    :param func: Callable performing ops operations per call.
+    :param ops: Number of operations one call performs.
+    :return: Tuple of (ns per operation, peak bytes per operation, retained bytes per operation).
+    """
+    func()
+    number = 1
+    while True:
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter_ns() - started
+        if elapsed >= min_time * 1e9:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(repeat - 1):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter_ns() - started)
+
+    tracemalloc.start()
+    try:
+        func()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best / number / ops, peak / ops, retained / ops
+
+
+def bench_listing(entries, args):
+    ezshare = SimpleNamespace(ignore=IGNORE, remote_tzinfo=None)
+    content = make_listing(entries)
+    soup = bs4.BeautifulSoup(content.decode(), 'html.parser')
+    yield 'parse_listing_content', entries, measure(
+        lambda: file_ops.parse_listing_content(ezshare, content, 'utf-8'), entries, args.min_time, args.repeat,
+    )
+    yield 'parse_directory_listing', entries, measure(
+        lambda: file_ops.parse_directory_listing(ezshare, soup), entries, args.min_time, args.repeat,
+    )
+
+
+def bench_should_download(files, args):
+    with tempfile.TemporaryDirectory() as directory:
+        root = pathlib.Path(directory)
+        paths = []
+        for index in range(files):
+            path = root / 'DATALOG' / f'2026{index // 10:04d}' / f'{index:05d}_BRP.edf'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'edf')
+            os.utime(path, (FILE_TS, FILE_TS))
+            paths.append(path)
+
+        manifest = SyncManifest(root).open()
+        try:
+            for path in paths:
+                manifest.record(path, FILE_TS, 3, FILE_TS)
+            variants = (
+                ('should_download[manifest]', manifest, False),
+                ('should_download[verify_local]', manifest, True),
+                ('should_download[no manifest]', None, False),
+            )
+            for name, variant_manifest, verify_local in variants:
+                ezshare = SimpleNamespace(
+                    overwrite=False, keep_old=False, manifest=variant_manifest, verify_local=verify_local,
+                    time_tolerance=file_ops.DEFAULT_TIME_TOLERANCE,
+                )
+
+                def check_all():
+                    for path in paths:
+                        file_ops.should_download(ezshare, path, FILE_TS, 3)
+
+                yield name, files, measure(check_all, files, args.min_time, args.repeat)
+        finally:
+            manifest.close()
+
+
+def bench_progress(args):
+    events = queue.Queue()
+    syncer = ezShare()
+    worker = EzShareWorker(syncer, events, app=object())
+    syncer.set_progress_callback(worker.update_progress)
+    syncer.set_status_callback(worker.update_status)
+    calls = 1000
+
+    def report():
+        for index in range(calls):
+            syncer.update_progress(index / 10)
+        events.queue.clear()
+
+    yield 'update_progress', 1, measure(report, calls, args.min_time, args.repeat)
+
+    def status():
+        for _ in range(calls):
+            syncer.update_status('Downloading DATALOG/20260618/20260618_230000_BRP.edf')
+        events.queue.clear()
+
+    yield 'update_status', 1, measure(status, calls, args.min_time, args.repeat)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entries', type=int, nargs='+', default=list(DEFAULT_ENTRIES),
+                        help='Listing sizes for the parser benchmarks.')
+    parser.add_argument('--files', type=int, nargs='+', default=list(DEFAULT_FILES),
+                        help='Local tree sizes for the should_download benchmarks.')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timed repeat.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed repeats; the fastest is reported.')
+    parser.add_argument('--output', type=pathlib.Path, help='Optional JSON file for the results.')
+    args = parser.parse_args(argv)
+
+    benchmarks = [bench_listing(entries, args) for entries in args.entries]
+    benchmarks += [bench_should_download(files, args) for files in args.files]
+    benchmarks.append(bench_progress(args))
+
+    results = []
+    print(f'{"benchmark":<32}{"size":>8}{"ns/op":>12}{"peak B/op":>12}{"kept B/op":>12}')
+    for benchmark in benchmarks:
+        for name, size, (ns, peak, retained) in benchmark:
+            print(f'{name:<32}{size:>8}{ns:>12.0f}{peak:>12.0f}{retained:>12.0f}', flush=True)
+            results.append({
+                'benchmark': name, 'size': size, 'ns_per_op': round(ns, 1),
+                'peak_bytes_per_op': round(peak, 1), 'retained_bytes_per_op': round(retained, 1),
+            })
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with args.output.open('w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.datetime.now().astimezone().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, f, indent=2)
+        print(f'Results saved to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
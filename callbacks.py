@@ -7,7 +7,6 @@ import logging
 import queue
 import time
 import sys
-from worker import EzShareWorker
 from utils import (
     ensure_and_check_disk_access,
     get_button_state,
@@ -128,19 +127,12 @@ class Callbacks:
                     break
 
             # Create and start the worker thread
-            logging.info("Starting new worker thread.")
-            self.app.worker = EzShareWorker(
-                self.app.ezshare,
-                self.app.worker_queue,
-                name="EzShareWorkerThread",
-                app=self.app,  # Pass the app instance here
-            )
-            self.app.worker.start()
+            self.app.start_worker()
 
             # Only set is_running to True after the worker starts
             self.app.is_running = True
             logging.info("EzShareWorkerThread started successfully.")
-            self.app.main_window.after(100, self.app.process_worker_queue)
+            self.app.watch_worker_queue()
 
         except Exception as e:
             logging.error(f"Error occurred during start process: {str(e)}")
@@ -321,7 +313,10 @@ class Callbacks:
         if not get_button_state(self.app, 'import_oscar_checkbox')['enabled']:
             logging.warning("Import CPAP data with OSCAR aborted: Button is not enabled.")
             return
+        self.run_oscar_import()
 
+    def run_oscar_import(self):
+        """Start the OSCAR import without the button check, for imports offered while a sync is running."""
         logging.info("Importing CPAP data with OSCAR.")
         
         import platform
@@ -0,0 +1,343 @@
+# card_emulator.py
+"""
+Local stand-in for the web server of an ez Share Wi-Fi SD card.
+
+Serves a directory tree with the card's dir?dir=A: listing pages and download?file=
+endpoints, so syncs can be tested and benchmarked without the card in range. Latency,
+a bandwidth cap, a connection limit, random server errors and broken-off transfers can
+be configured to mimic a card at the edge of its range.
+
+Usage:
+    python card_emulator.py ROOT [--port 8080] [--latency 0.05] [--bandwidth 500000]
+
+Then sync from it without touching Wi-Fi:
+    python main.py sync --no-wifi --url http://127.0.0.1:8080/dir?dir=A: --path /tmp/card-copy
+"""
+import argparse
+import datetime
+import html
+import logging
+import pathlib
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Drive letter the card uses for the root of the SD card.
+CARD_ROOT = 'A:'
+# Bytes written per send; the bandwidth cap is applied per chunk.
+SEND_CHUNK_SIZE = 16 * 1024
+
+
+class CardEmulator:
+    """
+    HTTP server emulating an ez Share card for a local directory.
+
+    :param root: Directory served as the root of the SD card.
+    :param host: Address to listen on.
+    :param port: TCP port to listen on, 0 to pick a free one.
+    :param latency: Seconds added before every response.
+    :param bandwidth: Bytes per second shared by all transfers, or None for no cap.
+    :param max_connections: Requests served at the same time; requests above the limit
+                            get their connection closed without a response, or None for no limit.
+    :param failure_rate: Probability that a request is answered with HTTP 500.
+    :param disconnect_rate: Probability that a download breaks off partway through the file.
+    :param support_ranges: Answer Range requests with 206 instead of sending the whole file.
+    :param seed: Seed for the failure and disconnect decisions.
+    """
+
+    def __init__(self, root, host='127.0.0.1', port=0, latency=0.0, bandwidth=None, max_connections=None,
+                 failure_rate=0.0, disconnect_rate=0.0, support_ranges=False, seed=None):
+        self.root = pathlib.Path(root)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_connections = max_connections
+        self.failure_rate = failure_rate
+        self.disconnect_rate = disconnect_rate
+        self.support_ranges = support_ranges
+        self.lock = threading.Lock()
+        self.stats = {
+            'listings': 0, 'downloads': 0, 'bytes_sent': 0, 'file_bytes': 0, 'failures': 0, 'disconnects': 0,
+            'refused': 0,
+        }
+        self._random = random.Random(seed)
+        self._active = 0
+        self._next_send = 0.0
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self))
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/dir?dir={CARD_ROOT}'
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={'poll_interval': 0.05}, name='ezShareCardEmulator', daemon=True,
+        )
+        self._thread.start()
+        logger.info(f'ez Share card emulator serving {self.root} at {self.url}')
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.httpd.shutdown()
+        self._thread.join()
+        self._thread = None
+        self.httpd.server_close()
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.stats[name] += amount
+
+    def chance(self, rate):
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self._random.random() < rate
+
+    def acquire(self):
+        with self.lock:
+            if self.max_connections is not None and self._active >= self.max_connections:
+                self.stats['refused'] += 1
+                return False
+            self._active += 1
+            return True
+
+    def release(self):
+        with self.lock:
+            self._active -= 1
+
+    def throttle(self, size):
+        """Wait until the bandwidth cap allows sending size more bytes."""
+        if not self.bandwidth:
+            return
+        with self.lock:
+            start = max(time.monotonic(), self._next_send)
+            self._next_send = start + size / self.bandwidth
+            delay = self._next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def resolve(self, card_path):
+        """
+        Map a card path separated by backslashes or slashes to a path below the root.
+
+        :return: Local path, or None if the card path is absolute, names a drive or resolves outside the root.
+        """
+        if card_path.startswith(('/', '\\')):
+            return None
+        parts = [part for part in re.split(r'[\\/]', card_path) if part]
+        if any(part in ('.', '..') or ':' in part for part in parts):
+            return None
+        path = self.root.joinpath(*parts)
+        root = self.root.resolve()
+        resolved = path.resolve()
+        if resolved != root and root not in resolved.parents:
+            return None
+        return path
+
+    def render_listing(self, card_dir, local_dir):
+        """Render a directory the way the card firmware does: one <pre> line per entry."""
+        lines = [
+            _listing_line(local_dir, '&lt;DIR&gt;', _dir_href(card_dir), '.'),
+            _listing_line(local_dir, '&lt;DIR&gt;', _dir_href(card_dir.rpartition('\\')[0]), '..'),
+        ]
+        entries = sorted(local_dir.iterdir(), key=lambda entry: (not entry.is_dir(), entry.name))
+        for entry in entries:
+            card_path = f'{card_dir}\\{entry.name}' if card_dir else entry.name
+            if entry.is_dir():
+                lines.append(_listing_line(entry, '&lt;DIR&gt;', _dir_href(card_path), entry.name))
+            else:
+                size = f'{(entry.stat().st_size + 1023) // 1024}KB'
+                lines.append(_listing_line(entry, size, 'download?file=' + _quote(card_path), entry.name))
+        body = '<html><head><title>ez Share</title></head><body><pre>\n' + '\n'.join(lines) + '\n</pre></body></html>'
+        return body.encode('utf-8')
+
+
+def _quote(value):
+    return urllib.parse.quote(value, safe=':')
+
+
+def _dir_href(card_dir):
+    return 'dir?dir=' + _quote(f'{CARD_ROOT}\\{card_dir}' if card_dir else CARD_ROOT)
+
+
+def _listing_line(path, size_column, href, name):
+    stamp = datetime.datetime.fromtimestamp(path.stat().st_mtime)
+    return (
+        f'   {stamp.year:4d}-{stamp.month:2d}-{stamp.day:2d}   {stamp.hour:2d}:{stamp.minute:2d}:{stamp.second:2d}'
+        f'   {size_column:>12}   <a href="{html.escape(href)}">{html.escape(name)}</a>'
+    )
+
+
+def _make_handler(emulator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body are written separately; without TCP_NODELAY every response waits for a delayed ACK.
+        disable_nagle_algorithm = True
+
+        def do_HEAD(self):
+            self._respond(head=True)
+
+        def do_GET(self):
+            self._respond(head=False)
+
+        def _respond(self, head):
+            if not emulator.acquire():
+                self.close_connection = True
+                return
+            try:
+                if emulator.latency:
+                    time.sleep(emulator.latency)
+                url = urllib.parse.urlsplit(self.path)
+                query = urllib.parse.parse_qs(url.query)
+                if url.path == '/':
+                    self._send(200, b'', 'text/html', head)
+                elif emulator.chance(emulator.failure_rate):
+                    emulator.count('failures')
+                    self._send(500, b'Internal Server Error', 'text/plain', head)
+                elif url.path == '/dir':
+                    self._send_listing(query.get('dir', [''])[0], head)
+                elif url.path == '/download':
+                    self._send_file(query.get('file', [''])[0], head)
+                else:
+                    self._send(404, b'Not Found', 'text/plain', head)
+            finally:
+                emulator.release()
+
+        def _send_listing(self, card_dir, head):
+            if not card_dir.upper().startswith(CARD_ROOT):
+                self._send(404, b'Not Found', 'text/plain', head)
+                return
+            card_dir = card_dir[len(CARD_ROOT):].strip('\\')
+            local_dir = emulator.resolve(card_dir)
+            if local_dir is None or not local_dir.is_dir():
+                self._send(404, b'Not Found', 'text/plain', head)
+                return
+            emulator.count('listings')
+            self._send(200, emulator.render_listing(card_dir, local_dir), 'text/html; charset=utf-8', head)
+
+        def _send_file(self, card_path, head):
+            local_file = emulator.resolve(card_path)
+            if local_file is None or not local_file.is_file():
+                self._send(404, b'Not Found', 'text/plain', head)
+                return
+            emulator.count('downloads')
+            size = local_file.stat().st_size
+            start = self._range_start(size)
+            if start is not None and start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206 if start is not None else 200)
+            if start is not None:
+                self.send_header('Content-Range', f'bytes {start}-{size - 1}/{size}')
+            start = start or 0
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(size - start))
+            self.end_headers()
+            if head:
+                return
+            # A broken-off transfer stops somewhere before the last byte.
+            stop_at = None
+            if size - start > 1 and emulator.chance(emulator.disconnect_rate):
+                with emulator.lock:
+                    stop_at = start + emulator._random.randrange(1, size - start)
+            with local_file.open('rb') as f:
+                f.seek(start)
+                position = start
+                while True:
+                    chunk = f.read(SEND_CHUNK_SIZE)
+                    if not chunk:
+                        return
+                    if stop_at is not None and position + len(chunk) >= stop_at:
+                        chunk = chunk[:stop_at - position]
+                        emulator.throttle(len(chunk))
+                        self.wfile.write(chunk)
+                        emulator.count('bytes_sent', len(chunk))
+                        emulator.count('file_bytes', len(chunk))
+                        emulator.count('disconnects')
+                        self.close_connection = True
+                        return
+                    emulator.throttle(len(chunk))
+                    self.wfile.write(chunk)
+                    emulator.count('bytes_sent', len(chunk))
+                    emulator.count('file_bytes', len(chunk))
+                    position += len(chunk)
+
+        def _range_start(self, size):
+            value = self.headers.get('Range')
+            if not emulator.support_ranges or not value or not value.startswith('bytes='):
+                return None
+            first, _, last = value[len('bytes='):].partition('-')
+            if not first.isdigit() or last:
+                return None
+            return int(first)
+
+        def _send(self, status, body, content_type, head):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(body)
+                emulator.count('bytes_sent', len(body))
+
+        def log_message(self, format, *args):
+            logger.debug('%s - %s', self.address_string(), format % args)
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', type=pathlib.Path, help='Directory served as the root of the SD card.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument('--port', type=int, default=8080, help='TCP port to listen on.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added before every response.')
+    parser.add_argument('--bandwidth', type=float, help='Bytes per second shared by all transfers.')
+    parser.add_argument('--max-connections', type=int, help='Requests served at the same time.')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Probability of an HTTP 500 answer.')
+    parser.add_argument('--disconnect-rate', type=float, default=0.0,
+                        help='Probability that a download breaks off partway through.')
+    parser.add_argument('--support-ranges', action='store_true', help='Answer Range requests with 206.')
+    parser.add_argument('--seed', type=int, help='Seed for failures and disconnects.')
+    args = parser.parse_args(argv)
+
+    if not args.root.is_dir():
+        parser.error(f'{args.root} is not a directory.')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    emulator = CardEmulator(
+        args.root, host=args.host, port=args.port, latency=args.latency, bandwidth=args.bandwidth,
+        max_connections=args.max_connections, failure_rate=args.failure_rate,
+        disconnect_rate=args.disconnect_rate, support_ranges=args.support_ranges, seed=args.seed,
+    )
+    emulator.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.stop()
+        logger.info(f'Served {emulator.stats}')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
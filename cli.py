@@ -1,4 +1,5 @@
 import argparse
+import datetime
 import logging
 import pathlib
 import platform
@@ -7,10 +8,23 @@ import subprocess
 import sys
 
 from config_manager import ConfigManager, get_default_config_file
+from durability import DURABILITY_FILE, DURABILITY_POLICIES
+from events import EVENT_FORMATS, NdjsonEventWriter
+from file_ops import (
+    DEFAULT_DOWNLOAD_JOBS, DEFAULT_LISTING_WORKERS, DEFAULT_PRIORITY_NIGHTS, DEFAULT_TIME_TOLERANCE, parse_timezone,
+)
+from profiling import MemoryProfiler, run_profiled
+from sync_manifest import get_state_dir
 
 
 DEFAULT_RETRIES = 3
 DEFAULT_CONNECTION_DELAY = 5
+# Without a file argument, --timings saves its report in this directory of the sync path's state directory.
+TIMINGS_DIR_NAME = 'timings'
+# Without a file argument, --profile and --profile-memory save their reports in this directory.
+PROFILES_DIR_NAME = 'profiles'
+# Sync events at which --profile-memory takes a tracemalloc snapshot.
+MEMORY_SNAPSHOT_EVENTS = ('scan_finished', 'sync_finished')
 ezShare = None
 
 
@@ -25,12 +39,43 @@ def build_parser():
     parser.add_argument('--ssid', help='ez Share Wi-Fi SSID. Defaults to the saved config value.')
     parser.add_argument('--psk', help='ez Share Wi-Fi password. Defaults to the saved config value.')
     parser.add_argument('--overwrite', action='store_true', help='Download files even when a local copy exists.')
+    parser.add_argument(
+        '--verify-local',
+        action='store_true',
+        help='Check every local file on disk instead of trusting the sync manifest.',
+    )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Skip DATALOG night folders that were completely synced by an earlier run.',
+    )
+    parser.add_argument(
+        '--time-tolerance',
+        type=float,
+        default=DEFAULT_TIME_TOLERANCE,
+        help='Seconds a card timestamp may differ from the local copy before the file counts as changed.',
+    )
+    parser.add_argument(
+        '--remote-timezone',
+        help="Time zone the card clock is set to, such as 'UTC', '+01:00' or 'Europe/Berlin'. Defaults to local time.",
+    )
     parser.add_argument(
         '--ignore',
         action='append',
         default=[],
         help='File or directory name to ignore. Repeat the flag or use comma-separated values.',
     )
+    parser.add_argument(
+        '--no-wifi',
+        action='store_true',
+        help='Do not join or leave any Wi-Fi network; sync from --url as it is reachable now, '
+             'for example a card emulator or a card network joined by hand.',
+    )
+    parser.add_argument(
+        '--keep-wifi-profile',
+        action='store_true',
+        help='Linux: keep the NetworkManager profile between runs instead of recreating it on every connect.',
+    )
     parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help='Wi-Fi/download retry count.')
     parser.add_argument(
         '--connection-delay',
@@ -38,6 +83,30 @@ def build_parser():
         default=DEFAULT_CONNECTION_DELAY,
         help='Seconds to wait between retry attempts.',
     )
+    parser.add_argument(
+        '--listing-workers',
+        type=int,
+        default=DEFAULT_LISTING_WORKERS,
+        help='Number of directory listings requested from the card at the same time.',
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=DEFAULT_DOWNLOAD_JOBS,
+        help='Number of files downloaded from the card at the same time.',
+    )
+    parser.add_argument(
+        '--priority-nights',
+        type=int,
+        default=DEFAULT_PRIORITY_NIGHTS,
+        help='Number of newest DATALOG nights downloaded right after STR.edf and Identification files.',
+    )
+    parser.add_argument(
+        '--durability',
+        choices=DURABILITY_POLICIES,
+        default=DURABILITY_FILE,
+        help='When downloaded files are flushed to disk: after each file, in batches, or at the end of the run.',
+    )
     parser.add_argument(
         '--save-config',
         action='store_true',
@@ -48,6 +117,44 @@ def build_parser():
         action='store_true',
         help='Open OSCAR after a successful sync. macOS attempts import automation; Windows/Linux launch OSCAR.',
     )
+    parser.add_argument(
+        '--open-oscar-early',
+        action='store_true',
+        help='Open OSCAR as soon as the summary files and latest nights are downloaded, while older data continues.',
+    )
+    parser.add_argument(
+        '--timings',
+        nargs='?',
+        const=True,
+        type=pathlib.Path,
+        metavar='FILE',
+        help='Print how long each sync phase took and save the breakdown as JSON, '
+             'by default in .ezShareCPAP/timings inside the sync path.',
+    )
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const=True,
+        type=pathlib.Path,
+        metavar='FILE',
+        help='Run the sync under cProfile and save the pstats file plus a sorted text summary (FILE.txt), '
+             'by default in .ezShareCPAP/profiles inside the sync path.',
+    )
+    parser.add_argument(
+        '--profile-memory',
+        nargs='?',
+        const=True,
+        type=pathlib.Path,
+        metavar='FILE',
+        help='Trace memory with tracemalloc and save snapshots taken when the scan and the sync finish, '
+             'by default in .ezShareCPAP/profiles inside the sync path.',
+    )
+    parser.add_argument(
+        '--events',
+        choices=EVENT_FORMATS,
+        default='text',
+        help='Output format on stdout: human-readable text, or one JSON event per line (ndjson) for automation.',
+    )
     parser.add_argument('--quiet', action='store_true', help='Only print errors.')
     parser.add_argument('--debug', action='store_true', help='Enable debug logging.')
     return parser
@@ -56,6 +163,11 @@ def build_parser():
 def run_cli(argv=None):
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.profile:
+        target = _report_path(_resolve_sync_path(args), args.profile, PROFILES_DIR_NAME, '.pstats')
+        exit_code = run_profiled(target, run_sync, args, parser)
+        print(f'CPU profile saved to {target} and {target.with_suffix(".txt")}', file=_report_stream(args))
+        return exit_code
     return run_sync(args, parser)
 
 
@@ -65,15 +177,14 @@ def run_sync(args, parser=None):
         format='%(asctime)s - %(levelname)s - %(message)s',
     )
 
-    config_file = args.config.expanduser() if args.config else get_default_config_file()
-    config_manager = ConfigManager(config_file)
+    config_manager = _load_config(args)
 
     path = pathlib.Path(args.path or config_manager.get_setting('Settings', 'path')).expanduser()
     url = args.url or config_manager.get_setting('Settings', 'url')
     ssid = args.ssid or config_manager.get_setting('WiFi', 'ssid')
     psk = args.psk if args.psk is not None else config_manager.get_setting('WiFi', 'psk')
 
-    if not path or not url or not ssid:
+    if not path or not url or not (ssid or args.no_wifi):
         message = 'path, url, and ssid are required. Provide them as arguments or save them in the config.'
         if parser:
             parser.error(message)
@@ -94,6 +205,43 @@ def run_sync(args, parser=None):
         print(f'Error: {message}', file=sys.stderr)
         return 2
 
+    if args.listing_workers < 1:
+        message = '--listing-workers must be at least 1.'
+        if parser:
+            parser.error(message)
+        print(f'Error: {message}', file=sys.stderr)
+        return 2
+
+    if args.jobs < 1:
+        message = '--jobs must be at least 1.'
+        if parser:
+            parser.error(message)
+        print(f'Error: {message}', file=sys.stderr)
+        return 2
+
+    if args.priority_nights < 0:
+        message = '--priority-nights cannot be negative.'
+        if parser:
+            parser.error(message)
+        print(f'Error: {message}', file=sys.stderr)
+        return 2
+
+    if args.time_tolerance < 0:
+        message = '--time-tolerance cannot be negative.'
+        if parser:
+            parser.error(message)
+        print(f'Error: {message}', file=sys.stderr)
+        return 2
+
+    try:
+        parse_timezone(args.remote_timezone)
+    except ValueError as e:
+        message = f'--remote-timezone: {e}'
+        if parser:
+            parser.error(message)
+        print(f'Error: {message}', file=sys.stderr)
+        return 2
+
     try:
         path.mkdir(parents=True, exist_ok=True)
     except OSError as e:
@@ -107,8 +255,22 @@ def run_sync(args, parser=None):
         config_manager.set_setting('WiFi', 'psk', psk)
 
     syncer = _get_ezshare_class()()
-    syncer.set_status_callback(_build_status_callback(args.quiet))
-    syncer.set_progress_callback(_build_progress_callback(args.quiet))
+    event_writer = NdjsonEventWriter(sys.stdout) if args.events == 'ndjson' else None
+    if event_writer is not None:
+        status_callback = _build_event_status_callback(event_writer)
+    else:
+        status_callback = _build_status_callback(args.quiet)
+    syncer.set_status_callback(status_callback)
+    oscar_opened = []
+
+    def open_oscar_early():
+        oscar_opened.append(open_oscar_for_platform(status_callback))
+
+    syncer.set_progress_callback(
+        _build_progress_callback(
+            args.quiet or event_writer is not None, open_oscar_early if args.open_oscar_early else None, event_writer,
+        )
+    )
     syncer.set_params(
         path=path,
         url=url,
@@ -123,8 +285,52 @@ def run_sync(args, parser=None):
         retries=args.retries,
         connection_delay=args.connection_delay,
         debug=args.debug,
+        listing_workers=args.listing_workers,
+        verify_local=args.verify_local,
+        incremental=args.incremental,
+        download_jobs=args.jobs,
+        durability=args.durability,
+        time_tolerance=args.time_tolerance,
+        remote_timezone=args.remote_timezone,
+        priority_nights=args.priority_nights,
+        keep_wifi_profile=args.keep_wifi_profile,
+        collect_timings=bool(args.timings),
+        use_wifi=not args.no_wifi,
     )
 
+    event_listeners = []
+    memory_profiler = None
+    if args.profile_memory:
+        memory_profiler = MemoryProfiler(_report_path(path, args.profile_memory, PROFILES_DIR_NAME, '-memory.txt'))
+        memory_profiler.start()
+        event_listeners.append(
+            lambda name, fields: memory_profiler.snapshot(name) if name in MEMORY_SNAPSHOT_EVENTS else None
+        )
+    if event_writer is not None:
+        event_writer.start()
+        event_listeners.append(event_writer.emit)
+    if event_listeners:
+        def emit_event(name, fields):
+            for listener in event_listeners:
+                listener(name, fields)
+
+        syncer.set_event_callback(emit_event)
+
+    exit_code = 1
+    try:
+        exit_code = _run_syncer(syncer, args, status_callback, oscar_opened)
+    finally:
+        if args.timings:
+            _report_timings(syncer.timings, args.timings, path, _report_stream(args))
+        if memory_profiler is not None:
+            memory_profiler.stop()
+            print(f'Memory profile saved to {memory_profiler.path}', file=_report_stream(args))
+        if event_writer is not None:
+            event_writer.close(exit_code=exit_code)
+    return exit_code
+
+
+def _run_syncer(syncer, args, status_callback, oscar_opened):
     try:
         success = bool(syncer.run())
     except KeyboardInterrupt:
@@ -135,12 +341,45 @@ def run_sync(args, parser=None):
     if not success:
         return 1
 
-    if args.open_oscar and not open_oscar_for_platform(_build_status_callback(args.quiet)):
+    if args.open_oscar and not any(oscar_opened) and not open_oscar_for_platform(status_callback):
         return 1
 
     return 0
 
 
+def _report_stream(args):
+    # Reports go to stderr when stdout carries the event stream.
+    return sys.stderr if args.events == 'ndjson' else sys.stdout
+
+
+def _load_config(args):
+    return ConfigManager(args.config.expanduser() if args.config else get_default_config_file())
+
+
+def _resolve_sync_path(args):
+    path = args.path or _load_config(args).get_setting('Settings', 'path')
+    return pathlib.Path(path).expanduser() if path else pathlib.Path.cwd()
+
+
+def _report_path(path, target, dir_name, suffix, started_at=None):
+    """Get the file a report option writes to: its FILE argument, or a timestamped file in the state directory."""
+    if target is not True:
+        return target.expanduser()
+    stamp = (started_at or datetime.datetime.now()).strftime('%Y%m%d-%H%M%S')
+    return get_state_dir(path) / dir_name / f'{stamp}{suffix}'
+
+
+def _report_timings(timings, target, path, stream):
+    target = _report_path(path, target, TIMINGS_DIR_NAME, '.json', timings.started_at)
+    print(timings.format_report(), file=stream)
+    try:
+        timings.save(target)
+    except OSError as e:
+        print(f'Error: cannot save timings to {target}: {e}', file=sys.stderr)
+        return
+    print(f'Timings saved to {target}', file=stream)
+
+
 def _parse_ignore_values(values):
     ignored = []
     for value in values:
@@ -166,12 +405,26 @@ def _build_status_callback(quiet=False):
     return callback
 
 
-def _build_progress_callback(quiet=False):
+def _build_event_status_callback(event_writer):
+    def callback(message, message_type='info'):
+        event_writer.emit('status', {'message': message, 'level': message_type})
+
+    return callback
+
+
+def _build_progress_callback(quiet=False, on_priority_complete=None, event_writer=None):
     def callback(value):
+        if value == 'priority_complete' and event_writer is not None:
+            event_writer.emit('priority_complete')
+        if value == 'priority_complete' and on_priority_complete is not None:
+            on_priority_complete()
+            return
         if quiet:
             return
         if value == 'no_files':
             print('No new files to sync.')
+        elif value == 'priority_complete':
+            print('The latest night is ready for OSCAR; older data is still downloading.')
 
     return callback
 
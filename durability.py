@@ -0,0 +1,150 @@
+# durability.py
+import logging
+import os
+import pathlib
+import threading
+
+from sync_manifest import get_state_dir
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_FILE = 'file'
+DURABILITY_BATCH = 'batch'
+DURABILITY_END = 'end'
+DURABILITY_POLICIES = (DURABILITY_FILE, DURABILITY_BATCH, DURABILITY_END)
+
+JOURNAL_FILE_NAME = 'journal.txt'
+
+# Number of written files flushed together under the batch policy.
+BATCH_SIZE = 64
+
+
+def fsync_path(path):
+    """Flush a file or directory to disk. Directories cannot be flushed on Windows and are skipped."""
+    path = pathlib.Path(path)
+    if os.name == 'nt' and path.is_dir():
+        return
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SyncDurability:
+    """
+    Decide when downloaded files are flushed to disk.
+
+    file:  every file is flushed before it replaces the target, as download_file always did.
+    batch: files are flushed in groups of BATCH_SIZE after they are renamed, followed by
+           one flush per parent directory.
+    end:   files are flushed once when the run finishes.
+
+    The batch and end policies write the sync plan to a journal before downloading. The
+    journal is removed once everything written has been flushed, so a journal found at
+    start-up lists the files an interrupted run may have left incomplete.
+    """
+
+    def __init__(self, policy, sync_path):
+        if policy not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy '{policy}'.")
+        self.policy = policy
+        self.sync_path = pathlib.Path(sync_path)
+        self.journal_path = get_state_dir(self.sync_path) / JOURNAL_FILE_NAME
+        self.lock = threading.Lock()
+        self.recovered = set()
+        self._planned = set()
+        self._written = set()
+        self._unflushed = []
+        self._begun = False
+
+    @property
+    def fsync_each_file(self):
+        return self.policy == DURABILITY_FILE
+
+    def recover(self):
+        """
+        Read the journal left by an interrupted run.
+
+        :return: Set of local paths that must be downloaded again to be trusted.
+        """
+        try:
+            with self.journal_path.open('r', encoding='utf-8') as f:
+                self.recovered = {self.sync_path / line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+        except OSError as e:
+            logger.error(f"Could not read sync journal {self.journal_path}: {e}")
+            return set()
+        logger.warning(f"Previous sync was interrupted; {len(self.recovered)} files will be downloaded again.")
+        return self.recovered
+
+    def begin(self, local_paths):
+        """
+        Record the files about to be written so an interrupted run can be recovered.
+
+        :param local_paths: Local paths of the sync plan, including recovered files still on the card.
+        """
+        self._begun = True
+        self._planned = {pathlib.Path(local_path) for local_path in local_paths}
+        if not self.fsync_each_file:
+            self._write_journal(self._planned)
+
+    def file_written(self, local_path):
+        """Note a file that has replaced its target."""
+        with self.lock:
+            self._written.add(pathlib.Path(local_path))
+            if self.fsync_each_file:
+                return
+            self._unflushed.append(pathlib.Path(local_path))
+            if self.policy == DURABILITY_BATCH and len(self._unflushed) >= BATCH_SIZE:
+                self._flush_locked()
+
+    def finish(self):
+        """
+        Flush everything written during the run and update the journal.
+
+        Recovered files that were planned but not downloaded again stay in the journal;
+        otherwise the journal is removed.
+        """
+        if not self._begun:
+            return
+        self._begun = False
+        with self.lock:
+            self._flush_locked()
+            remaining = (self.recovered & self._planned) - self._written
+        self._write_journal(remaining)
+
+    def _flush_locked(self):
+        files, self._unflushed = self._unflushed, []
+        for path in files:
+            try:
+                fsync_path(path)
+            except OSError as e:
+                logger.error(f"Could not flush {path} to disk: {e}")
+        for directory in sorted({path.parent for path in files}):
+            try:
+                fsync_path(directory)
+            except OSError as e:
+                logger.error(f"Could not flush directory {directory} to disk: {e}")
+        if files:
+            logger.debug(f"Flushed {len(files)} files to disk.")
+
+    def _write_journal(self, local_paths):
+        if not local_paths:
+            self._remove_journal()
+            return
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open('w', encoding='utf-8') as f:
+            for local_path in sorted(local_paths):
+                f.write(pathlib.Path(local_path).relative_to(self.sync_path).as_posix() + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        fsync_path(self.journal_path.parent)
+
+    def _remove_journal(self):
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            return
+        fsync_path(self.journal_path.parent)
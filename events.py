@@ -0,0 +1,101 @@
+# events.py
+import json
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+EVENT_FORMATS = ('text', 'ndjson')
+
+
+class NdjsonEventWriter:
+    """
+    Write sync events to a stream as newline-delimited JSON.
+
+    emit() only queues the event, so download threads never wait for the consumer of
+    the stream. A writer thread serializes everything queued since its last pass,
+    writes it in one go and flushes. Each line carries the event name, a Unix
+    timestamp and the event fields. close() adds a summary event with totals over
+    the whole run.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._started = time.monotonic()
+        self._totals = {'files_downloaded': 0, 'files_failed': 0, 'bytes': 0, 'retries': 0}
+        self._result = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ezShareEvents', daemon=True)
+        self._thread.start()
+
+    def emit(self, name, fields=None):
+        self._queue.put((name, time.time(), fields or {}))
+
+    def close(self, **fields):
+        """Write the summary event and everything still queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        summary = dict(self._result)
+        summary.update(self._totals)
+        summary['duration_ms'] = round((time.monotonic() - self._started) * 1000, 3)
+        summary.update(fields)
+        self._write([_format_event('summary', time.time(), summary)])
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            lines = []
+            for item in items:
+                if item is None:
+                    continue
+                name, timestamp, fields = item
+                self._count(name, fields)
+                lines.append(_format_event(name, timestamp, fields))
+            self._write(lines)
+            if stop:
+                return
+
+    def _count(self, name, fields):
+        if name == 'file_finished':
+            self._totals['bytes'] += fields.get('bytes', 0)
+            self._totals['files_downloaded' if fields.get('success') else 'files_failed'] += 1
+        elif name == 'retry':
+            self._totals['retries'] += 1
+        elif name == 'sync_finished':
+            self._result = {'success': fields.get('success'), 'total_files': fields.get('total_files')}
+
+    def _write(self, lines):
+        if not lines:
+            return
+        try:
+            self.stream.write(''.join(lines))
+            self.stream.flush()
+        except (OSError, ValueError) as e:
+            logger.error(f'Could not write sync events: {e}')
+
+
+def _format_event(name, timestamp, fields):
+    event = {'event': name, 'time': round(timestamp, 3)}
+    event.update(fields)
+    return json.dumps(event, separators=(',', ':'), default=str) + '\n'
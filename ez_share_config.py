@@ -67,11 +67,17 @@ class EzShareConfig:
 
             if self.connection_manager.connected and not self._is_cancelled:
                 self.is_connected = True
-                self.app.main_window.after(
-                    self.app.ezshare.connection_delay * 1000, self._check_wifi_connection
-                )
+                if self.connection_manager.verify_connection(is_running=lambda: not self._is_cancelled):
+                    self.app.main_window.after(0, self._check_wifi_connection)
+                elif self._is_cancelled:
+                    # cancel_ezshare_config has already disconnected and reset the dialog.
+                    logging.info("Configuration was cancelled while waiting for the ez Share card.")
+                else:
+                    logging.warning("The ez Share card did not answer on its Wi-Fi network.")
+                    self._disconnect(ssid)
+                    self.app.main_window.after(0, self._card_unreachable)
             else:
-                logging.info("Configuration was cancelled during the connection delay.")
+                logging.info("Configuration was cancelled while connecting.")
                 self._cleanup()
 
         except RuntimeError as e:
@@ -89,6 +95,18 @@ class EzShareConfig:
             logging.warning("Failed to connect to Wi-Fi.")
             self._cleanup()
 
+    def _card_unreachable(self):
+        self._cleanup()
+        update_status(self.app, 'Connected to the ez Share Wi-Fi, but the card did not answer.', 'error')
+
+    def _disconnect(self, ssid):
+        try:
+            if self.connection_manager.connected:
+                self.connection_manager.disconnect(ssid)
+                logging.info("Wi-Fi disconnection attempted.")
+        except Exception as e:
+            logging.error(f"Error while disconnecting Wi-Fi: {e}")
+
     def _open_configuration_page(self):
         logging.info("Connected to ez Share WiFi for configuration.")
         update_status(self.app, 'Connected to ez Share WiFi for configuration.', 'info')
@@ -128,14 +146,7 @@ class EzShareConfig:
         self._is_cancelled = True  # Set the cancellation flag
 
         ssid = self.app.builder.get_object('ssid_entry').get()
-        try:
-            if self.connection_manager.connected:
-                self.connection_manager.disconnect(ssid)
-                logging.info("Wi-Fi disconnection attempted.")
-                self.is_connected = False
-        except Exception as e:
-            logging.error(f"Error while disconnecting Wi-Fi: {e}")
-
+        self._disconnect(ssid)
         self._cleanup()
 
     def _cleanup(self):
@@ -1,14 +1,27 @@
 # ezshare.py
 import pathlib
 import logging
+import sqlite3
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util import Retry
 from wifi_utils import ConnectionManager
-from file_ops import recursive_traversal, list_dir
+from sync_manifest import SyncManifest
+from durability import DURABILITY_FILE, SyncDurability
+from timings import NULL_TIMINGS, SyncTimings
+from transfer_progress import format_progress
+from file_ops import (
+    DEFAULT_DOWNLOAD_JOBS, DEFAULT_LISTING_WORKERS, DEFAULT_PRIORITY_NIGHTS, DEFAULT_TIME_TOLERANCE,
+    build_remote_tree, build_sync_plan, check_files, detect_timestamp_skew, discard_partial_download,
+    iter_night_folders, iter_tree_files, list_dir, parse_timezone, prioritize_sync_plan, rebase_local_timestamps,
+    synced_night_folders,
+)
 import urllib.parse
 import time
 
+# Newest DATALOG night folders that an incremental scan always lists again.
+INCREMENTAL_RECENT_NIGHTS = 2
+
 class ezShare:
     def __init__(self):
         self.reset_state()
@@ -23,6 +36,7 @@ class ezShare:
         self.ssid = None
         self.psk = None
         self.connected = False
+        self.connection_ready_time = None
         self.session = None
         self.ignore = ['.', '..', 'back to photo']
         self.retries = None
@@ -30,8 +44,24 @@ class ezShare:
         self.debug = None
         self.progress_callback = None
         self.status_callback = None
+        self.event_callback = None
         self.total_files = 0
         self.processed_files = 0
+        self.remote_tree = None
+        self.listing_workers = DEFAULT_LISTING_WORKERS
+        self.download_jobs = DEFAULT_DOWNLOAD_JOBS
+        self.verify_local = False
+        self.incremental = False
+        self.manifest = None
+        self.durability = DURABILITY_FILE
+        self.write_durability = None
+        self.time_tolerance = DEFAULT_TIME_TOLERANCE
+        self.remote_tzinfo = None
+        self.priority_nights = DEFAULT_PRIORITY_NIGHTS
+        self.keep_wifi_profile = False
+        self.timings = NULL_TIMINGS
+        self.use_wifi = True
+        self.sync_plan = []
         self._is_running = True
         self._configure_logging()
         self.retry_policy = Retry(total=3, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
@@ -41,7 +71,12 @@ class ezShare:
         logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
 
     def set_params(self, path, url, start_time, show_progress, verbose,
-                   overwrite, keep_old, ssid, psk, ignore, retries, connection_delay, debug):
+                   overwrite, keep_old, ssid, psk, ignore, retries, connection_delay, debug,
+                   listing_workers=DEFAULT_LISTING_WORKERS, verify_local=False, incremental=False,
+                   download_jobs=DEFAULT_DOWNLOAD_JOBS, durability=DURABILITY_FILE,
+                   time_tolerance=DEFAULT_TIME_TOLERANCE, remote_timezone=None,
+                   priority_nights=DEFAULT_PRIORITY_NIGHTS, keep_wifi_profile=False, collect_timings=False,
+                   use_wifi=True):
         log_level = logging.DEBUG if debug else logging.INFO if verbose else logging.WARN
         logging.getLogger().setLevel(log_level)
         self.path = pathlib.Path(path).expanduser()
@@ -56,6 +91,18 @@ class ezShare:
         self.retries = retries
         self.connection_delay = connection_delay
         self.debug = debug
+        self.listing_workers = listing_workers
+        self.verify_local = verify_local
+        self.incremental = incremental
+        self.download_jobs = download_jobs
+        self.durability = durability
+        self.time_tolerance = time_tolerance
+        self.remote_tzinfo = parse_timezone(remote_timezone)
+        self.priority_nights = priority_nights
+        self.keep_wifi_profile = keep_wifi_profile
+        self.timings = SyncTimings() if collect_timings else NULL_TIMINGS
+        self.connection_manager.timings = self.timings
+        self.use_wifi = use_wifi
 
     def set_progress_callback(self, callback):
         self.progress_callback = callback
@@ -63,10 +110,31 @@ class ezShare:
     def set_status_callback(self, callback):
         self.status_callback = callback
 
-    def update_progress(self, value):
+    def set_event_callback(self, callback):
+        """Receive structured sync events as callback(name, fields)."""
+        self.event_callback = callback
+
+    def emit_event(self, name, **fields):
+        if self.event_callback:
+            self.event_callback(name, fields)
+
+    def update_progress(self, value, snapshot=None):
+        """
+        Report sync progress.
+
+        :param value: Percentage done.
+        :param snapshot: Optional ProgressSnapshot with bytes, throughput and ETA.
+        """
         if self.progress_callback:
             self.progress_callback(min(max(0, value), 100))
-            self.update_status(f'Progress: {value:.2f}%')
+            self.update_status(format_progress(value, snapshot))
+        if snapshot is not None:
+            self.emit_event(
+                'progress', percent=round(value, 2), bytes=snapshot.bytes, total_bytes=snapshot.total_bytes,
+                files=snapshot.files, total_files=snapshot.total_files,
+                bytes_per_s=None if snapshot.throughput is None else round(snapshot.throughput),
+                eta_s=None if snapshot.eta is None else round(snapshot.eta, 1),
+            )
 
     def update_status(self, message, message_type='info'):
         if self.status_callback:
@@ -79,29 +147,37 @@ class ezShare:
 
     def run(self):
         self.update_status('Starting process...')
+        if not self.use_wifi:
+            return self._run_without_wifi()
         if self.ssid:
             self.update_status(f'Connecting to {self.ssid}...')
+            self.connection_manager.keep_linux_profile = self.keep_wifi_profile
             retries = self.retries
             while retries > 0 and self._is_running:
                 try:
-                    target_host = urllib.parse.urlparse(self.url).hostname or "192.168.4.1"
+                    parsed_url = urllib.parse.urlparse(self.url)
+                    target_host = parsed_url.hostname or "192.168.4.1"
+                    connect_started = time.monotonic()
                     self.connection_manager.connect(self.ssid, self.psk, target_host=target_host)
                     if not self.connection_manager.connected or not self._is_running:
                         raise RuntimeError("Failed to connect to Wi-Fi or process was canceled.")
 
-                    # Add a short delay before verification to allow the network to settle
-                    time.sleep(2)  
-                    if not self.connection_manager.verify_connection():
+                    # Returns as soon as the card's web server answers.
+                    if not self.connection_manager.verify_connection(
+                            target_host=target_host, port=parsed_url.port or 80,
+                            is_running=lambda: self._is_running):
                         raise RuntimeError("Failed to verify Wi-Fi connection.")
 
+                    self.connection_ready_time = time.monotonic() - connect_started
+                    logging.info(f'ez Share ready {self.connection_ready_time:.2f} seconds after connecting.')
                     self.update_status(f'Connected to {self.ssid}.')
                     self.connected = True
-                    self.session = requests.Session()
-                    self.session.mount('http://', HTTPAdapter(max_retries=self.retry_policy))
+                    self.session = self._create_session()
                     break  # Exit the retry loop on successful connection
                 except RuntimeError as e:
                     retries -= 1
                     self.update_status(f'Connection attempt failed: {e}. Retries left: {retries}', 'error')
+                    self.emit_event('retry', stage='connect', error=str(e), retries_left=retries)
                     if retries == 0 or not self._is_running:
                         # If no retries left or the process was canceled, stop here.
                         self.connected = False
@@ -129,26 +205,68 @@ class ezShare:
             self.update_status('No SSID provided, cannot connect to Wi-Fi.', 'error')
             return False
 
-    def calculate_total_files(self, url, dir_path, overwrite):
-        files, dirs = list_dir(self, url)
+    def _run_without_wifi(self):
+        # The card is already reachable, for example a card emulator or a card joined by hand.
+        self.update_status(f'Wi-Fi handling disabled; syncing from {self.url}.')
+        self.connected = True
+        self.session = self._create_session()
+        try:
+            return self.run_after_connection_delay()
+        finally:
+            self.connected = False
+
+    def _create_session(self):
+        # One pooled connection per concurrent listing or download keeps connections reused.
+        pool_size = max(1, self.listing_workers, self.download_jobs)
+        session = requests.Session()
+        session.mount('http://', HTTPAdapter(max_retries=self.retry_policy, pool_maxsize=pool_size))
+        return session
+
+    def scan_remote_tree(self, url, dir_path, files=None, dirs=None):
         if files is None and dirs is None:
-            return None
-        return self.calculate_total_files_from_listing(files, dirs, url, dir_path, overwrite)
-
-    def calculate_total_files_from_listing(self, files, dirs, url, dir_path, overwrite):
-        total_files = 0
-        for filename, file_url, file_ts in files:
-            local_path = dir_path / filename
-            if overwrite or not local_path.is_file() or local_path.stat().st_mtime < file_ts:
-                total_files += 1
-        for dirname, dir_url in dirs:
-            new_dir_path = dir_path / dirname
-            absolute_dir_url = urllib.parse.urljoin(url, dir_url)
-            nested_total = self.calculate_total_files(absolute_dir_url, new_dir_path, overwrite)
-            if nested_total is None:
+            files, dirs = list_dir(self, url)
+            if files is None and dirs is None:
                 return None
-            total_files += nested_total
-        return total_files
+        skip_dirs = self._skip_synced_nights if self._incremental_scan_enabled() else None
+        return build_remote_tree(
+            self, url, dir_path, files, dirs, lambda: self._is_running,
+            max_workers=self.listing_workers, skip_dirs=skip_dirs,
+        )
+
+    def _incremental_scan_enabled(self):
+        return self.incremental and self.manifest is not None and not (self.verify_local or self.overwrite)
+
+    def _skip_synced_nights(self, node, children):
+        skipped = synced_night_folders(self.manifest, node, children, INCREMENTAL_RECENT_NIGHTS)
+        if self.write_durability is None or not self.write_durability.recovered:
+            return skipped
+        # Folders holding files from an interrupted run are listed again so they can be repaired.
+        recovered_dirs = {path.parent for path in self.write_durability.recovered}
+        return [child for child in skipped if child['path'] not in recovered_dirs]
+
+    def _mark_synced_nights(self):
+        if self.manifest is None or self.remote_tree is None:
+            return
+        self.manifest.mark_folders_synced(
+            (node['path'], node['timestamp'])
+            for node in iter_night_folders(self.remote_tree)
+            if node['timestamp'] and not node['skipped']
+        )
+
+    def _rebase_skewed_timestamps(self, local_stats):
+        if self.overwrite or self.keep_old:
+            return
+        offset, shifted = detect_timestamp_skew(self, iter_tree_files(self.remote_tree), local_stats)
+        if not offset:
+            return
+        for entry in shifted:
+            # The rebase changes the modification time, so these copies are checked on disk again.
+            local_stats.pop(entry['path'], None)
+        rebased = rebase_local_timestamps(self, shifted)
+        self.update_status(
+            f'Card timestamps are {offset / 3600:+g} hours off from the local copies; '
+            f'updated {rebased} local timestamps instead of downloading the files again.'
+        )
 
     def wait_for_directory_listing(self):
         attempts = max(1, self.retries or 1)
@@ -178,12 +296,48 @@ class ezShare:
             return False
 
         self.path.mkdir(parents=True, exist_ok=True)
+        self._open_manifest()
+        self.write_durability = SyncDurability(self.durability, self.path)
+        success = False
+        try:
+            success = self._sync_remote_files()
+            return success
+        finally:
+            self.write_durability.finish()
+            self._close_manifest()
+            self.emit_event(
+                'sync_finished', success=bool(success), files=self.processed_files, total_files=self.total_files,
+            )
+
+    def _open_manifest(self):
+        try:
+            self.manifest = SyncManifest(self.path).open()
+        except (OSError, sqlite3.Error) as e:
+            logging.warning(f'Sync manifest unavailable, checking local files instead: {e}')
+            self.manifest = None
+
+    def _close_manifest(self):
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+    def _sync_remote_files(self):
         self.update_status(f'Using path: {self.path}')
         self.update_status('Scanning for files to download...')
 
         # Test directory listing to ensure we're truly connected
-        test_files, test_dirs = self.wait_for_directory_listing()
-        if test_files is None and test_dirs is None:
+        recovered = self.write_durability.recover()
+        for local_path in recovered:
+            # Partial data written without fsync cannot be trusted after a crash.
+            discard_partial_download(local_path)
+
+        self.emit_event('scan_started', url=self.url)
+        with self.timings.phase('scan'):
+            test_files, test_dirs = self.wait_for_directory_listing()
+            listed = test_files is not None or test_dirs is not None
+            if listed:
+                self.remote_tree = self.scan_remote_tree(self.url, self.path, test_files, test_dirs)
+        if not listed:
             # If an error occurred, treat this as a connection problem
             self.update_status('Unable to retrieve directory listing. Connection issue suspected.', 'error')
             return False
@@ -192,38 +346,65 @@ class ezShare:
             # Log a warning and proceed cautiously - but this at least differentiates a verified empty result.
             self.update_status('Directory listing is empty. Possibly no files or still an issue.', 'info')
 
-        self.total_files = self.calculate_total_files_from_listing(
-            test_files,
-            test_dirs,
-            self.url,
-            self.path,
-            self.overwrite
-        )
-        if self.total_files is None:
+        if self.remote_tree is not None:
+            self.emit_event('scan_finished', files=sum(1 for _ in iter_tree_files(self.remote_tree)))
+        if self.remote_tree is None:
+            if not self._is_running:
+                self.update_status('Process cancelled.', 'info')
+                return False
             self.update_status('Unable to count files because the ez Share directory could not be reached.', 'error')
             return
+        with self.timings.phase('plan'):
+            local_stats = {}
+            self._rebase_skewed_timestamps(local_stats)
+            plan = build_sync_plan(self, self.remote_tree, force_paths=recovered, local_stats=local_stats)
+            self.sync_plan, priority_count = prioritize_sync_plan(plan, self.path, self.priority_nights)
+        self.total_files = len(self.sync_plan)
+        skipped_nights = sum(1 for node in iter_night_folders(self.remote_tree) if node['skipped'])
+        if skipped_nights:
+            self.update_status(f'Skipped {skipped_nights} night folders that were already synced.')
         self.update_status(f'Total files to sync: {self.total_files}')
+        self.emit_event(
+            'plan', files=self.total_files, bytes=sum(entry['size'] or 0 for entry in self.sync_plan),
+            priority_files=priority_count, skipped_nights=skipped_nights,
+        )
 
+        self.write_durability.begin(entry['path'] for entry in self.sync_plan)
         if self.total_files == 0:
+            self.write_durability.finish()
+            self._mark_synced_nights()
             self.update_status('All files are up to date. No files to sync. Process completed.')
             if self.progress_callback:
                 self.progress_callback('no_files')
             return True
 
-        self.processed_files = recursive_traversal(
-            self, self.url, self.path, self.total_files, self.processed_files, lambda: self._is_running
-        )
+        with self.timings.phase('transfer') as transfer:
+            self.processed_files = check_files(
+                self, self.sync_plan, self.total_files, self.processed_files, lambda: self._is_running,
+                max_workers=self.download_jobs, durability=self.write_durability,
+                # Only announce the priority set when older data is still to come.
+                priority_count=priority_count if priority_count < self.total_files else 0,
+                on_priority_complete=self._priority_complete,
+            )
+            self.write_durability.finish()
+            transfer.bytes = self.timings.total_bytes('download')
         if self.processed_files == self.total_files:
+            self._mark_synced_nights()
             self.update_status('File transfer completed successfully.')
             return True
         else:
             self.update_status('File transfer incomplete.', 'error')
             return False
 
+    def _priority_complete(self):
+        self.update_status('Summary files and the latest night are downloaded; older data is still downloading.')
+        if self.progress_callback:
+            self.progress_callback('priority_complete')
+
     def stop(self):
         self._is_running = False
         self.update_status('Process stopped by user.', 'info')
-        if self.connected:
+        if self.connected and self.use_wifi:
             if self.connection_manager.disconnect(self.ssid):
                 self.connected = False
             else:
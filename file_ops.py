@@ -1,36 +1,258 @@
 # file_ops.py
 import datetime
+import fnmatch
+import functools
+import html
+import json
 import re
+import statistics
 import requests
 import bs4
 import urllib.parse
 import logging
-from tempfile import NamedTemporaryFile
-import pathlib
 import os
+import stat
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+try:
+    import zoneinfo
+except ImportError:  # Python 3.8
+    zoneinfo = None
+
+from file_writer import BUFFERS_PER_DOWNLOAD, DirectWriteJob, FileWriter
+from timings import NULL_TIMINGS
+from transfer_progress import TransferProgress
 
 logger = logging.getLogger(__name__)
 
-def recursive_traversal(ezshare_instance, url, dir_path, total_files, processed_files, is_running):
+# Concurrent directory listings; ez Share firmware copes well with a few in flight.
+DEFAULT_LISTING_WORKERS = 2
+# Concurrent file downloads; higher values can overwhelm older ez Share firmware.
+DEFAULT_DOWNLOAD_JOBS = 2
+# Seconds between cancellation checks while directory listings are in flight.
+LISTING_POLL_INTERVAL = 0.25
+# Download chunk sizes in bytes; the read size adapts between these bounds.
+CHUNK_SIZE_MIN = 64 * 1024
+CHUNK_SIZE_MAX = 1024 * 1024
+# A read that fills faster than CHUNK_FAST_READ seconds grows the chunk, one slower than CHUNK_SLOW_READ shrinks it.
+CHUNK_FAST_READ = 0.05
+CHUNK_SLOW_READ = 0.25
+# Seconds between cancellation checks while a file is streaming.
+CANCEL_CHECK_INTERVAL = 0.2
+# ez Share lists file sizes in whole KB, so sizes within this many bytes count as equal.
+LISTING_SIZE_TOLERANCE = 1024
+# FAT stores modification times with 2 second resolution.
+DEFAULT_TIME_TOLERANCE = 2
+# At least this many local copies, and this share of them, must show the same timestamp
+# offset before it is treated as a clock or time zone change rather than new data.
+SKEW_MIN_FILES = 3
+SKEW_MIN_SHARE = 0.9
+# Time zone and daylight saving offsets are whole quarter hours.
+SKEW_GRANULARITY = 15 * 60
+# Card root files OSCAR needs to show the latest night; they are downloaded first.
+PRIORITY_FILE_PATTERNS = ('STR.edf', 'Identification.*')
+# Newest DATALOG night folders downloaded right after the priority files.
+DEFAULT_PRIORITY_NIGHTS = 1
+# Partial downloads and their resume sidecar live next to the target file.
+PART_SUFFIX = '.part'
+PART_INFO_SUFFIX = '.part.json'
+
+_PRE_BLOCK_RE = re.compile(rb'<pre[^>]*>(.*?)</pre>', re.IGNORECASE | re.DOTALL)
+_LISTING_ENTRY_RE = re.compile(
+    rb'^(?P<prefix>(?:[^<]|<dir>)*)<a\s+href\s*=\s*(?P<quote>["\'])(?P<href>.*?)(?P=quote)[^>]*>(?P<name>[^<]*)</a>\s*$',
+    re.IGNORECASE,
+)
+NIGHT_FOLDER_RE = re.compile(r'^\d{8}$')
+_CONTENT_RANGE_RE = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+_LISTING_TIMESTAMP_RE = re.compile(rb'(\d+)\s*-\s*(\d+)\s*-\s*(\d+)\s+(\d+)\s*:\s*(\d+)\s*:\s*(\d+)')
+_LISTING_SIZE_RE = re.compile(rb'(\d+)\s*([KMG]?)B\s*$', re.IGNORECASE)
+# Units whose rounding stays within LISTING_SIZE_TOLERANCE; sizes listed in MB or GB count as unknown.
+_SIZE_UNITS = {b'': 1, b'K': 1024}
+_UTC_OFFSET_RE = re.compile(r'^(?:UTC|GMT)?([+-])(\d{1,2})(?::?(\d{2}))?$', re.IGNORECASE)
+
+def build_remote_tree(ezshare_instance, url, dir_path, files, dirs, is_running, max_workers=1, skip_dirs=None):
     """
-    Recursively traverse directories to list and download files.
+    Build an in-memory tree of the remote card from an already fetched listing.
+
+    Every directory below the given listing is fetched exactly once, with up to
+    max_workers listings in flight on the shared session. The resulting tree is
+    reused for counting, planning and downloading so that a sync never lists the
+    same directory twice.
 
     :param ezshare_instance: Instance of the main application containing settings and states.
-    :param url: URL of the directory to traverse.
-    :param dir_path: Local directory path to store the files.
-    :param total_files: Total number of files expected to be processed.
-    :param processed_files: Count of files already processed.
+    :param url: URL of the directory the listing belongs to.
+    :param dir_path: Local directory path that mirrors the remote directory.
+    :param files: Files of the directory as returned by list_dir.
+    :param dirs: Directories of the directory as returned by list_dir.
     :param is_running: Function to check if the process should continue running.
-    :return: Updated count of processed files.
+    :param max_workers: Maximum number of concurrent directory listing requests.
+    :param skip_dirs: Optional function called with a node and its new child nodes that returns
+        the children which should be kept in the tree without being listed.
+    :return: Tree node dictionary, or None if a listing failed or the process was cancelled.
+    """
+    tree = _new_tree_node(url, dir_path)
+    pending = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='ezShareListing')
+
+    def submit(node, children):
+        skipped = {id(child) for child in skip_dirs(node, children)} if skip_dirs and children else ()
+        for child in children:
+            if id(child) in skipped:
+                child['skipped'] = True
+                continue
+            pending[executor.submit(list_dir, ezshare_instance, child['url'])] = child
+
+    try:
+        submit(tree, _fill_tree_node(tree, files, dirs))
+        while pending:
+            if not is_running():
+                return None
+            done, _ = wait(pending, timeout=LISTING_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            for future in done:
+                child = pending.pop(future)
+                sub_files, sub_dirs = future.result()
+                if sub_files is None and sub_dirs is None:
+                    return None
+                submit(child, _fill_tree_node(child, sub_files, sub_dirs))
+        return tree
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+def _new_tree_node(url, dir_path, dir_ts=0):
+    return {'url': url, 'path': dir_path, 'timestamp': dir_ts, 'files': [], 'dirs': [], 'skipped': False}
+
+def _fill_tree_node(node, files, dirs):
+    """
+    Add the files of a listing to a tree node and create placeholders for its subdirectories.
+
+    Placeholders are appended in listing order, so the tree keeps the card order no
+    matter in which order concurrent listings complete.
+
+    :param node: Tree node to fill.
+    :param files: Files of the directory as returned by list_dir.
+    :param dirs: Directories of the directory as returned by list_dir.
+    :return: List of child nodes whose listings still have to be fetched.
+    """
+    url = node['url']
+    dir_path = node['path']
+    for filename, file_url, file_ts, file_size in files:
+        node['files'].append({
+            'name': filename,
+            'url': urllib.parse.urljoin(url, 'download?' + file_url),
+            'timestamp': file_ts,
+            'size': file_size,
+            'path': dir_path / filename,
+        })
+    for dirname, dir_url, dir_ts in dirs:
+        node['dirs'].append(_new_tree_node(urllib.parse.urljoin(url, dir_url), dir_path / dirname, dir_ts))
+    return node['dirs']
+
+def iter_tree_files(node):
     """
-    files, dirs = list_dir(ezshare_instance, url)
-    if files is None and dirs is None:
-        ezshare_instance.update_status('Unable to retrieve directory listing. Connection issue suspected.', 'error')
-        return processed_files
-    processed_files = check_files(ezshare_instance, files, url, dir_path, total_files, processed_files, is_running)
-    processed_files = check_dirs(ezshare_instance, dirs, url, dir_path, total_files, processed_files, is_running)
-    return processed_files
+    Yield every file entry of a remote tree, files of a directory before its subdirectories.
+
+    :param node: Tree node as returned by build_remote_tree.
+    :return: Generator of file entry dictionaries.
+    """
+    yield from node['files']
+    for child in node['dirs']:
+        yield from iter_tree_files(child)
+
+def iter_night_folders(node):
+    """
+    Yield the DATALOG/YYYYMMDD night folders of a remote tree.
+
+    :param node: Tree node as returned by build_remote_tree.
+    :return: Generator of night folder tree nodes.
+    """
+    is_datalog = node['path'].name.upper() == 'DATALOG'
+    for child in node['dirs']:
+        if is_datalog and NIGHT_FOLDER_RE.match(child['path'].name):
+            yield child
+        else:
+            yield from iter_night_folders(child)
+
+def synced_night_folders(manifest, node, children, recent_nights):
+    """
+    Select the night folders of a DATALOG node that do not need to be listed again.
+
+    A night folder is skipped when the manifest marks it as completely synced with the
+    same directory timestamp and it is not one of the newest nights on the card.
+
+    :param manifest: Open SyncManifest.
+    :param node: Tree node whose children are about to be listed.
+    :param children: Child nodes of the tree node.
+    :param recent_nights: Number of newest night folders that are always listed.
+    :return: List of child nodes that can be kept in the tree without being listed.
+    """
+    if node['path'].name.upper() != 'DATALOG':
+        return []
+    nights = sorted(
+        (child for child in children if NIGHT_FOLDER_RE.match(child['path'].name)),
+        key=lambda child: child['path'].name,
+    )
+    older_nights = nights[:len(nights) - recent_nights] if recent_nights > 0 else nights
+    return [
+        child for child in older_nights
+        if child['timestamp'] and manifest.is_folder_synced(child['path'], child['timestamp'])
+    ]
+
+def build_sync_plan(ezshare_instance, tree, force_paths=(), local_stats=None):
+    """
+    Select the files of a remote tree that need to be downloaded.
+
+    :param ezshare_instance: Instance of the main application containing settings and states.
+    :param tree: Tree node as returned by build_remote_tree.
+    :param force_paths: Local paths that are downloaded regardless of the local state.
+    :param local_stats: Optional stat results already taken, as filled by detect_timestamp_skew.
+    :return: List of file entries to download, in traversal order.
+    """
+    return [
+        entry for entry in iter_tree_files(tree)
+        if entry['path'] in force_paths
+        or should_download(ezshare_instance, entry['path'], entry['timestamp'], entry['size'], local_stats)
+    ]
+
+def prioritize_sync_plan(plan, root_path, priority_nights=DEFAULT_PRIORITY_NIGHTS):
+    """
+    Order a sync plan so that the data OSCAR needs for the latest night arrives first.
+
+    The plan is ordered as: card root files matching PRIORITY_FILE_PATTERNS, the newest
+    priority_nights DATALOG night folders, the remaining night folders from newest to
+    oldest, and finally every other file. Files keep their listing order within a group.
+
+    :param plan: List of file entries as returned by build_sync_plan.
+    :param root_path: Local path of the card root.
+    :param priority_nights: Number of newest night folders in the priority set.
+    :return: Tuple of (ordered plan, number of leading entries in the priority set).
+    """
+    nights = sorted(
+        {entry['path'].parent.name for entry in plan if _is_night_file(entry['path'])},
+        reverse=True,
+    )
+    night_rank = {night: rank for rank, night in enumerate(nights)}
+
+    def priority(item):
+        index, entry = item
+        path = entry['path']
+        if path.parent == root_path and any(
+                fnmatch.fnmatch(path.name.lower(), pattern.lower()) for pattern in PRIORITY_FILE_PATTERNS):
+            return 0, 0, index
+        if _is_night_file(path):
+            rank = night_rank[path.parent.name]
+            return 1 if rank < priority_nights else 2, rank, index
+        return 3, 0, index
+
+    keyed = sorted((priority(item), item[1]) for item in enumerate(plan))
+    priority_count = sum(1 for key, _ in keyed if key[0] < 2)
+    return [entry for _, entry in keyed], priority_count
+
+def _is_night_file(path):
+    return bool(NIGHT_FOLDER_RE.match(path.parent.name)) and path.parent.parent.name.upper() == 'DATALOG'
 
 def list_dir(ezshare, url):
     """
@@ -43,23 +265,128 @@ def list_dir(ezshare, url):
     try:
         response = ezshare.session.get(url, timeout=5)
         response.raise_for_status()
-        soup = bs4.BeautifulSoup(response.text, 'html.parser')
-        files, dirs = parse_directory_listing(ezshare, soup)
+        listing = parse_listing_content(ezshare, response.content, response.encoding)
+        if listing is None:
+            logger.debug(f"Falling back to BeautifulSoup for directory listing from {url}")
+            soup = bs4.BeautifulSoup(response.text, 'html.parser')
+            listing = parse_directory_listing(ezshare, soup)
+        files, dirs = listing
         return files, dirs
     except requests.RequestException as e:
         logger.error(f"Error fetching directory listing from {url}: {e}")
         return None, None
 
+def parse_listing_content(ezshare, content, encoding=None):
+    """
+    Parse the raw bytes of an ez Share directory listing without building a document tree.
+
+    Each line of the <pre> block is matched with a precompiled pattern. Markup that does
+    not follow the ez Share layout is left to parse_directory_listing.
+
+    :param ezshare: Instance of the main application containing settings and states.
+    :param content: Raw response body.
+    :param encoding: Encoding reported by the server, UTF-8 when unknown.
+    :return: Tuple of (files, directories), or None if the markup could not be parsed.
+             Files are (name, query, timestamp, size) and directories (name, href, timestamp).
+    """
+    pre_match = _PRE_BLOCK_RE.search(content)
+    if pre_match is None:
+        return None
+
+    encoding = encoding or 'utf-8'
+    tzinfo = getattr(ezshare, 'remote_tzinfo', None)
+    files = []
+    dirs = []
+    for line in pre_match.group(1).split(b'\n'):
+        if b'<a' not in line and b'<A' not in line:
+            continue
+        entry = _LISTING_ENTRY_RE.match(line)
+        if entry is None:
+            return None
+
+        link_text = html.unescape(entry.group('name').decode(encoding, 'replace')).strip()
+        if link_text in ezshare.ignore or link_text.startswith('.'):
+            continue
+
+        link_href = html.unescape(entry.group('href').decode(encoding, 'replace'))
+        link_path, _, link_query = link_href.partition('?')
+        timestamp_match = _LISTING_TIMESTAMP_RE.search(entry.group('prefix'))
+        file_ts = _listing_timestamp(timestamp_match.groups(), tzinfo) if timestamp_match else 0
+        if link_path.endswith('download'):
+            files.append((link_text, link_query.partition('#')[0], file_ts, _listing_size(entry.group('prefix'))))
+        elif link_path.endswith('dir'):
+            dirs.append((link_text, link_href, file_ts))
+
+    return files, dirs
+
+@functools.lru_cache(maxsize=4096)
+def _listing_timestamp(fields, tzinfo=None):
+    """
+    Convert the numeric fields of a listing timestamp to a POSIX timestamp.
+
+    :param fields: Tuple of year, month, day, hour, minute and second as bytes.
+    :param tzinfo: Time zone of the card clock, or None for the local time zone.
+    :return: POSIX timestamp, or 0 if the fields do not form a valid date.
+    """
+    try:
+        return datetime.datetime(*(int(field) for field in fields), tzinfo=tzinfo).timestamp()
+    except ValueError:
+        return 0
+
+def parse_timezone(value):
+    """
+    Resolve the time zone that the card clock is set to.
+
+    :param value: None or 'local' for the local time zone, a UTC offset such as '+01:00'
+                  or 'UTC-5', or an IANA name such as 'Europe/Berlin'.
+    :return: tzinfo object, or None for the local time zone.
+    :raises ValueError: If the value is not a known time zone.
+    """
+    if value is None or value.strip().lower() in ('', 'local'):
+        return None
+    value = value.strip()
+    if value.upper() in ('UTC', 'GMT', 'Z'):
+        return datetime.timezone.utc
+    match = _UTC_OFFSET_RE.match(value)
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes or 0))
+        if offset >= datetime.timedelta(hours=24):
+            raise ValueError(f"UTC offset out of range: '{value}'")
+        return datetime.timezone(-offset if sign == '-' else offset)
+    if zoneinfo is None:
+        raise ValueError(f"Time zone names need Python 3.9 or newer; use a UTC offset instead of '{value}'")
+    try:
+        return zoneinfo.ZoneInfo(value)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown time zone: '{value}'") from None
+
+def _listing_size(prefix):
+    """
+    Get the file size from the text before the link of a listing line.
+
+    :param prefix: Listing line up to the link, as bytes.
+    :return: Size in bytes, or None if the line has no size column or lists it in a coarser unit than KB.
+    """
+    match = _LISTING_SIZE_RE.search(prefix)
+    if match is None:
+        return None
+    unit = _SIZE_UNITS.get(match.group(2).upper())
+    if unit is None:
+        return None
+    return int(match.group(1)) * unit
+
 def parse_directory_listing(ezshare, soup):
     """
     Parse the HTML directory listing to separate files and directories.
 
     :param ezshare: Instance of the main application containing settings and states.
     :param soup: BeautifulSoup object containing the parsed HTML.
-    :return: Tuple of (files, directories).
+    :return: Tuple of (files, directories), shaped as in parse_listing_content.
     """
     files = []
     dirs = []
+    tzinfo = getattr(ezshare, 'remote_tzinfo', None)
     
     # Find the <pre> tag
     pre_tag = soup.find('pre')
@@ -78,7 +405,7 @@ def parse_directory_listing(ezshare, soup):
             modifypart = parts[0].replace('- ', '-0').replace(': ', ':0')  # Fix timestamp formatting
             regex_pattern = r'\d*-\d*-\d*\s*\d*:\d*:\d*'  # Regex pattern to match the timestamp
             match = re.search(regex_pattern, modifypart)  # Search for the timestamp
-            file_ts = datetime.datetime.strptime(match.group(), '%Y-%m-%d %H:%M:%S').timestamp() if match else 0  # Convert to timestamp
+            file_ts = datetime.datetime.strptime(match.group(), '%Y-%m-%d %H:%M:%S').replace(tzinfo=tzinfo).timestamp() if match else 0  # Convert to timestamp
             
             # Parse the line as HTML to extract the link
             soupline = bs4.BeautifulSoup(line, 'html.parser')
@@ -96,129 +423,505 @@ def parse_directory_listing(ezshare, soup):
                 
                 # Check if the link is for a file or directory
                 if parsed_url.path.endswith('download'):
-                    files.append((link_text, parsed_url.query, file_ts))  # Add file to the list
+                    files.append((link_text, parsed_url.query, file_ts, _listing_size(parts[0].encode())))  # Add file to the list
                 elif parsed_url.path.endswith('dir'):
-                    dirs.append((link_text, link_href))  # Add directory to the list
+                    dirs.append((link_text, link_href, file_ts))  # Add directory to the list
     
     return files, dirs
 
-def check_files(ezshare_instance, files, url, dir_path, total_files, processed_files, is_running):
+def check_files(ezshare_instance, plan, total_files, processed_files, is_running, max_workers=1,
+                durability=None, priority_count=0, on_priority_complete=None):
     """
-    Process each file in the list, downloading if necessary.
+    Download each file of the sync plan with up to max_workers concurrent transfers.
+
+    Disk writes for all transfers go through one FileWriter thread, so network reads
+    continue while earlier chunks are written. Progress is reported by bytes through
+    ezshare_instance.update_progress(percent, snapshot) with a TransferProgress
+    snapshot carrying the throughput and ETA.
 
     :param ezshare_instance: Instance of the main application containing settings and states.
-    :param files: List of files to process.
-    :param url: URL of the directory containing the files.
-    :param dir_path: Local directory path to store the files.
+    :param plan: List of file entries to download, as returned by build_sync_plan.
     :param total_files: Total number of files expected to be processed.
     :param processed_files: Count of files already processed.
     :param is_running: Function to check if the process should continue running.
+    :param max_workers: Maximum number of concurrent downloads.
+    :param durability: Optional SyncDurability deciding when written files are flushed to disk.
+    :param priority_count: Number of leading plan entries that form the priority set.
+    :param on_priority_complete: Optional function called once every priority entry is downloaded.
     :return: Updated count of processed files.
     """
-    for filename, file_url, file_ts in files:
+    progress_lock = threading.Lock()
+    counts = {'started': processed_files, 'processed': processed_files, 'priority': priority_count}
+    priority_ids = {id(entry) for entry in plan[:priority_count]}
+    progress = TransferProgress(
+        sum(entry.get('size') or 0 for entry in plan), total_files, processed_files,
+        unsized_files=sum(1 for entry in plan if entry.get('size') is None),
+        report=lambda snapshot: ezshare_instance.update_progress(snapshot.percent, snapshot),
+    )
+
+    def transfer(entry):
         if not is_running():
-            ezshare_instance.update_status('Process cancelled.', 'info')
-            break
+            return False
+
+        local_path = entry['path']
+        local_path.parent.mkdir(parents=True, exist_ok=True)
+        with progress_lock:
+            counts['started'] += 1
+            position = counts['started']
+        progress_msg = f'Downloading file "{entry["name"]}" {position}/{total_files}'
+        ezshare_instance.update_status(progress_msg + (f" ({int(position / total_files * 100)}%)" if total_files else " (0%)"))
+        fsync = durability is None or durability.fsync_each_file
+        file_progress = progress.file(entry.get('size'))
+        if not download_file(ezshare_instance, entry['url'], local_path, entry['timestamp'], fsync=fsync,
+                             writer=writer, progress=file_progress.add):
+            file_progress.finish(False)
+            return False
+
+        if durability is not None:
+            durability.file_written(local_path)
+        record_download(ezshare_instance, local_path, entry['timestamp'])
+        file_progress.finish(True)
+        with progress_lock:
+            counts['processed'] += 1
+            if id(entry) in priority_ids:
+                counts['priority'] -= 1
+                priority_complete = counts['priority'] == 0
+            else:
+                priority_complete = False
+        if priority_complete and on_priority_complete is not None:
+            on_priority_complete()
+        return True
+
+    max_workers = max(1, max_workers)
+    with FileWriter(CHUNK_SIZE_MAX, BUFFERS_PER_DOWNLOAD * max_workers) as writer, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ezShareDownload') as executor:
+        for _ in executor.map(transfer, plan):
+            pass
 
-        local_path = dir_path / filename
-        absolute_file_url = urllib.parse.urljoin(url, 'download?' + file_url)
-        
-        if should_download(ezshare_instance, local_path, file_ts):
-            progress_msg = f'Downloading file "{filename}" {processed_files + 1}/{total_files}'
-            ezshare_instance.update_status(progress_msg + (f" ({int((processed_files + 1) / total_files * 100)}%)" if total_files else " (0%)"))
-            if download_file(ezshare_instance, absolute_file_url, local_path, file_ts):
-                processed_files += 1
-                progress_value = (processed_files / total_files) * 100
-                ezshare_instance.update_progress(min(max(0, progress_value), 100))
-    return processed_files
+    if not is_running():
+        ezshare_instance.update_status('Process cancelled.', 'info')
+    return counts['processed']
 
-def should_download(ezshare_instance, local_path, file_ts):
+def should_download(ezshare_instance, local_path, file_ts, file_size=None, local_stats=None):
     """
-    Determine if a file should be downloaded based on its timestamp and existence.
+    Determine if a file should be downloaded based on its existence, size and timestamp.
+
+    A local copy whose size differs from the listed remote size, such as a truncated
+    download, is fetched again even when its timestamp is current. Timestamps only count
+    as newer when they differ by more than the time_tolerance setting. Files recorded in
+    the sync manifest are decided from the manifest alone. Other files, or every file
+    when verify_local is set, are checked with a single stat call and adopted into the
+    manifest when the local copy is already current.
 
     :param ezshare_instance: Instance of the main application containing settings and states.
     :param local_path: Local file path.
     :param file_ts: Timestamp of the remote file.
+    :param file_size: Size of the remote file from the listing, or None if unknown.
+    :param local_stats: Optional mapping of local paths to stat results already taken, with
+                        None for paths that are not regular files; other paths are checked on disk.
     :return: True if the file should be downloaded, False otherwise.
     """
-    return not (local_path.is_file() and not (ezshare_instance.overwrite or local_path.stat().st_mtime < file_ts) and not ezshare_instance.keep_old)
+    if ezshare_instance.overwrite or ezshare_instance.keep_old:
+        return True
+
+    newer_than = file_ts - ezshare_instance.time_tolerance
+    manifest = ezshare_instance.manifest
+    if manifest is not None and not ezshare_instance.verify_local:
+        record = manifest.lookup(local_path)
+        if record is not None:
+            return not size_matches(record.size, file_size) or record.remote_ts < newer_than
+
+    if local_stats is not None and local_path in local_stats:
+        local_stat = local_stats[local_path]
+    else:
+        local_stat = _stat_regular_file(local_path)
+    if local_stat is None or not size_matches(local_stat.st_size, file_size) or local_stat.st_mtime < newer_than:
+        return True
+    if manifest is not None:
+        manifest.record(local_path, file_ts, local_stat.st_size, local_stat.st_mtime)
+    return False
+
+def detect_timestamp_skew(ezshare_instance, entries, local_stats=None):
+    """
+    Detect remote timestamps that all moved by the same amount.
+
+    A changed host time zone, a daylight saving switch or a reset card clock shifts
+    every listed timestamp by the same whole number of quarter hours, which would make
+    every file look newer. Local copies are compared with the manifest, or on disk when
+    no manifest is used or verify_local is set; copies whose size differs are ignored.
+
+    :param ezshare_instance: Instance of the main application containing settings and states.
+    :param entries: File entries of the remote tree.
+    :param local_stats: Optional dict that receives the stat result of every local copy
+                        checked on disk, so that should_download can reuse it.
+    :return: Tuple of (offset in seconds, entries shifted by that offset), or (0, []) if
+             the timestamps are not uniformly shifted forward.
+    """
+    manifest = ezshare_instance.manifest
+    use_manifest = manifest is not None and not ezshare_instance.verify_local
+    offsets = []
+    for entry in entries:
+        if not entry['timestamp']:
+            continue
+        record = manifest.lookup(entry['path']) if use_manifest else None
+        if record is not None:
+            local_ts, local_size = record.remote_ts, record.size
+        else:
+            local_stat = _stat_regular_file(entry['path'])
+            if local_stats is not None:
+                local_stats[entry['path']] = local_stat
+            if local_stat is None:
+                continue
+            local_ts, local_size = local_stat.st_mtime, local_stat.st_size
+        if size_matches(local_size, entry['size']):
+            offsets.append((entry, entry['timestamp'] - local_ts))
+
+    if len(offsets) < SKEW_MIN_FILES:
+        return 0, []
+    offset = round(statistics.median(delta for _, delta in offsets) / SKEW_GRANULARITY) * SKEW_GRANULARITY
+    if offset <= 0:
+        return 0, []
+    tolerance = ezshare_instance.time_tolerance
+    shifted = [entry for entry, delta in offsets if abs(delta - offset) <= tolerance]
+    if len(shifted) < SKEW_MIN_SHARE * len(offsets):
+        return 0, []
+    return offset, shifted
+
+def rebase_local_timestamps(ezshare_instance, entries):
+    """
+    Move the modification time of local copies to the listed remote timestamps.
+
+    :param ezshare_instance: Instance of the main application containing settings and states.
+    :param entries: File entries whose local copies are current apart from their timestamp.
+    :return: Number of local copies that were updated.
+    """
+    rebased = 0
+    for entry in entries:
+        file_ts = entry['timestamp']
+        try:
+            os.utime(entry['path'], (file_ts, file_ts))
+        except OSError as e:
+            logger.warning(f"Could not update timestamp of {entry['path']}: {e}")
+            continue
+        record_download(ezshare_instance, entry['path'], file_ts)
+        rebased += 1
+    return rebased
+
+def size_matches(local_size, remote_size):
+    """
+    Compare a local file size with the size shown in the remote listing.
+
+    :param local_size: Size of the local copy in bytes, or None if unknown.
+    :param remote_size: Listed remote size in bytes, or None if unknown.
+    :return: True unless both sizes are known and differ by more than LISTING_SIZE_TOLERANCE.
+    """
+    if local_size is None or remote_size is None:
+        return True
+    return abs(local_size - remote_size) <= LISTING_SIZE_TOLERANCE
+
+def _stat_regular_file(path):
+    try:
+        path_stat = path.stat()
+    except OSError:
+        return None
+    return path_stat if stat.S_ISREG(path_stat.st_mode) else None
+
+def record_download(ezshare_instance, local_path, file_ts):
+    """
+    Add a freshly downloaded file to the sync manifest, if one is open.
 
-def download_file(ezshare_instance, url, file_path, file_ts=None):
+    :param ezshare_instance: Instance of the main application containing settings and states.
+    :param local_path: Local file path that was written.
+    :param file_ts: Timestamp of the remote file.
+    """
+    manifest = ezshare_instance.manifest
+    if manifest is None:
+        return
+    local_stat = _stat_regular_file(local_path)
+    if local_stat is not None:
+        manifest.record(local_path, file_ts, local_stat.st_size, local_stat.st_mtime)
+
+def download_file(ezshare_instance, url, file_path, file_ts=None, fsync=True, writer=None, progress=None):
     """
     Download a file from the given URL and save it locally.
 
+    Data is streamed into a stable <name>.part file next to the target, with a
+    <name>.part.json sidecar recording the URL, expected size and timestamp. When a
+    transfer breaks off, the next attempt or a later run continues from the last byte
+    with an HTTP Range request and falls back to a full download if the server
+    ignores the range.
+
+    Incomplete .part files are always flushed to disk. A complete file is only
+    flushed before it replaces the target when fsync is set; otherwise the caller
+    is responsible for flushing it later.
+
+    With a FileWriter, the data, flush, rename and timestamp are handled on the
+    writer thread while this thread keeps reading from the network.
+
     :param ezshare_instance: Instance of the main application containing settings and states.
     :param url: URL of the file to download.
     :param file_path: Local path where the file should be saved.
     :param file_ts: Optional timestamp to set on the downloaded file.
+    :param fsync: Flush the complete file to disk before it replaces the target.
+    :param writer: Optional FileWriter that performs the disk writes.
+    :param progress: Optional function called with the size of every chunk received.
     :return: True if the file was downloaded successfully, False otherwise.
     """
+    timings = getattr(ezshare_instance, 'timings', NULL_TIMINGS)
+    _emit_event(ezshare_instance, 'file_started', path=str(file_path), url=url)
+    started = time.perf_counter()
+    with timings.phase('download') as phase:
+        downloaded, received = _download_file(ezshare_instance, url, file_path, file_ts, fsync, writer, progress)
+        phase.bytes = received
+    _emit_event(
+        ezshare_instance, 'file_finished', path=str(file_path), success=downloaded, bytes=received,
+        duration_ms=round((time.perf_counter() - started) * 1000, 3),
+    )
+    return downloaded
+
+
+def _emit_event(ezshare_instance, name, **fields):
+    emit_event = getattr(ezshare_instance, 'emit_event', None)
+    if emit_event is not None:
+        emit_event(name, **fields)
+
+
+def _download_file(ezshare_instance, url, file_path, file_ts, fsync, writer, progress):
+    """Download a file as described in download_file; returns (success, bytes received over the network)."""
+    part_path = file_path.with_name(file_path.name + PART_SUFFIX)
+    info_path = file_path.with_name(file_path.name + PART_INFO_SUFFIX)
     max_retries = ezshare_instance.retries
     retries = max_retries
+    transferred = 0
     while retries > 0:
-        tmp_file_path = None
-        cancelled = False
         try:
-            response = ezshare_instance.session.get(url, stream=True, timeout=5)
+            offset = _resume_offset(part_path, info_path, url, file_ts)
+            # Ask for the body as stored, so that Content-Length and Range count the bytes of the file.
+            headers = {'Accept-Encoding': 'identity'}
+            if offset:
+                headers['Range'] = f'bytes={offset}-'
+            response = ezshare_instance.session.get(url, stream=True, timeout=5, headers=headers)
+            if offset and response.status_code == 416:
+                logger.info('Server rejected resume of %s, downloading it again.', str(file_path))
+                response.close()
+                _discard_part(part_path, info_path)
+                continue
             response.raise_for_status()
 
-            total_size = int(response.headers.get('content-length', 0))
-            if total_size == 0:
+            # A server that encodes the body anyway cannot be resumed: ranges and Content-Length
+            # then count encoded bytes, while the decoded body is what gets written.
+            encoded = bool(response.headers.get('content-encoding'))
+            if encoded and offset:
+                logger.info('Server sent an encoded body for the resume of %s, downloading it again.',
+                            str(file_path))
+                response.close()
+                _discard_part(part_path, info_path)
+                continue
+
+            if offset and response.status_code == 206:
+                total_size = _content_range_total(response, offset)
+                if total_size is None:
+                    # A fragment from anywhere else cannot be appended or stand in for the whole file.
+                    logger.info('Server answered resume of %s with a different range, downloading it again.',
+                                str(file_path))
+                    response.close()
+                    _discard_part(part_path, info_path)
+                    continue
+                logger.info('Resuming download of %s at byte %d', str(file_path), offset)
+                mode = 'ab'
+            elif response.status_code == 200:
+                if offset:
+                    logger.info('Server ignored range request for %s, downloading it again.', str(file_path))
+                total_size = int(response.headers.get('content-length', 0))
+                mode = 'wb'
+            else:
+                response.close()
+                raise IOError(f'unexpected HTTP status {response.status_code}')
+
+            if total_size == 0 and not encoded:
                 logger.warning('File %s has zero total size, skipping progress update.', str(file_path))
+                _discard_part(part_path, info_path)
                 with file_path.open('wb') as f:
                     pass
-                return True
-
-            with NamedTemporaryFile(delete=False, dir=file_path.parent) as tmp_file:
-                tmp_file_path = pathlib.Path(tmp_file.name)
-                for data in response.iter_content(1024):
-                    if not ezshare_instance._is_running:
-                        logger.info('Cancelling download of %s', str(file_path))
-                        cancelled = True
-                        break
-                    tmp_file.write(data)
-                tmp_file.flush()
-                os.fsync(tmp_file.fileno())
+                return True, transferred
+
+            if encoded:
+                info_path.unlink(missing_ok=True)
+            else:
+                _write_part_info(info_path, url, total_size, file_ts)
+            job = writer.open(part_path, mode) if writer is not None else DirectWriteJob(part_path, mode, CHUNK_SIZE_MAX)
+            try:
+                cancelled = not _stream_to_file(ezshare_instance, response, job, progress)
+            except Exception:
+                try:
+                    job.close()
+                except OSError:
+                    pass
+                raise
+            received = (offset if mode == 'ab' else 0) + job.submitted
+            transferred += job.submitted
+            if encoded:
+                wire_bytes = _wire_bytes(response)
+                complete = not cancelled and (not total_size or wire_bytes is None or wire_bytes == total_size)
+            else:
+                complete = not cancelled and received == total_size
+            job.close(
+                fsync=fsync or not complete,
+                replace=file_path if complete else None,
+                file_ts=file_ts,
+            )
 
             if cancelled:
-                tmp_file_path.unlink(missing_ok=True)
-                return False
+                logger.info('Cancelling download of %s', str(file_path))
+                if received == 0:
+                    _discard_part(part_path, info_path)
+                return False, transferred
 
-            tmp_file_path.replace(file_path)
-            tmp_file_path = None
+            if not complete:
+                if encoded:
+                    _discard_part(part_path, info_path)
+                    raise IOError(f'received {wire_bytes} of {total_size} encoded bytes')
+                if received > total_size:
+                    _discard_part(part_path, info_path)
+                raise IOError(f'received {received} of {total_size} bytes')
+
+            info_path.unlink(missing_ok=True)
             logger.info('%s written', str(file_path))
-            if file_ts:
-                os.utime(file_path, (file_ts, file_ts))
-            return True  # Successful download
+            return True, transferred  # Successful download
         except Exception as e:
-            if tmp_file_path:
-                tmp_file_path.unlink(missing_ok=True)
+            # The .part file is kept so that the next attempt can resume it.
             retries -= 1
             logger.error(f'Error downloading file {file_path}: {e}. Retries left: {retries}')
+            _emit_event(
+                ezshare_instance, 'retry', stage='download', path=str(file_path), error=str(e), retries_left=retries,
+            )
             if retries == 0:
-                return False  # Return False after all retries have been exhausted
+                return False, transferred  # Return False after all retries have been exhausted
             else:
                 time.sleep(ezshare_instance.connection_delay)  # Wait before retrying
-def check_dirs(ezshare_instance, dirs, url, dir_path, total_files, processed_files, is_running):
+    return False, transferred
+
+def _stream_to_file(ezshare_instance, response, job, progress=None):
     """
-    Recursively process each directory in the list.
+    Copy a streamed response body into a write job.
+
+    The body is read into buffers handed out by the job, with a usable size that adapts
+    to the observed throughput: reads that fill quickly grow the chunk, slow reads shrink
+    it so that cancellation stays responsive. Cancellation is checked at most every
+    CANCEL_CHECK_INTERVAL seconds instead of once per chunk. Responses that cannot be
+    read into a buffer, such as compressed bodies, fall back to iter_content.
 
     :param ezshare_instance: Instance of the main application containing settings and states.
-    :param dirs: List of directories to process.
-    :param url: URL of the current directory being processed.
-    :param dir_path: Local directory path to store files.
-    :param total_files: Total number of files expected to be processed.
-    :param processed_files: Count of files already processed.
-    :param is_running: Function to check if the process should continue running.
-    :return: Updated count of processed files.
+    :param response: Streaming response to read from.
+    :param job: WriteJob or DirectWriteJob receiving the data.
+    :param progress: Optional function called with the size of every chunk received.
+    :return: True if the whole body was written, False if the process was cancelled.
     """
-    for dirname, dir_url in dirs:
-        if not is_running():
-            ezshare_instance.update_status('Process cancelled.', 'info')
-            break
-
-        new_dir_path = dir_path / dirname
-        new_dir_path.mkdir(exist_ok=True)
-        absolute_dir_url = urllib.parse.urljoin(url, dir_url)
-        processed_files = recursive_traversal(ezshare_instance, absolute_dir_url, new_dir_path, total_files, processed_files, is_running)
-    return processed_files
+    def is_running():
+        return ezshare_instance._is_running
+
+    raw = getattr(response, 'raw', None)
+    if raw is None or not hasattr(raw, 'readinto') or response.headers.get('content-encoding'):
+        for data in response.iter_content(CHUNK_SIZE_MIN):
+            data = memoryview(data)
+            while data:
+                if not is_running():
+                    return False
+                buffer = job.buffer(is_running)
+                if buffer is None:
+                    return False
+                length = min(len(data), len(buffer))
+                buffer[:length] = data[:length]
+                job.write(buffer, length)
+                if progress is not None:
+                    progress(length)
+                data = data[length:]
+        return True
+
+    chunk_size = CHUNK_SIZE_MIN
+    next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+    while True:
+        buffer = job.buffer(is_running)
+        if buffer is None:
+            return False
+        started = time.monotonic()
+        try:
+            received = raw.readinto(buffer[:chunk_size])
+        except BaseException:
+            job.write(buffer, 0)
+            raise
+        job.write(buffer, received)
+        if not received:
+            return True
+        if progress is not None:
+            progress(received)
+
+        now = time.monotonic()
+        elapsed = now - started
+        if received == chunk_size and elapsed < CHUNK_FAST_READ:
+            chunk_size = min(chunk_size * 2, CHUNK_SIZE_MAX)
+        elif elapsed > CHUNK_SLOW_READ:
+            chunk_size = max(chunk_size // 2, CHUNK_SIZE_MIN)
+        if now >= next_cancel_check:
+            if not ezshare_instance._is_running:
+                return False
+            next_cancel_check = now + CANCEL_CHECK_INTERVAL
+
+def _wire_bytes(response):
+    """Get the number of body bytes read from the connection before decoding, or None if unknown."""
+    tell = getattr(getattr(response, 'raw', None), 'tell', None)
+    if tell is None:
+        return None
+    try:
+        return tell()
+    except (OSError, ValueError):
+        return None
+
+def _resume_offset(part_path, info_path, url, file_ts):
+    """
+    Get the number of bytes of a partial download that can be resumed.
+
+    A partial file is only resumed when its sidecar was written for the same URL and
+    remote timestamp; anything else is discarded.
+    """
+    info = _read_part_info(info_path)
+    if info is None or info.get('url') != url or info.get('timestamp') != file_ts:
+        _discard_part(part_path, info_path)
+        return 0
+    try:
+        return part_path.stat().st_size
+    except OSError:
+        return 0
+
+def _read_part_info(info_path):
+    try:
+        with info_path.open('r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_part_info(info_path, url, total_size, file_ts):
+    with info_path.open('w', encoding='utf-8') as f:
+        json.dump({'url': url, 'size': total_size, 'timestamp': file_ts}, f)
+
+def discard_partial_download(file_path):
+    """Remove the .part file and sidecar kept for an interrupted download of file_path."""
+    _discard_part(file_path.with_name(file_path.name + PART_SUFFIX),
+                  file_path.with_name(file_path.name + PART_INFO_SUFFIX))
+
+def _discard_part(part_path, info_path):
+    part_path.unlink(missing_ok=True)
+    info_path.unlink(missing_ok=True)
+
+def _content_range_total(response, offset):
+    """
+    Get the full file size from a 206 response that continues at the given offset.
+
+    :return: Total size in bytes, or None if the response does not start at offset.
+    """
+    match = _CONTENT_RANGE_RE.match(response.headers.get('content-range', ''))
+    if match is None or int(match.group(1)) != offset:
+        return None
+    if match.group(3) != '*':
+        return int(match.group(3))
+    return int(match.group(2)) + 1
@@ -0,0 +1,185 @@
+# file_writer.py
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Write buffers per concurrent download; together they bound the data waiting for the disk.
+BUFFERS_PER_DOWNLOAD = 4
+# Seconds between cancellation checks while waiting for a free buffer.
+BUFFER_WAIT_INTERVAL = 0.2
+
+
+class FileWriter:
+    """
+    Dedicated thread that writes downloaded data to disk.
+
+    Download threads fill buffers taken from a fixed pool and queue them for writing,
+    so the next network read overlaps with the disk write of the previous chunk. A
+    download that runs ahead of the disk waits for a buffer to come back to the pool,
+    which keeps memory bounded. Tasks run in the order they were queued, so the data,
+    flush, rename and timestamp of each file are applied in sequence.
+    """
+
+    def __init__(self, buffer_size, buffer_count):
+        self.buffer_size = buffer_size
+        self._free_buffers = queue.Queue()
+        for _ in range(max(1, buffer_count)):
+            self._free_buffers.put(bytearray(buffer_size))
+        self._tasks = queue.Queue()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='ezShareWriter', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """Write everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._tasks.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def open(self, path, mode):
+        """
+        Start writing a file on the writer thread.
+
+        :param path: Path of the file to write.
+        :param mode: 'wb' to start the file from scratch, 'ab' to append to it.
+        :return: WriteJob receiving the data of the file.
+        """
+        return WriteJob(self, path, mode)
+
+    def _run(self):
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                return
+            try:
+                task()
+            except Exception as e:
+                logger.error(f'Unexpected error in file writer: {e}')
+
+
+class WriteJob:
+    """Data of one file queued on a FileWriter."""
+
+    def __init__(self, writer, path, mode):
+        self.writer = writer
+        self.path = path
+        self.submitted = 0
+        self.error = None
+        self._file = None
+        writer._tasks.put(lambda: self._open(mode))
+
+    def buffer(self, is_running):
+        """
+        Take a free buffer from the pool, waiting while all buffers are queued for writing.
+
+        :param is_running: Function to check if the process should continue running.
+        :return: Writable memoryview, or None if the process was cancelled while waiting.
+        """
+        while True:
+            try:
+                return memoryview(self.writer._free_buffers.get(timeout=BUFFER_WAIT_INTERVAL))
+            except queue.Empty:
+                if not is_running():
+                    return None
+
+    def write(self, buffer, length):
+        """
+        Queue the first length bytes of a buffer from buffer() for writing.
+
+        The buffer returns to the pool once written. Raises the error of an earlier
+        write so that a failing disk stops the download early.
+        """
+        if self.error is not None:
+            self.writer._free_buffers.put(buffer.obj)
+            raise self.error
+        self.submitted += length
+        self.writer._tasks.put(lambda: self._write(buffer, length))
+
+    def close(self, fsync=True, replace=None, file_ts=None):
+        """
+        Close the file once every queued write is done.
+
+        :param fsync: Flush the file to disk before closing it.
+        :param replace: Optional path that the file atomically replaces after closing.
+        :param file_ts: Optional timestamp set on the replaced file.
+        :raises OSError: If writing, flushing or replacing the file failed.
+        """
+        future = Future()
+        self.writer._tasks.put(lambda: self._close(future, fsync, replace, file_ts))
+        future.result()
+
+    def _open(self, mode):
+        try:
+            self._file = self.path.open(mode)
+        except OSError as e:
+            self.error = e
+
+    def _write(self, buffer, length):
+        try:
+            if self.error is None:
+                self._file.write(buffer[:length])
+        except OSError as e:
+            self.error = e
+        finally:
+            self.writer._free_buffers.put(buffer.obj)
+
+    def _close(self, future, fsync, replace, file_ts):
+        try:
+            _finish_file(self._file, self.path, self.error, fsync, replace, file_ts)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(None)
+
+
+class DirectWriteJob:
+    """WriteJob counterpart that writes on the calling thread through one reusable buffer."""
+
+    def __init__(self, path, mode, buffer_size):
+        self.path = path
+        self.submitted = 0
+        self._buffer = memoryview(bytearray(buffer_size))
+        self._file = path.open(mode)
+
+    def buffer(self, is_running):
+        return self._buffer
+
+    def write(self, buffer, length):
+        self.submitted += length
+        self._file.write(buffer[:length])
+
+    def close(self, fsync=True, replace=None, file_ts=None):
+        _finish_file(self._file, self.path, None, fsync, replace, file_ts)
+
+
+def _finish_file(file, path, error, fsync, replace, file_ts):
+    if file is None:
+        raise error
+    try:
+        if error is None:
+            file.flush()
+            if fsync:
+                os.fsync(file.fileno())
+    finally:
+        file.close()
+    if error is not None:
+        raise error
+    if replace is not None:
+        path.replace(replace)
+        if file_ts:
+            os.utime(replace, (file_ts, file_ts))
@@ -92,7 +92,9 @@ class FolderSelectorDialog:
                 raise RuntimeError("Failed to connect or process was canceled.")
 
             # Verify the connection
-            if not self.connection_manager.verify_connection():
+            if not self.connection_manager.verify_connection(
+                is_running=lambda: not self.stop_thread and self.main_window.is_running
+            ):
                 raise RuntimeError("Failed to verify Wi-Fi connection.")
 
             self.main_window.main_window.after(0, lambda: update_status(self.main_window, 'Connected to ez Share Wi-Fi.'))
@@ -134,11 +136,11 @@ class FolderSelectorDialog:
         files, dirs = list_dir(self.ezshare, url)
 
         # Store files
-        for filename, file_url, _ in files:
+        for filename, file_url, _, _ in files:
             contents["files"].append((filename, file_url))
 
         # Recursively fetch and store directories
-        for dirname, dir_url in dirs:
+        for dirname, dir_url, _ in dirs:
             absolute_dir_url = urllib.parse.urljoin(url, dir_url)
             contents["dirs"][dirname] = self._fetch_directory_contents(absolute_dir_url)
 
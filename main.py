@@ -45,6 +45,13 @@ from status_manager import update_status
 from utils import ensure_and_check_disk_access, resource_path, initialize_button_states, set_default_button_states, set_process_button_states, get_button_state, get_oscar_version
 from worker import EzShareWorker
 
+# Milliseconds between checks of the worker queue while messages arrive; the interval
+# doubles up to WORKER_QUEUE_IDLE_INTERVAL while the worker has nothing to report.
+WORKER_QUEUE_INTERVAL = 50
+WORKER_QUEUE_IDLE_INTERVAL = 500
+# Messages taken from the worker queue per check, so that a backlog cannot stall the window.
+WORKER_QUEUE_BATCH_LIMIT = 1000
+
 class EzShareCPAPUI:
     def __init__(self, master=None):
         # Initialize button states
@@ -56,8 +63,11 @@ class EzShareCPAPUI:
         self.ezshare = ezShare()
         self.worker = None
         self.worker_queue = queue.Queue()
+        self.worker_queue_interval = WORKER_QUEUE_INTERVAL
         self.is_running = False
         self.status_timer = None
+        # Set when OSCAR was launched for the latest night, so the sync does not launch it again.
+        self.oscar_imported_early = False
 
         self.builder = pygubu.Builder()
         self.builder.add_from_file(resource_path('ezShareCPAP.ui'))
@@ -148,23 +158,60 @@ class EzShareCPAPUI:
             logging.info("Resetting status to 'Ready.'")
             self.update_status('Ready.', 'info')
 
+    def watch_worker_queue(self):
+        """Start checking the worker queue for a newly started worker."""
+        self.worker_queue_interval = WORKER_QUEUE_INTERVAL
+        self.main_window.after(self.worker_queue_interval, self.process_worker_queue)
+
     def process_worker_queue(self):
-        try:
-            msg = self.worker_queue.get_nowait()
+        """
+        Handle everything the worker queued since the last check.
+
+        Progress values are coalesced into the latest one and status messages into the
+        most recent of each type. Other messages are handled in order, after the updates
+        queued before them. The next check follows after WORKER_QUEUE_INTERVAL when
+        messages arrived and backs off towards WORKER_QUEUE_IDLE_INTERVAL otherwise.
+        """
+        progress = None
+        statuses = {}
+        handled = 0
+        while handled < WORKER_QUEUE_BATCH_LIMIT:
+            try:
+                msg = self.worker_queue.get_nowait()
+            except queue.Empty:
+                break
+            handled += 1
             if msg[0] == 'progress':
-                self.builder.get_object('progress_bar')['value'] = msg[1]
+                progress = msg[1]
             elif msg[0] == 'status':
-                self.update_status(msg[1], msg[2])
-            elif msg[0] == 'no_files':
-                self.handle_no_files()
-            elif msg[0] == 'finished':
-                success = msg[1]
-                self.process_finished(success)
-        except queue.Empty:
-            pass  # No message to process, continue normally
-
+                # Re-insert so that the statuses are shown in the order of their latest message.
+                statuses.pop(msg[2], None)
+                statuses[msg[2]] = msg[1]
+            elif msg[0] in ('no_files', 'priority_complete', 'finished'):
+                self._apply_worker_updates(progress, statuses)
+                progress = None
+                statuses = {}
+                if msg[0] == 'no_files':
+                    self.handle_no_files()
+                elif msg[0] == 'priority_complete':
+                    self.handle_priority_complete()
+                else:
+                    success = msg[1]
+                    self.process_finished(success)
+        self._apply_worker_updates(progress, statuses)
+
+        if handled:
+            self.worker_queue_interval = WORKER_QUEUE_INTERVAL
+        else:
+            self.worker_queue_interval = min(self.worker_queue_interval * 2, WORKER_QUEUE_IDLE_INTERVAL)
         if self.is_running:
-            self.main_window.after(100, self.process_worker_queue)
+            self.main_window.after(self.worker_queue_interval, self.process_worker_queue)
+
+    def _apply_worker_updates(self, progress, statuses):
+        if progress is not None:
+            self.builder.get_object('progress_bar')['value'] = progress
+        for message_type, message in statuses.items():
+            self.update_status(message, message_type)
 
     def process_finished(self, success=True):
         logging.info("Process finished")
@@ -188,17 +235,18 @@ class EzShareCPAPUI:
         self.update_status('Process failed or was canceled.', 'error')
 
     def prompt_completion_tasks(self):
+        import_oscar = self.import_oscar_var.get() and not self.oscar_imported_early
         tasks = []
         if self.quit_var.get():
             tasks.append('Quit the application')
-        if self.import_oscar_var.get():
+        if import_oscar:
             tasks.append('Import data into OSCAR')
 
         if tasks:
             tasks_str = ' and '.join(tasks)
             msg = messagebox.askyesno('Completion Tasks', f'Do you want to {tasks_str}?')
             if msg:
-                if self.import_oscar_var.get():
+                if import_oscar:
                     self.callbacks.import_cpap_data_with_oscar()
                 if self.quit_var.get():
                     self.main_window.quit()
@@ -206,6 +254,20 @@ class EzShareCPAPUI:
             # If neither task is selected, do nothing
             pass
 
+    def handle_priority_complete(self):
+        logging.info("Summary files and latest night transferred.")
+        if not self.import_oscar_var.get():
+            return
+        msg = messagebox.askyesno(
+            'Latest Night Ready',
+            'The summary files and the latest night are downloaded. Older data is still downloading.\n\n'
+            'Do you want to import data into OSCAR now?'
+        )
+        if msg:
+            # The import checkbox is disabled while the sync runs, so skip its button check.
+            self.oscar_imported_early = True
+            self.callbacks.run_oscar_import()
+
     def handle_no_files(self):
         logging.info("No new files to transfer.")
         self.is_running = False
@@ -231,6 +293,7 @@ class EzShareCPAPUI:
     def start_worker(self):
         # Create and start the worker thread with the current app context
         logging.info("Starting new worker thread.")
+        self.oscar_imported_early = False
         self.worker = EzShareWorker(self.ezshare, self.worker_queue, name="EzShareWorkerThread", app=self)  # Pass self as app
         self.worker.start()
 
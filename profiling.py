@@ -0,0 +1,110 @@
+# profiling.py
+import cProfile
+import io
+import linecache
+import logging
+import pathlib
+import pstats
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Functions listed in the text summaries of a CPU profile.
+PROFILE_SUMMARY_LIMIT = 60
+# Source lines listed per memory snapshot.
+MEMORY_SUMMARY_LIMIT = 25
+# Stack frames stored per traced allocation; one frame keeps tracing cheap on big cards.
+MEMORY_TRACE_FRAMES = 1
+
+
+def run_profiled(path, func, *args, **kwargs):
+    """
+    Run a function under cProfile and save the profile.
+
+    The raw statistics go to path and a text summary sorted by cumulative and by
+    internal time to the same path with a .txt suffix.
+
+    :param path: Target of the pstats file.
+    :return: Return value of func.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        save_profile(profiler, path)
+
+
+def save_profile(profiler, path):
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(path))
+    summary = io.StringIO()
+    for sort_key in ('cumulative', 'tottime'):
+        summary.write(f'Sorted by {sort_key}:\n')
+        pstats.Stats(profiler, stream=summary).strip_dirs().sort_stats(sort_key).print_stats(PROFILE_SUMMARY_LIMIT)
+    path.with_suffix('.txt').write_text(summary.getvalue(), encoding='utf-8')
+    logger.info(f'Saved CPU profile to {path}')
+
+
+class MemoryProfiler:
+    """
+    tracemalloc snapshots taken at named points of a sync.
+
+    Each snapshot records the memory traced at that point and the peak since the
+    previous snapshot. The report lists the source lines holding the most memory at
+    every snapshot and what grew between consecutive snapshots.
+    """
+
+    def __init__(self, path):
+        self.path = pathlib.Path(path)
+        self.snapshots = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+
+    def snapshot(self, label):
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, linecache.__file__),
+        ))
+        self.snapshots.append((label, current, peak, snapshot))
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+
+    def stop(self):
+        if not tracemalloc.is_tracing():
+            return
+        tracemalloc.stop()
+        self.save()
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(self.format_report(), encoding='utf-8')
+        logger.info(f'Saved memory profile to {self.path}')
+
+    def format_report(self):
+        lines = []
+        previous = None
+        for label, current, peak, snapshot in self.snapshots:
+            lines.append(f'== {label}: {current / 1024:.1f} KiB traced, peak {peak / 1024:.1f} KiB ==')
+            for stat in snapshot.statistics('lineno')[:MEMORY_SUMMARY_LIMIT]:
+                lines.append(str(stat))
+            if previous is not None:
+                lines.append(f'-- growth since {previous[0]} --')
+                for stat in snapshot.compare_to(previous[1], 'lineno')[:MEMORY_SUMMARY_LIMIT]:
+                    lines.append(str(stat))
+            lines.append('')
+            previous = (label, snapshot)
+        if not self.snapshots:
+            lines.append('No snapshots were taken; the sync ended before the scan finished.')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,130 @@
+# sync_manifest.py
+import collections
+import logging
+import pathlib
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR_NAME = '.ezShareCPAP'
+MANIFEST_FILE_NAME = 'manifest.sqlite3'
+
+# Pending records are written to disk once this many have accumulated.
+FLUSH_THRESHOLD = 100
+
+ManifestRecord = collections.namedtuple('ManifestRecord', ['remote_ts', 'size', 'local_mtime'])
+
+
+def get_state_dir(sync_path):
+    """Get the directory that holds ezShareCPAP bookkeeping for a sync path."""
+    return pathlib.Path(sync_path) / STATE_DIR_NAME
+
+
+class SyncManifest:
+    """
+    Record of every file downloaded into a sync path.
+
+    The manifest lives in a SQLite database inside the sync path and is loaded into
+    memory when opened, so skip decisions are a dictionary lookup instead of a stat
+    call per local file.
+    """
+
+    def __init__(self, sync_path):
+        self.sync_path = pathlib.Path(sync_path)
+        self.path = get_state_dir(self.sync_path) / MANIFEST_FILE_NAME
+        self.lock = threading.Lock()
+        self.records = {}
+        self.folders = {}
+        self._pending = {}
+        self._connection = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS files ('
+            'remote_path TEXT PRIMARY KEY, '
+            'remote_ts REAL NOT NULL, '
+            'size INTEGER, '
+            'local_mtime REAL NOT NULL)'
+        )
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS synced_folders ('
+            'remote_path TEXT PRIMARY KEY, '
+            'remote_ts REAL NOT NULL)'
+        )
+        self._connection.commit()
+        rows = self._connection.execute('SELECT remote_path, remote_ts, size, local_mtime FROM files')
+        self.records = {row[0]: ManifestRecord(*row[1:]) for row in rows}
+        self.folders = dict(self._connection.execute('SELECT remote_path, remote_ts FROM synced_folders'))
+        logger.debug(f"Loaded {len(self.records)} manifest records from {self.path}")
+        return self
+
+    def key(self, local_path):
+        """Get the card-relative path used as manifest key for a local file."""
+        return pathlib.Path(local_path).relative_to(self.sync_path).as_posix()
+
+    def lookup(self, local_path):
+        with self.lock:
+            return self.records.get(self.key(local_path))
+
+    def record(self, local_path, remote_ts, size, local_mtime):
+        key = self.key(local_path)
+        entry = ManifestRecord(remote_ts, size, local_mtime)
+        with self.lock:
+            self.records[key] = entry
+            self._pending[key] = entry
+            if len(self._pending) >= FLUSH_THRESHOLD:
+                self._flush_locked()
+
+    def is_folder_synced(self, local_dir, remote_ts):
+        """Check whether a folder was completely synced while it had the given timestamp."""
+        with self.lock:
+            return self.folders.get(self.key(local_dir)) == remote_ts
+
+    def mark_folders_synced(self, folders):
+        """
+        Remember folders whose files are all present locally.
+
+        :param folders: Iterable of (local directory, remote directory timestamp) pairs.
+        """
+        rows = [(self.key(local_dir), remote_ts) for local_dir, remote_ts in folders]
+        with self.lock:
+            self.folders.update(rows)
+            self._flush_locked()
+            if not rows or self._connection is None:
+                return
+            try:
+                with self._connection:
+                    self._connection.executemany(
+                        'INSERT OR REPLACE INTO synced_folders (remote_path, remote_ts) VALUES (?, ?)',
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Could not update sync manifest {self.path}: {e}")
+
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+
+    def close(self):
+        if self._connection is None:
+            return
+        self.flush()
+        self._connection.close()
+        self._connection = None
+
+    def _flush_locked(self):
+        if not self._pending or self._connection is None:
+            return
+        rows = [(key,) + tuple(entry) for key, entry in self._pending.items()]
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO files (remote_path, remote_ts, size, local_mtime) VALUES (?, ?, ?, ?)',
+                    rows,
+                )
+            self._pending.clear()
+        except sqlite3.Error as e:
+            logger.error(f"Could not update sync manifest {self.path}: {e}")
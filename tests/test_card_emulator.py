@@ -0,0 +1,139 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+import requests
+
+import file_ops
+from card_emulator import CardEmulator
+from ezshare import ezShare
+
+
+def make_card(root):
+    datalog = Path(root) / "DATALOG" / "20260618"
+    datalog.mkdir(parents=True)
+    (Path(root) / "STR.edf").write_bytes(b"s" * 3000)
+    (datalog / "BRP.edf").write_bytes(bytes(range(256)) * 200)
+    for path in (Path(root) / "STR.edf", datalog / "BRP.edf"):
+        os.utime(path, (1781776800, 1781776800))
+
+
+def session_ezshare(session):
+    return SimpleNamespace(
+        session=session, ignore=[".", "..", "back to photo"], retries=1, connection_delay=0, _is_running=True,
+    )
+
+
+class CardEmulatorTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.card = Path(self.tmpdir.name) / "card"
+        make_card(self.card)
+        self.session = requests.Session()
+        self.addCleanup(self.session.close)
+
+    def start(self, **kwargs):
+        emulator = CardEmulator(self.card, **kwargs)
+        emulator.start()
+        self.addCleanup(emulator.stop)
+        return emulator
+
+    def test_listing_uses_card_layout(self):
+        emulator = self.start()
+
+        files, dirs = file_ops.list_dir(session_ezshare(self.session), emulator.url)
+
+        self.assertEqual(files, [("STR.edf", "file=STR.edf", 1781776800, 3 * 1024)])
+        self.assertEqual([(name, href) for name, href, _ in dirs], [("DATALOG", "dir?dir=A:%5CDATALOG")])
+        self.assertEqual(emulator.stats["listings"], 1)
+
+    def test_sync_without_wifi_downloads_card_tree(self):
+        emulator = self.start()
+        target = Path(self.tmpdir.name) / "copy"
+        app = ezShare()
+        app.set_params(
+            path=target, url=emulator.url, start_time=None, show_progress=False, verbose=False,
+            overwrite=False, keep_old=False, ssid=None, psk=None, ignore=[], retries=1,
+            connection_delay=0, debug=False, use_wifi=False,
+        )
+        progress = []
+        app.set_progress_callback(progress.append)
+        app.set_event_callback(lambda name, fields: name == "progress" and progress.append(fields))
+
+        self.assertTrue(app.run())
+
+        self.assertEqual(
+            (target / "DATALOG" / "20260618" / "BRP.edf").read_bytes(),
+            (self.card / "DATALOG" / "20260618" / "BRP.edf").read_bytes(),
+        )
+        self.assertEqual((target / "STR.edf").stat().st_mtime, 1781776800)
+        self.assertFalse(app.connection_manager.connected)
+        self.assertEqual(emulator.stats["downloads"], 2)
+        # Progress is weighted by the listed sizes: STR.edf is 3 KB and BRP.edf 50 KB.
+        events = [value for value in progress if isinstance(value, dict)]
+        self.assertEqual(events[-1]["bytes"], events[-1]["total_bytes"])
+        self.assertEqual(events[-1]["total_bytes"], 53 * 1024)
+        self.assertEqual(events[-1]["percent"], 100)
+        self.assertEqual(progress[-2], 100)
+
+    def test_broken_off_download_resumes_with_range_request(self):
+        emulator = self.start(disconnect_rate=1.0, support_ranges=True, seed=1)
+        url = emulator.url.replace("dir?dir=A:", "download?file=DATALOG%5C20260618%5CBRP.edf")
+        target = Path(self.tmpdir.name) / "BRP.edf"
+
+        self.assertFalse(file_ops.download_file(session_ezshare(self.session), url, target, 1781776800))
+        self.assertTrue(target.with_name("BRP.edf.part").exists())
+
+        emulator.disconnect_rate = 0.0
+        self.assertTrue(file_ops.download_file(session_ezshare(self.session), url, target, 1781776800))
+
+        self.assertEqual(target.read_bytes(), (self.card / "DATALOG" / "20260618" / "BRP.edf").read_bytes())
+        self.assertEqual(emulator.stats["disconnects"], 1)
+
+    def test_paths_outside_the_card_root_are_not_served(self):
+        secret = Path(self.tmpdir.name) / "secret.txt"
+        secret.write_text("host file")
+        (self.card / "link").symlink_to(secret)
+        emulator = self.start()
+        base = emulator.url.replace("dir?dir=A:", "")
+
+        for query in (
+            "download?file=" + str(secret),
+            "download?file=../secret.txt",
+            "download?file=DATALOG/../../secret.txt",
+            "download?file=DATALOG%5C..%5C..%5Csecret.txt",
+            "download?file=C:%5Csecret.txt",
+            "download?file=link",
+            "dir?dir=A:%5C..",
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(self.session.get(base + query, timeout=5).status_code, 404)
+        self.assertEqual(self.session.get(base + "download?file=DATALOG/20260618/BRP.edf", timeout=5).status_code, 200)
+
+    def test_failures_and_refused_connections(self):
+        emulator = self.start(failure_rate=1.0)
+        self.assertEqual(file_ops.list_dir(session_ezshare(self.session), emulator.url), (None, None))
+        self.assertEqual(emulator.stats["failures"], 1)
+
+        emulator.failure_rate = 0.0
+        emulator.max_connections = 0
+        with self.assertRaises(requests.ConnectionError):
+            requests.get(emulator.url, timeout=5)
+        self.assertEqual(emulator.stats["refused"], 1)
+
+    def test_bandwidth_cap_slows_downloads(self):
+        emulator = self.start(bandwidth=200 * 1024)
+        url = emulator.url.replace("dir?dir=A:", "download?file=DATALOG%5C20260618%5CBRP.edf")
+
+        started = time.monotonic()
+        self.assertEqual(len(requests.get(url, timeout=5).content), 256 * 200)
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import json
 import tempfile
 import unittest
@@ -6,6 +7,7 @@ from unittest.mock import patch
 
 import cli
 import main
+from timings import SyncTimings
 
 
 class FakeEzShare:
@@ -35,6 +37,43 @@ class FakeEzShare:
         pass
 
 
+class PriorityFakeEzShare(FakeEzShare):
+    def run(self):
+        self.progress_callback("priority_complete")
+        return True
+
+
+class TimedFakeEzShare(FakeEzShare):
+    def set_params(self, **kwargs):
+        super().set_params(**kwargs)
+        self.timings = SyncTimings()
+
+    def run(self):
+        with self.timings.phase("transfer") as transfer:
+            transfer.bytes = 2048
+        return True
+
+
+class EventFakeEzShare(FakeEzShare):
+    def set_event_callback(self, callback):
+        self.event_callback = callback
+
+    def run(self):
+        self.event_callback("scan_finished", {"files": 3})
+        self.event_callback("sync_finished", {"success": True})
+        return True
+
+
+class StreamingFakeEzShare(EventFakeEzShare):
+    def run(self):
+        self.status_callback("Scanning for files to download...")
+        self.event_callback("plan", {"files": 1, "bytes": 2048})
+        self.event_callback("file_finished", {"path": "STR.edf", "success": True, "bytes": 2048})
+        self.progress_callback("priority_complete")
+        self.event_callback("sync_finished", {"success": True, "files": 1, "total_files": 1})
+        return True
+
+
 class CliTests(unittest.TestCase):
     def setUp(self):
         FakeEzShare.instances = []
@@ -101,6 +140,16 @@ class CliTests(unittest.TestCase):
                         "2",
                         "--connection-delay",
                         "0",
+                        "--listing-workers",
+                        "4",
+                        "--jobs",
+                        "3",
+                        "--durability",
+                        "batch",
+                        "--time-tolerance",
+                        "4",
+                        "--remote-timezone",
+                        "UTC",
                         "--quiet",
                     ]
                 )
@@ -115,6 +164,11 @@ class CliTests(unittest.TestCase):
         self.assertEqual(params["ignore"], ["A", "B", "C"])
         self.assertEqual(params["retries"], 2)
         self.assertEqual(params["connection_delay"], 0)
+        self.assertEqual(params["listing_workers"], 4)
+        self.assertEqual(params["download_jobs"], 3)
+        self.assertEqual(params["durability"], "batch")
+        self.assertEqual(params["time_tolerance"], 4)
+        self.assertEqual(params["remote_timezone"], "UTC")
         self.assertFalse(params["overwrite"])
 
     def test_cli_save_config_persists_overrides(self):
@@ -149,6 +203,121 @@ class CliTests(unittest.TestCase):
         self.assertEqual(saved["WiFi"]["ssid"], "new ssid")
         self.assertEqual(saved["WiFi"]["psk"], "new psk")
 
+    def test_cli_opens_oscar_once_when_latest_night_is_ready(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("cli.ezShare", PriorityFakeEzShare), \
+                    patch("cli.open_oscar_for_platform", return_value=True) as open_oscar:
+                exit_code = cli.run_cli(
+                    [
+                        "--config",
+                        str(Path(tmpdir) / "config.json"),
+                        "--path",
+                        str(Path(tmpdir) / "output"),
+                        "--open-oscar",
+                        "--open-oscar-early",
+                        "--priority-nights",
+                        "2",
+                        "--quiet",
+                    ]
+                )
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(open_oscar.call_count, 1)
+        self.assertEqual(PriorityFakeEzShare.instances[0].params["priority_nights"], 2)
+
+    def test_cli_no_wifi_syncs_from_url_without_ssid(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            config_path = Path(tmpdir) / "config.json"
+            config_path.write_text(json.dumps({"WiFi": {"ssid": ""}}), encoding="utf-8")
+            with patch("cli.ezShare", FakeEzShare):
+                exit_code = cli.run_cli(
+                    [
+                        "--config",
+                        str(config_path),
+                        "--path",
+                        str(Path(tmpdir) / "output"),
+                        "--url",
+                        "http://127.0.0.1:8080/dir?dir=A:",
+                        "--no-wifi",
+                        "--quiet",
+                    ]
+                )
+
+        self.assertEqual(exit_code, 0)
+        self.assertFalse(FakeEzShare.instances[0].params["use_wifi"])
+        self.assertEqual(FakeEzShare.instances[0].params["url"], "http://127.0.0.1:8080/dir?dir=A:")
+
+    def test_cli_prints_and_saves_timings(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            timings_path = Path(tmpdir) / "timings.json"
+            with patch("cli.ezShare", TimedFakeEzShare), patch("builtins.print") as print_mock:
+                exit_code = cli.run_cli(
+                    [
+                        "--config",
+                        str(Path(tmpdir) / "config.json"),
+                        "--path",
+                        str(Path(tmpdir) / "output"),
+                        "--timings",
+                        str(timings_path),
+                        "--quiet",
+                    ]
+                )
+            saved = json.loads(timings_path.read_text(encoding="utf-8"))
+
+        self.assertEqual(exit_code, 0)
+        self.assertTrue(TimedFakeEzShare.instances[0].params["collect_timings"])
+        self.assertEqual([phase["name"] for phase in saved["phases"]], ["transfer"])
+        self.assertEqual(saved["phases"][0]["bytes"], 2048)
+        self.assertIn("transfer", print_mock.call_args_list[0].args[0])
+
+    def test_cli_profile_options_write_reports_into_state_directory(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output_path = Path(tmpdir) / "output"
+            with patch("cli.ezShare", EventFakeEzShare), patch("builtins.print"):
+                exit_code = cli.run_cli(
+                    [
+                        "--config",
+                        str(Path(tmpdir) / "config.json"),
+                        "--path",
+                        str(output_path),
+                        "--profile",
+                        "--profile-memory",
+                        "--quiet",
+                    ]
+                )
+            reports = sorted(path.name for path in (output_path / ".ezShareCPAP" / "profiles").iterdir())
+            memory_report = next((output_path / ".ezShareCPAP" / "profiles").glob("*-memory.txt")).read_text()
+
+        self.assertEqual(exit_code, 0)
+        self.assertEqual([name.split(".", 1)[1] for name in reports if not name.endswith("-memory.txt")], ["pstats", "txt"])
+        self.assertIn("== scan_finished:", memory_report)
+        self.assertIn("== sync_finished:", memory_report)
+
+    def test_cli_ndjson_events_replace_text_output(self):
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch("cli.ezShare", StreamingFakeEzShare), patch("sys.stdout", stdout):
+                exit_code = cli.run_cli(
+                    [
+                        "--config",
+                        str(Path(tmpdir) / "config.json"),
+                        "--path",
+                        str(Path(tmpdir) / "output"),
+                        "--events",
+                        "ndjson",
+                    ]
+                )
+
+        events = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(
+            [event["event"] for event in events],
+            ["status", "plan", "file_finished", "priority_complete", "sync_finished", "summary"],
+        )
+        self.assertEqual(events[0]["message"], "Scanning for files to download...")
+        self.assertEqual(events[-1]["exit_code"], 0)
+        self.assertEqual(events[-1]["bytes"], 2048)
+
 
 if __name__ == "__main__":
     unittest.main()
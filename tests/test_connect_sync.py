@@ -4,6 +4,7 @@ from pathlib import Path
 from unittest.mock import patch
 
 from ezshare import ezShare
+from timings import SyncTimings
 
 
 class FakeConnectionManager:
@@ -16,7 +17,7 @@ class FakeConnectionManager:
         self.connect_calls.append((ssid, psk, target_host))
         self.connected = True
 
-    def verify_connection(self):
+    def verify_connection(self, target_host="192.168.4.1", port=80, is_running=None):
         return True
 
     def disconnect(self, ssid):
@@ -28,6 +29,9 @@ class FakeConnectionManager:
 class FakeResponse:
     def __init__(self, text="", chunks=None):
         self.text = text
+        self.content = text.encode("utf-8")
+        self.encoding = "utf-8"
+        self.status_code = 200
         self.chunks = chunks or []
         self.headers = {"content-length": str(sum(len(chunk) for chunk in self.chunks))}
 
@@ -59,6 +63,55 @@ class FakeSession:
         )
 
 
+class NestedCardSession(FakeSession):
+    listings = {
+        "http://192.168.4.1/dir?dir=A:": (
+            '2026-06-18 10:00:00 <a href="/download?file=STR.EDF">STR.EDF</a>\n'
+            '2026-06-18 10:00:00 <a href="/dir?dir=A:%5CDATALOG">DATALOG</a>\n'
+        ),
+        "http://192.168.4.1/dir?dir=A:%5CDATALOG": (
+            '2026-06-17 10:00:00 <a href="/dir?dir=A:%5CDATALOG%5C20260617">20260617</a>\n'
+            '2026-06-18 10:00:00 <a href="/dir?dir=A:%5CDATALOG%5C20260618">20260618</a>\n'
+        ),
+        "http://192.168.4.1/dir?dir=A:%5CDATALOG%5C20260617": (
+            '2026-06-17 10:00:00 <a href="/download?file=DATALOG%5C20260617%5CBRP.EDF">BRP.EDF</a>\n'
+        ),
+        "http://192.168.4.1/dir?dir=A:%5CDATALOG%5C20260618": (
+            '2026-06-18 10:00:00 <a href="/download?file=DATALOG%5C20260618%5CBRP.EDF">BRP.EDF</a>\n'
+        ),
+    }
+
+    def get(self, url, **kwargs):
+        self.get_urls.append(url)
+        if "download?" in url:
+            return FakeResponse(chunks=[b"edf-data"])
+        return FakeResponse(text=f"<html><body><pre>{self.listings[url]}</pre></body></html>")
+
+
+class ShiftedClockCardSession(NestedCardSession):
+    """The same card after its clock moved forward by one hour."""
+
+    listings = {
+        url: listing.replace(" 10:00:00 ", " 11:00:00 ") for url, listing in NestedCardSession.listings.items()
+    }
+
+
+def connected_app(path, session, **settings):
+    """Build an ezShare that is already on the card network, ready for run_after_connection_delay."""
+    app = ezShare()
+    app.path = Path(path)
+    app.url = "http://192.168.4.1/dir?dir=A:"
+    app.overwrite = False
+    app.keep_old = False
+    app.retries = 1
+    app.connection_delay = 0
+    app.connected = True
+    app.session = session
+    for name, value in settings.items():
+        setattr(app, name, value)
+    return app
+
+
 class ConnectAndSyncTests(unittest.TestCase):
     def test_run_connects_syncs_file_and_disconnects(self):
         app = ezShare()
@@ -101,6 +154,89 @@ class ConnectAndSyncTests(unittest.TestCase):
         self.assertIn(("Connected to ez Share.", "info"), statuses)
         self.assertIn(("File transfer completed successfully.", "info"), statuses)
 
+    def test_sync_lists_each_remote_directory_once(self):
+        fake_session = NestedCardSession()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            app = connected_app(tmpdir, fake_session)
+
+            self.assertTrue(app.run_after_connection_delay())
+
+            self.assertEqual(app.total_files, 3)
+            self.assertEqual((Path(tmpdir) / "DATALOG" / "20260618" / "BRP.EDF").read_bytes(), b"edf-data")
+
+        listing_urls = [url for url in fake_session.get_urls if "download?" not in url]
+        self.assertEqual(sorted(listing_urls), sorted(NestedCardSession.listings))
+
+    def test_sync_records_phase_timings_and_events(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            app = connected_app(tmpdir, NestedCardSession(), timings=SyncTimings())
+            events = []
+            app.set_event_callback(lambda name, fields: events.append((name, fields)))
+
+            self.assertTrue(app.run_after_connection_delay())
+
+        names = [name for name, _ in events]
+        self.assertEqual(names[:3], ["scan_started", "scan_finished", "plan"])
+        self.assertEqual(names[-1], "sync_finished")
+        self.assertEqual(names.count("file_started"), 3)
+        self.assertEqual(dict(events)["plan"], {"files": 3, "bytes": 0, "priority_files": 2, "skipped_nights": 0})
+        finished = [fields for name, fields in events if name == "file_finished"]
+        self.assertEqual([fields["bytes"] for fields in finished], [len(b"edf-data")] * 3)
+        self.assertEqual(events[-1][1], {"success": True, "files": 3, "total_files": 3})
+        phases = {phase["name"]: phase for phase in app.timings.summary()["phases"]}
+        self.assertEqual(list(phases), ["scan", "plan", "transfer", "download"])
+        self.assertEqual(phases["download"]["count"], 3)
+        self.assertEqual(phases["transfer"]["bytes"], 3 * len(b"edf-data"))
+
+    def test_incremental_sync_skips_nights_that_were_already_synced(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sessions = []
+            for _ in range(2):
+                app = connected_app(tmpdir, NestedCardSession(), incremental=True)
+                sessions.append(app.session)
+
+                with patch("ezshare.INCREMENTAL_RECENT_NIGHTS", 1):
+                    self.assertTrue(app.run_after_connection_delay())
+
+        second_listings = [url for url in sessions[1].get_urls if "download?" not in url]
+        self.assertNotIn("http://192.168.4.1/dir?dir=A:%5CDATALOG%5C20260617", second_listings)
+        self.assertIn("http://192.168.4.1/dir?dir=A:%5CDATALOG%5C20260618", second_listings)
+        self.assertEqual([url for url in sessions[1].get_urls if "download?" in url], [])
+
+    def test_sync_downloads_files_from_interrupted_journal_again(self):
+        def make_app(tmpdir):
+            return connected_app(tmpdir, FakeSession(), durability="end")
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.assertTrue(make_app(tmpdir).run_after_connection_delay())
+            journal = Path(tmpdir) / ".ezShareCPAP" / "journal.txt"
+            self.assertFalse(journal.exists())
+
+            # Simulate a crash after STR.EDF was renamed but before it was flushed.
+            journal.write_text("STR.EDF\n", encoding="utf-8")
+            (Path(tmpdir) / "STR.EDF").write_bytes(b"")
+            app = make_app(tmpdir)
+            self.assertTrue(app.run_after_connection_delay())
+
+            self.assertEqual((Path(tmpdir) / "STR.EDF").read_bytes(), b"edf-data")
+            self.assertFalse(journal.exists())
+            self.assertEqual(app.total_files, 1)
+
+    def test_uniform_clock_shift_rebases_local_timestamps_instead_of_downloading(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            local_file = Path(tmpdir) / "DATALOG" / "20260617" / "BRP.EDF"
+            sessions = []
+            mtimes = []
+            for session in (NestedCardSession(), ShiftedClockCardSession()):
+                app = connected_app(tmpdir, session)
+                sessions.append(session)
+                self.assertTrue(app.run_after_connection_delay())
+                mtimes.append(local_file.stat().st_mtime)
+
+        self.assertEqual(app.total_files, 0)
+        self.assertEqual([url for url in sessions[1].get_urls if "download?" in url], [])
+        self.assertEqual(mtimes[1] - mtimes[0], 3600)
 
 if __name__ == "__main__":
     unittest.main()
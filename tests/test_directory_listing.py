@@ -1,16 +1,84 @@
+import datetime
 import pathlib
 import tempfile
+import threading
 import unittest
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import bs4
 import requests
 
 import file_ops
 from ezshare import ezShare
 
 
+EZSHARE_LISTING = (
+    b"<html><head><title>ez Share</title></head><body><pre>\n"
+    b'   2026- 6-18   10: 0: 0         &lt;DIR&gt;   <a href="dir?dir=A:">.</a>\n'
+    b'   2026- 6-18   10: 0: 0         &lt;DIR&gt;   <a href="dir?dir=A:%5CDATALOG">DATALOG</a>\n'
+    b'   2026- 6-18   10:15:42          12KB   <a href="download?file=STR.EDF">STR.EDF</a>\n'
+    b'   2026- 6-17    9: 5: 3           1KB   <a href="download?file=Identification.tgt">Identification.tgt</a>\n'
+    b'   2026- 6-17    9: 5: 3           1KB   <a href="download?file=A%26B.crc">A&amp;B.crc</a>\n'
+    b'   2026- 6-17    9: 5: 3           1KB   <a href="download?file=.hidden">.hidden</a>\n'
+    b"</pre></body></html>"
+)
+
+
 class DirectoryListingTests(unittest.TestCase):
+    def test_fast_parser_matches_beautifulsoup_parser(self):
+        ezshare = SimpleNamespace(ignore=[".", "..", "back to photo"])
+
+        fast = file_ops.parse_listing_content(ezshare, EZSHARE_LISTING, "utf-8")
+        soup = bs4.BeautifulSoup(EZSHARE_LISTING.decode("utf-8"), "html.parser")
+
+        self.assertEqual(fast, file_ops.parse_directory_listing(ezshare, soup))
+        self.assertEqual([(name, href) for name, href, _ in fast[1]], [("DATALOG", "dir?dir=A:%5CDATALOG")])
+        self.assertEqual(
+            [(name, size) for name, _, _, size in fast[0]],
+            [("STR.EDF", 12 * 1024), ("Identification.tgt", 1024), ("A&B.crc", 1024)],
+        )
+
+    def test_sizes_in_coarse_units_are_unknown(self):
+        ezshare = SimpleNamespace(ignore=[])
+        content = (
+            b"<pre>\n"
+            b'   2026- 6-18   10:15:42          10MB   <a href="download?file=BRP.EDF">BRP.EDF</a>\n'
+            b'   2026- 6-18   10:15:42           2GB   <a href="download?file=BIG.EDF">BIG.EDF</a>\n'
+            b'   2026- 6-18   10:15:42          512B   <a href="download?file=CRC.EDF">CRC.EDF</a>\n'
+            b"</pre>"
+        )
+
+        files, _ = file_ops.parse_listing_content(ezshare, content, "utf-8")
+
+        self.assertEqual([(name, size) for name, _, _, size in files], [("BRP.EDF", None), ("BIG.EDF", None), ("CRC.EDF", 512)])
+        self.assertTrue(file_ops.size_matches(10 * 1024 * 1024 + 300_000, files[0][3]))
+
+    def test_listing_timestamps_use_configured_remote_timezone(self):
+        ezshare = SimpleNamespace(ignore=[".", ".."], remote_tzinfo=file_ops.parse_timezone("+02:00"))
+
+        files, _ = file_ops.parse_listing_content(ezshare, EZSHARE_LISTING, "utf-8")
+        soup = bs4.BeautifulSoup(EZSHARE_LISTING.decode("utf-8"), "html.parser")
+
+        self.assertEqual(files[0][2], datetime.datetime(2026, 6, 18, 8, 15, 42, tzinfo=datetime.timezone.utc).timestamp())
+        self.assertEqual(files, file_ops.parse_directory_listing(ezshare, soup)[0])
+        self.assertEqual(file_ops.parse_timezone("UTC-5:30").utcoffset(None), -datetime.timedelta(hours=5, minutes=30))
+        self.assertIsNone(file_ops.parse_timezone("local"))
+        with self.assertRaises(ValueError):
+            file_ops.parse_timezone("Mars/Olympus_Mons")
+
+    def test_fast_parser_defers_unknown_markup_to_beautifulsoup(self):
+        ezshare = SimpleNamespace(ignore=[])
+        content = b'<pre><b>2026-06-18</b> <a href="download?file=STR.EDF">STR.EDF</a>\n</pre>'
+        response = SimpleNamespace(content=content, text=content.decode(), encoding="utf-8", raise_for_status=lambda: None)
+        ezshare.session = SimpleNamespace(get=lambda *args, **kwargs: response)
+
+        self.assertIsNone(file_ops.parse_listing_content(ezshare, content))
+        files, dirs = file_ops.list_dir(ezshare, "http://192.168.4.1/dir?dir=A:")
+
+        self.assertEqual(files, [("STR.EDF", "file=STR.EDF", 0, None)])
+        self.assertEqual(dirs, [])
+
     def test_list_dir_returns_none_on_connection_failure(self):
         ezshare = SimpleNamespace(
             session=SimpleNamespace(
@@ -33,7 +101,6 @@ class DirectoryListingTests(unittest.TestCase):
             app.update_status = lambda message, message_type="info": statuses.append((message, message_type))
 
             with patch("ezshare.list_dir", side_effect=[(None, None), ([], [])]) as list_dir, \
-                    patch.object(app, "calculate_total_files", return_value=0), \
                     patch("ezshare.time.sleep"):
                 app.run_after_connection_delay()
 
@@ -41,12 +108,41 @@ class DirectoryListingTests(unittest.TestCase):
         self.assertIn(("Waiting for ez Share web server... attempt 1/2", "info"), statuses)
         self.assertIn(("Total files to sync: 0", "info"), statuses)
 
-    def test_calculate_total_files_returns_none_when_listing_fails(self):
-        app = ezShare()
+    def test_remote_tree_lists_sibling_directories_concurrently_in_card_order(self):
+        barrier = threading.Barrier(2, timeout=2)
 
-        with tempfile.TemporaryDirectory() as directory:
-            with patch("ezshare.list_dir", return_value=(None, None)):
-                self.assertIsNone(app.calculate_total_files("http://192.168.4.1/dir?dir=A:", pathlib.Path(directory), False))
+        def fake_list_dir(ezshare, url):
+            barrier.wait()
+            name = url.rsplit("%5C", 1)[-1]
+            return [(f"{name}.EDF", f"file={name}.EDF", 0, 1024)], []
+
+        root_dirs = [("20260617", "dir?dir=A:%5C20260617", 0), ("20260618", "dir?dir=A:%5C20260618", 0)]
+        with patch("file_ops.list_dir", side_effect=fake_list_dir):
+            tree = file_ops.build_remote_tree(
+                SimpleNamespace(), "http://192.168.4.1/dir?dir=A:", pathlib.Path("card"), [], root_dirs,
+                lambda: True, max_workers=2,
+            )
+
+        self.assertEqual(
+            [entry["path"] for entry in file_ops.iter_tree_files(tree)],
+            [pathlib.Path("card/20260617/20260617.EDF"), pathlib.Path("card/20260618/20260618.EDF")],
+        )
+
+    def test_remote_tree_stops_when_process_is_cancelled(self):
+        running = [True]
+
+        def fake_list_dir(ezshare, url):
+            running[0] = False
+            return [], [("child", "dir?dir=A:%5Cchild", 0)]
+
+        with patch("file_ops.list_dir", side_effect=fake_list_dir) as list_dir:
+            tree = file_ops.build_remote_tree(
+                SimpleNamespace(), "http://192.168.4.1/dir?dir=A:", pathlib.Path("card"), [],
+                [("DATALOG", "dir?dir=A:%5CDATALOG", 0)], lambda: running[0], max_workers=2,
+            )
+
+        self.assertIsNone(tree)
+        self.assertEqual(list_dir.call_count, 1)
 
 
 if __name__ == "__main__":
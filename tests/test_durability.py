@@ -0,0 +1,64 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import durability
+from durability import SyncDurability
+
+
+class SyncDurabilityTests(unittest.TestCase):
+    def test_batch_policy_flushes_files_then_each_directory_once(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            paths = [root / "DATALOG" / "20260618" / f"{index}.EDF" for index in range(3)]
+            sync = SyncDurability("batch", root)
+            flushed = []
+
+            def record_flush(path):
+                if sync.journal_path.parent not in (path, path.parent):
+                    flushed.append(path)
+
+            with patch("durability.BATCH_SIZE", 2), patch("durability.fsync_path", side_effect=record_flush):
+                sync.begin(paths)
+                self.assertTrue(sync.journal_path.exists())
+                for path in paths:
+                    sync.file_written(path)
+                self.assertEqual(flushed, paths[:2] + [paths[0].parent])
+                sync.finish()
+
+            self.assertEqual(flushed[3:5], [paths[2], paths[0].parent])
+            self.assertFalse(sync.journal_path.exists())
+
+    def test_file_policy_does_not_write_a_journal(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sync = SyncDurability("file", tmpdir)
+            sync.begin([Path(tmpdir) / "STR.EDF"])
+
+            self.assertFalse(sync.journal_path.exists())
+            self.assertTrue(sync.fsync_each_file)
+
+    def test_recovered_files_stay_in_journal_until_downloaded(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            sync = SyncDurability("end", root)
+            sync.begin([root / "STR.EDF", root / "Identification.tgt"])
+            sync.file_written(root / "STR.EDF")
+            # The run is interrupted before finish() is called.
+
+            recovering = SyncDurability("end", root)
+            self.assertEqual(recovering.recover(), {root / "STR.EDF", root / "Identification.tgt"})
+            recovering.begin([root / "STR.EDF", root / "Identification.tgt"])
+            recovering.file_written(root / "STR.EDF")
+            recovering.finish()
+
+            self.assertEqual(SyncDurability("end", root).recover(), {root / "Identification.tgt"})
+
+    def test_unknown_policy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            SyncDurability("never", "/tmp")
+        self.assertIn("end", durability.DURABILITY_POLICIES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import io
+import json
+import threading
+import time
+import unittest
+
+from events import NdjsonEventWriter
+
+
+class SlowStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def write(self, text):
+        self.release.wait(5)
+        return super().write(text)
+
+
+class NdjsonEventWriterTests(unittest.TestCase):
+    def test_events_are_written_as_json_lines_with_summary(self):
+        stream = io.StringIO()
+        with NdjsonEventWriter(stream) as writer:
+            writer.emit("plan", {"files": 2, "bytes": 4096})
+            writer.emit("file_finished", {"path": "STR.edf", "success": True, "bytes": 3000, "duration_ms": 4.2})
+            writer.emit("retry", {"stage": "download", "path": "BRP.edf", "retries_left": 2})
+            writer.emit("file_finished", {"path": "BRP.edf", "success": False, "bytes": 512, "duration_ms": 9.0})
+            writer.emit("sync_finished", {"success": False, "files": 1, "total_files": 2})
+
+        events = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+        self.assertEqual([event["event"] for event in events],
+                         ["plan", "file_finished", "retry", "file_finished", "sync_finished", "summary"])
+        self.assertEqual(events[0]["files"], 2)
+        self.assertIsInstance(events[0]["time"], float)
+        summary = events[-1]
+        self.assertEqual(
+            {key: summary[key] for key in ("success", "total_files", "files_downloaded", "files_failed", "bytes", "retries")},
+            {"success": False, "total_files": 2, "files_downloaded": 1, "files_failed": 1, "bytes": 3512, "retries": 1},
+        )
+
+    def test_emit_does_not_wait_for_a_slow_consumer(self):
+        stream = SlowStream()
+        writer = NdjsonEventWriter(stream)
+        writer.start()
+
+        started = time.monotonic()
+        for index in range(1000):
+            writer.emit("file_finished", {"path": f"{index}.edf", "success": True, "bytes": 1})
+        emit_time = time.monotonic() - started
+        stream.release.set()
+        writer.close(exit_code=0)
+
+        self.assertLess(emit_time, 1)
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 1001)
+        self.assertEqual(json.loads(lines[-1])["exit_code"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,16 +1,25 @@
+import gzip
+import json
+import os
 import pathlib
 import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from types import SimpleNamespace
 from unittest.mock import patch
 
+import requests
+
 import file_ops
+from file_writer import FileWriter
 
 
 class FakeResponse:
     def __init__(self, chunks):
         self.chunks = chunks
         self.headers = {"content-length": str(sum(len(chunk) for chunk in chunks))}
+        self.status_code = 200
 
     def raise_for_status(self):
         pass
@@ -19,32 +28,6 @@ class FakeResponse:
         yield from self.chunks
 
 
-class FakeTempFile:
-    def __init__(self, directory):
-        self.closed = False
-        self._file = tempfile.NamedTemporaryFile(delete=False, dir=directory)
-        self.name = self._file.name
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, exc_type, exc, tb):
-        self.close()
-
-    def write(self, data):
-        return self._file.write(data)
-
-    def flush(self):
-        return self._file.flush()
-
-    def fileno(self):
-        return self._file.fileno()
-
-    def close(self):
-        self.closed = True
-        return self._file.close()
-
-
 def ezshare_for(response, retries=1, running=True):
     return SimpleNamespace(
         retries=retries,
@@ -55,27 +38,29 @@ def ezshare_for(response, retries=1, running=True):
 
 
 class DownloadFileTests(unittest.TestCase):
-    def test_replaces_temp_file_after_temp_handle_is_closed(self):
+    def test_replaces_part_file_after_part_handle_is_closed(self):
         with tempfile.TemporaryDirectory() as directory:
-            fake_temp = FakeTempFile(directory)
             target = pathlib.Path(directory) / "STR.EDF"
             ezshare = ezshare_for(FakeResponse([b"edf-data"]))
+            opened = []
+            real_open = pathlib.Path.open
 
-            def named_temp_file(**kwargs):
-                self.assertEqual(pathlib.Path(kwargs["dir"]), target.parent)
-                return fake_temp
+            def tracking_open(path, *args, **kwargs):
+                handle = real_open(path, *args, **kwargs)
+                opened.append((path, handle))
+                return handle
 
             def replace_after_close(source, destination):
-                self.assertEqual(source, pathlib.Path(fake_temp.name))
+                self.assertEqual(source, target.with_name("STR.EDF.part"))
                 self.assertEqual(destination, target)
-                self.assertTrue(fake_temp.closed)
+                self.assertTrue(all(handle.closed for path, handle in opened if path == source))
+                self.assertEqual(source.read_bytes(), b"edf-data")
 
-            with patch("file_ops.NamedTemporaryFile", side_effect=named_temp_file), \
+            with patch.object(pathlib.Path, "open", autospec=True, side_effect=tracking_open), \
                     patch.object(pathlib.Path, "replace", autospec=True, side_effect=replace_after_close) as replace:
                 self.assertTrue(file_ops.download_file(ezshare, "http://example.test/STR.EDF", target))
 
             replace.assert_called_once()
-            pathlib.Path(fake_temp.name).unlink(missing_ok=True)
 
     def test_cancelled_download_removes_temp_file(self):
         with tempfile.TemporaryDirectory() as directory:
@@ -86,5 +71,276 @@ class DownloadFileTests(unittest.TestCase):
             self.assertEqual(list(pathlib.Path(directory).iterdir()), [])
 
 
+class RangeFileServer:
+    """
+    Serve one file over local HTTP, optionally honouring Range and dropping the first transfer.
+
+    With misplaced_range set to (first, last), the first Range request is answered with
+    that part of the file instead of the requested one. With gzip set, every request is
+    answered with the whole file gzip-encoded, whatever the request accepts.
+    """
+
+    def __init__(self, payload, supports_range=True, drop_after=None, misplaced_range=None, gzip=False):
+        self.payload = payload
+        self.supports_range = supports_range
+        self.drop_after = drop_after
+        self.misplaced_range = misplaced_range
+        self.gzip = gzip
+        self.range_headers = []
+        self.accept_encodings = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                range_header = self.headers.get("Range")
+                server.range_headers.append(range_header)
+                server.accept_encodings.append(self.headers.get("Accept-Encoding"))
+                if server.gzip:
+                    body = gzip_compress(server.payload)
+                    self.send_response(200)
+                    self.send_header("Content-Encoding", "gzip")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                start = 0
+                if range_header and server.misplaced_range is not None:
+                    first, last = server.misplaced_range
+                    server.misplaced_range = None
+                    body = server.payload[first:last + 1]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {first}-{last}/{len(server.payload)}")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if range_header and server.supports_range:
+                    start = int(range_header.split("=")[1].split("-")[0])
+                body = server.payload[start:]
+                self.send_response(206 if start else 200)
+                if start:
+                    self.send_header("Content-Range", f"bytes {start}-{len(server.payload) - 1}/{len(server.payload)}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if server.drop_after is not None:
+                    self.wfile.write(body[:server.drop_after])
+                    server.drop_after = None
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/download?file=BRP.EDF"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def gzip_compress(data):
+    return gzip.compress(data, mtime=0)
+
+
+class ResumableDownloadTests(unittest.TestCase):
+    payload = bytes(range(256)) * 64
+
+    def download(self, server, target, retries=1):
+        session = requests.Session()
+        ezshare = SimpleNamespace(retries=retries, connection_delay=0, _is_running=True, session=session)
+        try:
+            return file_ops.download_file(ezshare, server.url, target, 1000.0)
+        finally:
+            session.close()
+
+    def write_partial(self, target, url, length):
+        target.with_name(target.name + ".part").write_bytes(self.payload[:length])
+        target.with_name(target.name + ".part.json").write_text(
+            json.dumps({"url": url, "size": len(self.payload), "timestamp": 1000.0}), encoding="utf-8"
+        )
+
+    def test_resumes_partial_file_with_range_request(self):
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(self.payload) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+            self.write_partial(target, server.url, 5000)
+
+            self.assertTrue(self.download(server, target))
+
+            self.assertEqual(server.range_headers, ["bytes=5000-"])
+            self.assertEqual(target.read_bytes(), self.payload)
+            self.assertEqual(sorted(path.name for path in pathlib.Path(directory).iterdir()), ["BRP.EDF"])
+
+    def test_falls_back_to_full_download_when_range_is_ignored(self):
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(self.payload, supports_range=False) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+            self.write_partial(target, server.url, 5000)
+
+            self.assertTrue(self.download(server, target))
+
+            self.assertEqual(server.range_headers, ["bytes=5000-"])
+            self.assertEqual(target.read_bytes(), self.payload)
+
+    def test_restarts_when_server_answers_resume_with_another_range(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                RangeFileServer(self.payload, misplaced_range=(100, 199)) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+            self.write_partial(target, server.url, 5000)
+
+            self.assertTrue(self.download(server, target))
+
+            self.assertEqual(server.range_headers, ["bytes=5000-", None])
+            self.assertEqual(target.read_bytes(), self.payload)
+
+    def test_downloads_gzip_encoded_response_completely(self):
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(self.payload, gzip=True) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+
+            self.assertTrue(self.download(server, target))
+
+            self.assertEqual(server.accept_encodings, ["identity"])
+            self.assertEqual(target.read_bytes(), self.payload)
+            self.assertEqual(sorted(path.name for path in pathlib.Path(directory).iterdir()), ["BRP.EDF"])
+
+    def test_restarts_when_server_answers_resume_with_encoded_body(self):
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(self.payload, gzip=True) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+            self.write_partial(target, server.url, 5000)
+
+            self.assertTrue(self.download(server, target))
+
+            self.assertEqual(server.range_headers, ["bytes=5000-", None])
+            self.assertEqual(target.read_bytes(), self.payload)
+
+    def test_retry_after_dropped_transfer_continues_from_last_byte(self):
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(self.payload, drop_after=3072) as server:
+            target = pathlib.Path(directory) / "BRP.EDF"
+
+            self.assertTrue(self.download(server, target, retries=2))
+
+            self.assertEqual(server.range_headers, [None, "bytes=3072-"])
+            self.assertEqual(target.read_bytes(), self.payload)
+
+
+class FileWriterTests(unittest.TestCase):
+    def test_download_through_writer_replaces_target_and_sets_timestamp(self):
+        payload = bytes(range(256)) * 4096
+        with tempfile.TemporaryDirectory() as directory, RangeFileServer(payload) as server, \
+                FileWriter(file_ops.CHUNK_SIZE_MAX, 2) as writer:
+            target = pathlib.Path(directory) / "BRP.EDF"
+            session = requests.Session()
+            ezshare = SimpleNamespace(retries=1, connection_delay=0, _is_running=True, session=session)
+            try:
+                self.assertTrue(file_ops.download_file(ezshare, server.url, target, 1000.0, writer=writer))
+            finally:
+                session.close()
+
+            self.assertEqual(target.read_bytes(), payload)
+            self.assertEqual(os.stat(target).st_mtime, 1000.0)
+            self.assertEqual([path.name for path in pathlib.Path(directory).iterdir()], ["BRP.EDF"])
+
+    def test_full_buffer_pool_holds_back_reader_until_cancelled(self):
+        with tempfile.TemporaryDirectory() as directory, FileWriter(16, 1) as writer:
+            disk_blocked = threading.Event()
+            writer._tasks.put(disk_blocked.wait)
+            job = writer.open(pathlib.Path(directory) / "BRP.EDF.part", "wb")
+
+            buffer = job.buffer(lambda: True)
+            buffer[:4] = b"data"
+            job.write(buffer, 4)
+            self.assertIsNone(job.buffer(lambda: False))
+
+            disk_blocked.set()
+            job.close()
+            self.assertEqual(job.path.read_bytes(), b"data")
+
+    def test_write_errors_are_raised_on_close(self):
+        with tempfile.TemporaryDirectory() as directory, FileWriter(16, 1) as writer:
+            job = writer.open(pathlib.Path(directory) / "missing" / "BRP.EDF.part", "wb")
+            buffer = job.buffer(lambda: True)
+
+            with self.assertRaises(OSError):
+                job.write(buffer, 0)
+                job.close()
+
+
+class PrioritizeSyncPlanTests(unittest.TestCase):
+    def test_orders_summary_files_then_newest_nights_then_backfill(self):
+        root = pathlib.Path("/card")
+        names = [
+            "DATALOG/20260616/BRP.EDF", "DATALOG/20260617/BRP.EDF", "DATALOG/20260618/BRP.EDF",
+            "DATALOG/20260618/EVE.EDF", "SETTINGS/CurrentSettings.json", "Identification.tgt", "STR.edf",
+        ]
+        plan = [{"name": name, "path": root / name} for name in names]
+
+        ordered, priority_count = file_ops.prioritize_sync_plan(plan, root, priority_nights=1)
+
+        self.assertEqual([entry["name"] for entry in ordered], [
+            "Identification.tgt", "STR.edf", "DATALOG/20260618/BRP.EDF", "DATALOG/20260618/EVE.EDF",
+            "DATALOG/20260617/BRP.EDF", "DATALOG/20260616/BRP.EDF", "SETTINGS/CurrentSettings.json",
+        ])
+        self.assertEqual(priority_count, 4)
+
+
+class CheckFilesTests(unittest.TestCase):
+    def test_downloads_run_concurrently_with_ordered_progress(self):
+        barrier = threading.Barrier(2, timeout=2)
+        progress = []
+        ezshare = SimpleNamespace(
+            manifest=None,
+            update_status=lambda message, message_type="info": None,
+            update_progress=lambda value, snapshot=None: progress.append(value),
+        )
+
+        def fake_download(ezshare_instance, url, file_path, file_ts=None, fsync=True, writer=None, progress=None):
+            barrier.wait()
+            return True
+
+        with tempfile.TemporaryDirectory() as directory:
+            plan = [
+                {"name": name, "url": f"http://example.test/{name}", "timestamp": 0,
+                 "path": pathlib.Path(directory) / "DATALOG" / name}
+                for name in ("BRP.EDF", "PLD.EDF", "SAD.EDF", "EVE.EDF")
+            ]
+            with patch("file_ops.download_file", side_effect=fake_download):
+                processed = file_ops.check_files(ezshare, plan, 4, 0, lambda: True, max_workers=2)
+
+        self.assertEqual(processed, 4)
+        self.assertEqual(progress, [25.0, 50.0, 75.0, 100.0])
+
+    def test_priority_event_fires_once_after_priority_entries(self):
+        events = []
+        ezshare = SimpleNamespace(
+            manifest=None,
+            update_status=lambda message, message_type="info": None,
+            update_progress=lambda value, snapshot=None: events.append(value),
+        )
+
+        def fake_download(ezshare_instance, url, file_path, file_ts=None, fsync=True, writer=None, progress=None):
+            return True
+
+        with tempfile.TemporaryDirectory() as directory:
+            plan = [
+                {"name": name, "url": f"http://example.test/{name}", "timestamp": 0,
+                 "path": pathlib.Path(directory) / name}
+                for name in ("STR.edf", "BRP.EDF", "PLD.EDF")
+            ]
+            with patch("file_ops.download_file", side_effect=fake_download):
+                file_ops.check_files(
+                    ezshare, plan, 3, 0, lambda: True, priority_count=2,
+                    on_priority_complete=lambda: events.append("priority_complete"),
+                )
+
+        self.assertEqual(events.index("priority_complete"), 2)
+        self.assertEqual(events.count("priority_complete"), 1)
+        self.assertEqual(events[-1], 100.0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,126 @@
+import queue
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import main
+from callbacks import Callbacks
+from main import EzShareCPAPUI
+
+
+class FakeWindow:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append(delay)
+
+
+class WorkerQueueTests(unittest.TestCase):
+    def make_app(self):
+        app = EzShareCPAPUI.__new__(EzShareCPAPUI)
+        app.worker_queue = queue.Queue()
+        app.worker_queue_interval = main.WORKER_QUEUE_INTERVAL
+        app.is_running = True
+        app.main_window = FakeWindow()
+        self.progress_bar = {"value": 0}
+        app.builder = type("Builder", (), {"get_object": lambda _, name: self.progress_bar})()
+        self.handled = []
+        app.update_status = lambda message, message_type="info": self.handled.append((message_type, message))
+        app.handle_priority_complete = lambda: self.handled.append(("priority_complete", self.progress_bar["value"]))
+        app.process_finished = lambda success: self.handled.append(("finished", success))
+        return app
+
+    def test_pending_messages_are_drained_and_coalesced(self):
+        app = self.make_app()
+        for message in (
+            ("status", "Downloading file 1/3", "info"),
+            ("progress", 10),
+            ("status", "Download failed", "error"),
+            ("progress", 40),
+            ("status", "Downloading file 2/3", "info"),
+            ("priority_complete",),
+            ("progress", 70),
+            ("status", "Downloading file 3/3", "info"),
+            ("progress", 100),
+        ):
+            app.worker_queue.put(message)
+
+        app.process_worker_queue()
+
+        self.assertTrue(app.worker_queue.empty())
+        self.assertEqual(self.handled, [
+            ("error", "Download failed"),
+            ("info", "Downloading file 2/3"),
+            ("priority_complete", 40),
+            ("info", "Downloading file 3/3"),
+        ])
+        self.assertEqual(self.progress_bar["value"], 100)
+        self.assertEqual(app.main_window.scheduled, [main.WORKER_QUEUE_INTERVAL])
+
+    def test_poll_interval_backs_off_while_idle_and_stops_when_finished(self):
+        app = self.make_app()
+        for _ in range(6):
+            app.process_worker_queue()
+        self.assertEqual(app.main_window.scheduled, [100, 200, 400, 500, 500, 500])
+
+        app.worker_queue.put(("status", "Scanning for files to download...", "info"))
+        app.process_worker_queue()
+        self.assertEqual(app.main_window.scheduled[-1], main.WORKER_QUEUE_INTERVAL)
+
+        def finished(success):
+            app.is_running = False
+
+        app.process_finished = finished
+        app.worker_queue.put(("finished", True))
+        app.process_worker_queue()
+        self.assertEqual(len(app.main_window.scheduled), 7)
+
+
+class PriorityCompleteTests(unittest.TestCase):
+    def test_early_import_runs_while_sync_disables_import_checkbox(self):
+        app = EzShareCPAPUI.__new__(EzShareCPAPUI)
+        app.import_oscar_var = SimpleNamespace(get=lambda: True)
+        app.button_states = {"import_oscar_checkbox": {"enabled": False, "default": True, "visible": True}}
+        app.callbacks = Callbacks.__new__(Callbacks)
+        app.callbacks.app = app
+
+        with patch("main.messagebox.askyesno", return_value=True), \
+                patch("platform.system", return_value="Linux"), \
+                patch.object(Callbacks, "_import_cpap_data_oscar_linux") as import_linux:
+            app.handle_priority_complete()
+
+        import_linux.assert_called_once_with()
+
+    def test_completion_does_not_import_again_after_early_import(self):
+        app = EzShareCPAPUI.__new__(EzShareCPAPUI)
+        app.oscar_imported_early = False
+        app.import_oscar_var = SimpleNamespace(get=lambda: True)
+        app.quit_var = SimpleNamespace(get=lambda: True)
+        app.main_window = SimpleNamespace(quit=lambda: None)
+        app.callbacks = SimpleNamespace(run_oscar_import=lambda: None, import_cpap_data_with_oscar=lambda: None)
+
+        with patch("main.messagebox.askyesno", return_value=True) as askyesno, \
+                patch.object(app.callbacks, "import_cpap_data_with_oscar") as import_oscar:
+            app.handle_priority_complete()
+            app.prompt_completion_tasks()
+
+        self.assertTrue(app.oscar_imported_early)
+        self.assertEqual(askyesno.call_args.args, ("Completion Tasks", "Do you want to Quit the application?"))
+        import_oscar.assert_not_called()
+
+    def test_starting_worker_resets_early_import(self):
+        app = EzShareCPAPUI.__new__(EzShareCPAPUI)
+        app.oscar_imported_early = True
+        app.ezshare = None
+        app.worker_queue = queue.Queue()
+
+        with patch("main.EzShareWorker") as worker:
+            app.start_worker()
+
+        self.assertFalse(app.oscar_imported_early)
+        worker.return_value.start.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
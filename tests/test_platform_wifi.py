@@ -1,10 +1,16 @@
+import json
+import socket
 import subprocess
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from types import SimpleNamespace
 from unittest.mock import patch
 
 from ez_share_config import EzShareConfig
+import wifi_utils
 from wifi_utils import ConnectionManager
 
 
@@ -18,13 +24,19 @@ class ConnectionManagerCommandTests(unittest.TestCase):
         manager.interface = "en0"
         commands = []
 
+        power = ["On"]
+
         def fake_run(command, **kwargs):
             commands.append(command)
             if command == ["networksetup", "-getairportnetwork", "en0"]:
                 return completed(command, stdout="You are not associated with an AirPort network.\n")
+            if command[:2] == ["networksetup", "-setairportpower"]:
+                power[0] = command[3].capitalize()
+            if command == ["networksetup", "-getairportpower", "en0"]:
+                return completed(command, stdout=f"Wi-Fi Power (en0): {power[0]}\n")
             return completed(command)
 
-        with patch("wifi_utils.subprocess.run", side_effect=fake_run), patch("wifi_utils.time.sleep"):
+        with patch("wifi_utils.subprocess.run", side_effect=fake_run), patch("wifi_utils.time.sleep") as sleep:
             manager._disconnect_macos("ez Share")
 
         self.assertEqual(
@@ -32,10 +44,28 @@ class ConnectionManagerCommandTests(unittest.TestCase):
             [
                 ["networksetup", "-removepreferredwirelessnetwork", "en0", "ez Share"],
                 ["networksetup", "-setairportpower", "en0", "off"],
+                ["networksetup", "-getairportpower", "en0"],
                 ["networksetup", "-setairportpower", "en0", "on"],
+                ["networksetup", "-getairportpower", "en0"],
                 ["networksetup", "-getairportnetwork", "en0"],
             ],
         )
+        sleep.assert_not_called()
+
+    def test_macos_disconnect_polls_until_power_change_is_reported(self):
+        manager = ConnectionManager()
+        manager.interface = "en0"
+        power_reports = iter(["On", "On", "Off", "Off", "On"])
+
+        def fake_run(command, **kwargs):
+            if command == ["networksetup", "-getairportpower", "en0"]:
+                return completed(command, stdout=f"Wi-Fi Power (en0): {next(power_reports)}\n")
+            return completed(command)
+
+        with patch("wifi_utils.subprocess.run", side_effect=fake_run), patch("wifi_utils.time.sleep") as sleep:
+            manager._disconnect_macos(None)
+
+        self.assertEqual(sleep.call_count, 3)
 
     def test_macos_disconnect_fails_when_wifi_rejoins_target_ssid(self):
         manager = ConnectionManager()
@@ -405,8 +435,207 @@ Interface name: Wi-Fi
             ],
         )
 
+    def test_linux_connect_reuses_matching_saved_profile(self):
+        manager = ConnectionManager()
+        manager.interface = "wlan0"
+        manager.keep_linux_profile = True
+        commands = []
+
+        def fake_run(command, **kwargs):
+            commands.append(command)
+            if command[:2] == ["nmcli", "--show-secrets"]:
+                return completed(command, stdout="wlan0\nez Share\n88888888\n")
+            return completed(command)
+
+        with patch("wifi_utils.subprocess.run", side_effect=fake_run):
+            manager._connect_linux("ez Share", "88888888")
+            manager._disconnect_linux("ez Share")
+
+        self.assertEqual(commands[1:], [
+            ["nmcli", "con", "up", "ezShareCPAP-ez Share"],
+            ["nmcli", "con", "down", "id", "ezShareCPAP-ez Share"],
+        ])
+
+    def test_linux_connect_rebuilds_saved_profile_when_psk_changed(self):
+        manager = ConnectionManager()
+        manager.interface = "wlan0"
+        manager.keep_linux_profile = True
+        commands = []
+
+        def fake_run(command, **kwargs):
+            commands.append(command)
+            if command[:2] == ["nmcli", "--show-secrets"]:
+                return completed(command, stdout="wlan0\nez Share\nold-psk\n")
+            return completed(command)
+
+        with patch("wifi_utils.subprocess.run", side_effect=fake_run):
+            manager._connect_linux("ez Share", "88888888")
+
+        self.assertEqual(commands[1], ["nmcli", "con", "delete", "id", "ezShareCPAP-ez Share"])
+        self.assertEqual(commands[2][:3], ["nmcli", "con", "add"])
+        self.assertEqual(commands[-1], ["nmcli", "con", "up", "ezShareCPAP-ez Share"])
+
+
+class InterfaceCacheTests(unittest.TestCase):
+    def setUp(self):
+        wifi_utils._interface_cache.clear()
+        self.addCleanup(wifi_utils._interface_cache.clear)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = Path(tmpdir.name)
+        (self.root / "net" / "wlan0" / "wireless").mkdir(parents=True)
+        for target, value in (
+            ("wifi_utils.get_interface_cache_file", lambda: self.root / "cache" / "wifi_interface.json"),
+            ("wifi_utils.SYS_CLASS_NET", self.root / "net"),
+        ):
+            patcher = patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def linux_manager(self):
+        manager = ConnectionManager()
+        manager.system = "Linux"
+        return manager
+
+    def test_lookup_result_is_reused_by_new_managers_and_processes(self):
+        with patch("wifi_utils.subprocess.run", return_value=completed(["nmcli"], stdout="wlan0:wifi:disconnected\n")) as run:
+            self.assertTrue(self.linux_manager().find_wifi_interface())
+            self.assertTrue(self.linux_manager().find_wifi_interface())
+            wifi_utils._interface_cache.clear()
+            manager = self.linux_manager()
+            self.assertTrue(manager.find_wifi_interface())
+
+        self.assertEqual(manager.interface, "wlan0")
+        self.assertEqual([call.args[0][0] for call in run.call_args_list].count("nmcli"), 1)
+        self.assertEqual(json.loads((self.root / "cache" / "wifi_interface.json").read_text()), {"Linux": "wlan0"})
+
+    def test_cached_interface_that_disappeared_is_looked_up_again(self):
+        wifi_utils.save_cached_interface("Linux", "wlan9")
+        manager = self.linux_manager()
+
+        with patch("wifi_utils.subprocess.run", return_value=completed(["nmcli"], stdout="wlan0:wifi:disconnected\n")):
+            self.assertTrue(manager.find_wifi_interface())
+
+        self.assertEqual(manager.interface, "wlan0")
+
+
+class ReadinessProbeTests(unittest.TestCase):
+    def test_verify_connection_returns_once_web_server_answers(self):
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        try:
+            manager = ConnectionManager()
+            self.assertTrue(manager.verify_connection("127.0.0.1", httpd.server_port, timeout=5))
+        finally:
+            httpd.shutdown()
+            httpd.server_close()
+
+        self.assertLess(manager.ready_time, 1)
+
+    def test_wait_for_http_server_backs_off_until_timeout(self):
+        with socket.socket() as unused:
+            unused.bind(("127.0.0.1", 0))
+            port = unused.getsockname()[1]
+        sleeps = []
+
+        with patch("wifi_utils.time.sleep", side_effect=sleeps.append), \
+                patch("wifi_utils.time.monotonic", side_effect=[0, 0.5, 1.5, 3.0]):
+            self.assertIsNone(wifi_utils.wait_for_http_server("127.0.0.1", port, timeout=3))
+
+        self.assertEqual(sleeps, [wifi_utils.READINESS_POLL_INITIAL, wifi_utils.READINESS_POLL_INITIAL * 2])
+
+    def test_wait_for_http_server_stops_when_cancelled(self):
+        with patch("wifi_utils.probe_http_server", return_value=False), patch("wifi_utils.time.sleep") as sleep:
+            self.assertIsNone(wifi_utils.wait_for_http_server("127.0.0.1", 80, timeout=30, is_running=lambda: False))
+
+        sleep.assert_not_called()
+
+    def test_verify_connection_waits_for_link_before_probing_server(self):
+        manager = ConnectionManager()
+        manager.interface = "wlan0"
+        link_states = iter([False, False, True])
+
+        with patch.object(manager, "link_ready", side_effect=lambda: next(link_states)), \
+                patch("wifi_utils.probe_http_server", return_value=True) as probe, \
+                patch("wifi_utils.time.sleep") as sleep:
+            self.assertTrue(manager.verify_connection("192.168.4.1", timeout=30))
+
+        probe.assert_called_once_with("192.168.4.1", 80)
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_verify_connection_shares_one_deadline_between_link_and_server(self):
+        manager = ConnectionManager()
+        manager.interface = "wlan0"
+
+        with patch.object(manager, "link_ready", return_value=True), \
+                patch("wifi_utils.probe_http_server", return_value=False), \
+                patch("wifi_utils.time.sleep"), \
+                patch("wifi_utils.time.monotonic", side_effect=[0, 4.0, 4.0, 6.0]):
+            self.assertFalse(manager.verify_connection("192.168.4.1", timeout=5))
+
+        self.assertIsNone(manager.ready_time)
+
+    def test_linux_link_ready_requires_operstate_up(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            device = Path(tmpdir) / "wlan0"
+            device.mkdir()
+            (device / "operstate").write_text("dormant\n")
+
+            with patch("wifi_utils.SYS_CLASS_NET", Path(tmpdir)):
+                self.assertFalse(wifi_utils.linux_link_ready("wlan0"))
+                self.assertFalse(wifi_utils.linux_link_ready("wlan1"))
+
 
 class EzShareConfigTests(unittest.TestCase):
+    def test_configuration_page_opens_once_card_is_ready(self):
+        app = SimpleNamespace(
+            builder=SimpleNamespace(get_object=lambda name: SimpleNamespace(get=lambda: name)),
+            main_window=SimpleNamespace(after=lambda delay, callback: scheduled.append(delay)),
+        )
+        scheduled = []
+        config = EzShareConfig(app)
+        config.connection_manager = SimpleNamespace(connect=lambda ssid, psk: None, connected=True)
+        config.connection_manager.verify_connection = lambda is_running: True
+
+        config._connect_and_configure()
+
+        self.assertEqual(scheduled, [0])
+
+    def test_unreachable_card_is_reported_instead_of_opening_config_page(self):
+        progress_bar = {}
+        app = SimpleNamespace(
+            builder=SimpleNamespace(get_object=lambda name: progress_bar if name == "progress_bar" else SimpleNamespace(get=lambda: name)),
+            main_window=SimpleNamespace(after=lambda delay, callback: scheduled.append(callback)),
+            is_running=True,
+        )
+        scheduled = []
+        disconnects = []
+        config = EzShareConfig(app)
+        config.connection_manager = SimpleNamespace(
+            connect=lambda ssid, psk: None, connected=True, disconnect=disconnects.append,
+            verify_connection=lambda is_running: False,
+        )
+
+        config._connect_and_configure()
+        with patch("ez_share_config.update_status") as update_status, \
+                patch("ez_share_config.set_default_button_states"), \
+                patch.object(config, "_open_configuration_page") as open_page:
+            for callback in scheduled:
+                callback()
+
+        open_page.assert_not_called()
+        self.assertEqual(disconnects, ["ssid_entry"])
+        self.assertFalse(app.is_running)
+        self.assertEqual(update_status.call_args.args[2], "error")
+
     def test_config_page_uses_cross_platform_browser_open(self):
         config = EzShareConfig(SimpleNamespace())
 
@@ -0,0 +1,47 @@
+import pstats
+import tempfile
+import unittest
+from pathlib import Path
+
+from profiling import MemoryProfiler, run_profiled
+
+
+def build_listing(entries):
+    return [("BRP.edf", f"file=DATALOG%5C{index}", 0, 1024) for index in range(entries)]
+
+
+class ProfilingTests(unittest.TestCase):
+    def test_run_profiled_saves_stats_and_sorted_summary(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = Path(tmpdir) / "profiles" / "sync.pstats"
+
+            result = run_profiled(target, build_listing, 100)
+
+            stats = pstats.Stats(str(target))
+            summary = target.with_suffix(".txt").read_text(encoding="utf-8")
+
+        self.assertEqual(len(result), 100)
+        self.assertTrue(any(function[2] == "build_listing" for function in stats.stats))
+        self.assertIn("Sorted by cumulative", summary)
+        self.assertIn("Sorted by tottime", summary)
+        self.assertIn("build_listing", summary)
+
+    def test_memory_profiler_reports_each_snapshot_and_growth(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = Path(tmpdir) / "memory.txt"
+            with MemoryProfiler(target) as profiler:
+                profiler.snapshot("scan_finished")
+                retained = build_listing(5000)
+                profiler.snapshot("sync_finished")
+
+            report = target.read_text(encoding="utf-8")
+
+        self.assertEqual(len(retained), 5000)
+        self.assertIn("== scan_finished:", report)
+        self.assertIn("== sync_finished:", report)
+        self.assertIn("-- growth since scan_finished --", report)
+        self.assertIn("test_profiling.py", report)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import file_ops
+from sync_manifest import SyncManifest
+
+
+def ezshare_with(manifest, verify_local=False):
+    return SimpleNamespace(
+        overwrite=False, keep_old=False, manifest=manifest, verify_local=verify_local,
+        time_tolerance=file_ops.DEFAULT_TIME_TOLERANCE,
+    )
+
+
+class SyncManifestTests(unittest.TestCase):
+    def test_records_survive_reopening_the_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = SyncManifest(tmpdir).open()
+            manifest.record(Path(tmpdir) / "DATALOG" / "BRP.EDF", 1000.0, 2048, 1000.0)
+            manifest.close()
+
+            reopened = SyncManifest(tmpdir).open()
+            record = reopened.lookup(Path(tmpdir) / "DATALOG" / "BRP.EDF")
+            reopened.close()
+
+        self.assertEqual(record, (1000.0, 2048, 1000.0))
+
+    def test_should_download_trusts_manifest_without_checking_disk(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = SyncManifest(tmpdir).open()
+            missing_file = Path(tmpdir) / "STR.EDF"
+            manifest.record(missing_file, 1000.0, 10, 1000.0)
+
+            self.assertFalse(file_ops.should_download(ezshare_with(manifest), missing_file, 1000.0))
+            self.assertTrue(file_ops.should_download(ezshare_with(manifest), missing_file, 2000.0))
+            self.assertTrue(file_ops.should_download(ezshare_with(manifest, verify_local=True), missing_file, 1000.0))
+            manifest.close()
+
+    def test_should_download_adopts_current_local_files_into_manifest(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = SyncManifest(tmpdir).open()
+            local_file = Path(tmpdir) / "STR.EDF"
+            local_file.write_bytes(b"edf-data")
+            os.utime(local_file, (1000.0, 1000.0))
+
+            self.assertFalse(file_ops.should_download(ezshare_with(manifest), local_file, 1000.0))
+            self.assertEqual(manifest.lookup(local_file), (1000.0, 8, 1000.0))
+            manifest.close()
+
+    def test_should_download_compares_listed_size_with_recorded_size(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest = SyncManifest(tmpdir).open()
+            local_file = Path(tmpdir) / "BRP.EDF"
+            manifest.record(local_file, 1000.0, 12 * 1024 - 300, 1000.0)
+
+            self.assertFalse(file_ops.should_download(ezshare_with(manifest), local_file, 1000.0, 12 * 1024))
+            self.assertTrue(file_ops.should_download(ezshare_with(manifest), local_file, 1000.0, 20 * 1024))
+            manifest.close()
+
+    def test_should_download_fetches_truncated_local_copy_again(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            local_file = Path(tmpdir) / "BRP.EDF"
+            local_file.write_bytes(b"x" * 4096)
+            os.utime(local_file, (1000.0, 1000.0))
+
+            self.assertTrue(file_ops.should_download(ezshare_with(None), local_file, 1000.0, 12 * 1024))
+            self.assertFalse(file_ops.should_download(ezshare_with(None), local_file, 1000.0, 4 * 1024))
+            self.assertFalse(file_ops.should_download(ezshare_with(None), local_file, 1000.0))
+
+    def test_should_download_ignores_differences_within_time_tolerance(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            local_file = Path(tmpdir) / "STR.EDF"
+            local_file.write_bytes(b"edf-data")
+            os.utime(local_file, (1000.0, 1000.0))
+
+            self.assertFalse(file_ops.should_download(ezshare_with(None), local_file, 1002.0))
+            self.assertTrue(file_ops.should_download(ezshare_with(None), local_file, 1003.0))
+
+    def test_skew_check_and_plan_stat_each_local_file_once(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            entries = []
+            for name in ("STR.EDF", "BRP.EDF", "PLD.EDF", "NEW.EDF"):
+                local_file = Path(tmpdir) / name
+                if name != "NEW.EDF":
+                    local_file.write_bytes(b"edf-data")
+                    os.utime(local_file, (1000.0, 1000.0))
+                entries.append({"path": local_file, "timestamp": 1000.0, "size": 8})
+            manifest = SyncManifest(tmpdir).open()
+            ezshare = ezshare_with(manifest, verify_local=True)
+            local_stats = {}
+
+            with patch("file_ops._stat_regular_file", wraps=file_ops._stat_regular_file) as stat_file:
+                self.assertEqual(file_ops.detect_timestamp_skew(ezshare, entries, local_stats), (0, []))
+                planned = [
+                    entry["path"].name for entry in entries
+                    if file_ops.should_download(ezshare, entry["path"], entry["timestamp"], entry["size"], local_stats)
+                ]
+            manifest.close()
+
+        self.assertEqual(planned, ["NEW.EDF"])
+        self.assertEqual(stat_file.call_count, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import file_ops
+from timings import NULL_TIMINGS, SyncTimings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class SyncTimingsTests(unittest.TestCase):
+    def test_summary_sums_phases_in_sync_order(self):
+        clock = FakeClock()
+        timings = SyncTimings(clock=clock)
+        with timings.phase("scan"):
+            clock.now += 0.25
+        for size in (1_000_000, 3_000_000):
+            with timings.phase("download") as download:
+                clock.now += 0.5
+                download.bytes = size
+        with timings.phase("associate"):
+            clock.now += 2.0
+
+        summary = timings.summary()
+
+        self.assertEqual([phase["name"] for phase in summary["phases"]], ["associate", "scan", "download"])
+        download = summary["phases"][2]
+        self.assertEqual((download["count"], download["ms"], download["bytes"]), (2, 1000.0, 4_000_000))
+        self.assertEqual(download["mb_per_s"], 4.0)
+        self.assertEqual(summary["total_ms"], 3250.0)
+        self.assertIsNone(summary["phases"][0]["mb_per_s"])
+
+    def test_phase_is_recorded_when_it_raises(self):
+        timings = SyncTimings()
+        with self.assertRaises(RuntimeError):
+            with timings.phase("associate"):
+                raise RuntimeError("no carrier")
+
+        self.assertEqual(timings.summary()["phases"][0]["count"], 1)
+
+    def test_disabled_timings_ignore_recorded_bytes(self):
+        with NULL_TIMINGS.phase("download") as record:
+            record.bytes += 4096
+
+        self.assertEqual(NULL_TIMINGS.total_bytes("download"), 0)
+        self.assertEqual(record.bytes, 0)
+
+    def test_download_file_records_bytes_and_duration(self):
+        payload = b"edf-data" * 128
+        response = Mock(status_code=200, headers={"content-length": str(len(payload))})
+        response.iter_content.return_value = [payload]
+        response.raw = None
+        timings = SyncTimings()
+        ezshare = SimpleNamespace(
+            retries=1, connection_delay=0, _is_running=True, timings=timings,
+            session=Mock(get=Mock(return_value=response)),
+        )
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            target = Path(tmpdir) / "BRP.edf"
+            self.assertTrue(file_ops.download_file(ezshare, "http://card/download?file=BRP.edf", target))
+            timings.save(Path(tmpdir) / "timings" / "run.json")
+            self.assertTrue((Path(tmpdir) / "timings" / "run.json").is_file())
+
+        self.assertEqual(timings.total_bytes("download"), len(payload))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+
+from transfer_progress import PROGRESS_INTERVAL, TransferProgress, format_duration, format_progress
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TransferProgressTests(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.reports = []
+
+    def progress(self, total_bytes, total_files, unsized_files=0):
+        return TransferProgress(
+            total_bytes, total_files, unsized_files=unsized_files, report=self.reports.append, clock=self.clock,
+        )
+
+    def test_percentage_follows_bytes_not_files(self):
+        progress = self.progress(1000 + 9000, 2)
+        small, large = progress.file(1000), progress.file(9000)
+
+        small.add(1000)
+        small.finish(True)
+        self.assertEqual(self.reports[-1].percent, 10)
+        self.assertEqual(self.reports[-1].files, 1)
+
+        self.clock.now += PROGRESS_INTERVAL
+        large.add(4500)
+        self.assertAlmostEqual(self.reports[-1].percent, 55)
+
+    def test_chunks_are_reported_at_most_every_interval(self):
+        progress = self.progress(10000, 1)
+        transfer = progress.file(10000)
+
+        for _ in range(5):
+            transfer.add(100)
+        self.assertEqual(self.reports, [])
+
+        self.clock.now += PROGRESS_INTERVAL
+        transfer.add(100)
+        transfer.add(100)
+        self.assertEqual([report.bytes for report in self.reports], [600])
+
+    def test_throughput_is_smoothed_and_gives_eta(self):
+        progress = self.progress(10_000_000, 1)
+        transfer = progress.file(10_000_000)
+
+        self.clock.now += 1
+        transfer.add(1_000_000)
+        self.assertEqual(self.reports[-1].throughput, 1_000_000)
+        self.assertEqual(self.reports[-1].eta, 9)
+
+        self.clock.now += 1
+        transfer.add(3_000_000)
+        self.assertAlmostEqual(self.reports[-1].throughput, 1_600_000)
+        self.assertAlmostEqual(self.reports[-1].eta, 6_000_000 / 1_600_000)
+
+    def test_finished_files_count_with_listed_size(self):
+        progress = self.progress(2048 + 4096, 2)
+        resumed, restarted = progress.file(2048), progress.file(4096)
+
+        resumed.add(1024)
+        resumed.finish(True)
+        restarted.add(3000)
+        restarted.add(4096)
+        restarted.finish(True)
+
+        snapshot = progress.snapshot()
+        self.assertEqual((snapshot.percent, snapshot.bytes, snapshot.total_bytes), (100, 6144, 6144))
+        self.assertEqual(snapshot.eta, 0)
+
+    def test_failed_file_takes_back_its_bytes(self):
+        progress = self.progress(2000, 2)
+        failed = progress.file(1000)
+        failed.add(600)
+        failed.finish(False)
+
+        snapshot = progress.snapshot()
+        self.assertEqual((snapshot.bytes, snapshot.files, snapshot.percent), (0, 0, 0))
+        self.assertEqual(self.reports, [])
+
+    def test_percentage_falls_back_to_files_without_sizes(self):
+        progress = self.progress(0, 4, unsized_files=4)
+        for _ in range(2):
+            transfer = progress.file(None)
+            transfer.add(1000)
+            transfer.finish(True)
+
+        self.assertEqual([report.percent for report in self.reports], [25, 50])
+        self.assertEqual([report.total_bytes for report in self.reports], [None, None])
+        self.assertEqual(self.reports[-1].bytes, 2000)
+        self.assertIsNone(self.reports[-1].eta)
+
+    def test_percentage_falls_back_to_files_when_some_sizes_are_missing(self):
+        progress = self.progress(900_000, 2, unsized_files=1)
+        listed = progress.file(900_000)
+        listed.add(900_000)
+        listed.finish(True)
+
+        self.assertEqual(self.reports[-1].percent, 50)
+        self.assertEqual(format_progress(50, self.reports[-1]), "Progress: 50.00% (0.9 MB)")
+
+    def test_format_progress(self):
+        progress = self.progress(80_000_000, 2)
+        transfer = progress.file(80_000_000)
+        self.clock.now += 10
+        transfer.add(12_000_000)
+
+        self.assertEqual(
+            format_progress(15, self.reports[-1]), "Progress: 15.00% (12.0 of 80.0 MB, 1.2 MB/s, 57 s left)",
+        )
+        self.assertEqual(format_progress(15), "Progress: 15.00%")
+        self.assertEqual(format_duration(3725), "1 h 02 min")
+        self.assertEqual(format_duration(190), "3 min 10 s")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+# timings.py
+import datetime
+import json
+import logging
+import pathlib
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Phases in the order a sync run goes through them; other phase names are listed after these.
+PHASE_ORDER = ('interface', 'associate', 'address', 'server', 'scan', 'plan', 'transfer', 'download', 'disconnect')
+
+
+class PhaseRecord:
+    """One timed occurrence of a phase. Code inside the phase may add the bytes it moved."""
+
+    __slots__ = ('name', 'start', 'duration', 'bytes')
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.duration = None
+        self.bytes = 0
+
+
+class _Phase:
+    __slots__ = ('timings', 'record')
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.record = PhaseRecord(name, timings.clock())
+
+    def __enter__(self):
+        return self.record
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record.duration = self.timings.clock() - self.record.start
+        self.timings._add(self.record)
+        return False
+
+
+class SyncTimings:
+    """
+    Per-run breakdown of where a sync spends its time.
+
+    Code wraps each phase in ``with timings.phase(name) as record:`` and may set
+    record.bytes. Phases with the same name, such as the download of each file, are
+    summed in the report. Download phases of concurrent files overlap; the transfer
+    phase measures the wall time of all downloads together.
+    """
+
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.started_at = datetime.datetime.now().astimezone()
+        self.lock = threading.Lock()
+        self.records = []
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def total_bytes(self, name):
+        with self.lock:
+            return sum(record.bytes for record in self.records if record.name == name)
+
+    def summary(self):
+        """
+        Summarize the recorded phases.
+
+        :return: Dictionary with the run start, total wall time and one entry per phase name.
+        """
+        with self.lock:
+            records = list(self.records)
+        ended = max((record.start + record.duration for record in records), default=self.started)
+        phases = {}
+        for record in records:
+            phase = phases.setdefault(record.name, {'name': record.name, 'count': 0, 'ms': 0.0, 'bytes': 0})
+            phase['count'] += 1
+            phase['ms'] += record.duration * 1000
+            phase['bytes'] += record.bytes
+        for phase in phases.values():
+            phase['ms'] = round(phase['ms'], 3)
+            phase['mb_per_s'] = round(phase['bytes'] / phase['ms'] / 1000, 3) if phase['bytes'] and phase['ms'] else None
+        order = {name: index for index, name in enumerate(PHASE_ORDER)}
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'total_ms': round((ended - self.started) * 1000, 3),
+            'phases': sorted(phases.values(), key=lambda phase: order.get(phase['name'], len(order))),
+        }
+
+    def format_report(self):
+        """Format the summary as a table for the terminal."""
+        summary = self.summary()
+        lines = [f'{"phase":<12}{"count":>7}{"ms":>12}{"MB":>10}{"MB/s":>9}']
+        for phase in summary['phases']:
+            megabytes = f'{phase["bytes"] / 1e6:.2f}' if phase['bytes'] else '-'
+            rate = f'{phase["mb_per_s"]:.2f}' if phase['mb_per_s'] else '-'
+            lines.append(f'{phase["name"]:<12}{phase["count"]:>7}{phase["ms"]:>12.1f}{megabytes:>10}{rate:>9}')
+        lines.append(f'{"total":<12}{"":>7}{summary["total_ms"]:>12.1f}')
+        return '\n'.join(lines)
+
+    def save(self, path):
+        """Write the summary to a JSON file."""
+        path = pathlib.Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        logger.debug(f'Saved sync timings to {path}')
+
+    def _add(self, record):
+        with self.lock:
+            self.records.append(record)
+
+
+class _NullRecord:
+    __slots__ = ()
+
+    bytes = 0
+
+    def __setattr__(self, name, value):
+        pass
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return _NULL_RECORD
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_RECORD = _NullRecord()
+_NULL_PHASE = _NullPhase()
+
+
+class NullTimings:
+    """Stand-in used when timings are disabled; every phase is the same no-op context."""
+
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def total_bytes(self, name):
+        return 0
+
+
+NULL_TIMINGS = NullTimings()
@@ -0,0 +1,177 @@
+# transfer_progress.py
+import collections
+import threading
+import time
+
+# Seconds between progress reports while files are streaming; every finished file is reported as well.
+PROGRESS_INTERVAL = 0.5
+# Weight of the newest throughput sample in the exponentially weighted moving average.
+THROUGHPUT_SMOOTHING = 0.3
+
+ProgressSnapshot = collections.namedtuple(
+    'ProgressSnapshot', ['percent', 'bytes', 'total_bytes', 'files', 'total_files', 'throughput', 'eta'],
+)
+
+
+class TransferProgress:
+    """
+    Progress of a sync plan measured in bytes.
+
+    The total comes from the file sizes in the card listing. Downloads add the bytes
+    of every chunk they receive through FileProgress.add, and a finished file counts
+    with its listed size, so that resumed or restarted transfers still end at 100%.
+    Throughput is an exponentially weighted moving average of samples taken at least
+    PROGRESS_INTERVAL apart, and the ETA is the remaining bytes at that rate. When
+    any file of the plan has no listed size, the percentage falls back to the share
+    of files done and the total and ETA are unknown.
+
+    Reports go to report(snapshot) at most every PROGRESS_INTERVAL while data
+    arrives and once for each finished file. They are made while holding the lock,
+    so concurrent downloads report in order.
+
+    :param total_bytes: Listed bytes of the files in the plan that have a size.
+    :param total_files: Number of files in the plan.
+    :param files: Number of files already processed.
+    :param unsized_files: Number of files in the plan without a listed size.
+    :param report: Function called with a ProgressSnapshot.
+    :param clock: Monotonic clock in seconds.
+    """
+
+    def __init__(self, total_bytes, total_files, files=0, unsized_files=0, report=None, clock=time.monotonic):
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+        self.files = files
+        self.unsized_files = unsized_files
+        self.bytes = 0
+        self.throughput = None
+        self.report = report
+        self.clock = clock
+        self.lock = threading.Lock()
+        self._sample_start = clock()
+        self._sample_bytes = 0
+        self._next_report = self._sample_start + PROGRESS_INTERVAL
+
+    def file(self, expected_size):
+        """
+        Start tracking one file of the plan.
+
+        :param expected_size: Size of the file from the listing, or None if unknown.
+        :return: FileProgress for the download of the file.
+        """
+        return FileProgress(self, expected_size)
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot(self.clock())
+
+    def _received(self, size):
+        with self.lock:
+            self.bytes += size
+            self._sample_bytes += size
+            now = self.clock()
+            if now >= self._next_report:
+                self._report(self._snapshot(now))
+
+    def _finished(self, done_bytes, success):
+        with self.lock:
+            self.bytes += done_bytes
+            if success:
+                self.files += 1
+                self._report(self._snapshot(self.clock()))
+
+    def _report(self, snapshot):
+        if self.report is not None:
+            self.report(snapshot)
+
+    def _snapshot(self, now):
+        elapsed = now - self._sample_start
+        if elapsed >= PROGRESS_INTERVAL:
+            sample = self._sample_bytes / elapsed
+            if self.throughput is None:
+                self.throughput = sample
+            else:
+                self.throughput += THROUGHPUT_SMOOTHING * (sample - self.throughput)
+            self._sample_start = now
+            self._sample_bytes = 0
+        self._next_report = now + PROGRESS_INTERVAL
+
+        if self.unsized_files or self.total_bytes <= 0:
+            percent = self.files / self.total_files * 100 if self.total_files else 0
+            total_bytes = None
+            eta = 0 if self.files >= self.total_files else None
+        else:
+            percent = self.bytes / self.total_bytes * 100
+            total_bytes = self.total_bytes
+            remaining = max(0, self.total_bytes - self.bytes)
+            if not remaining:
+                eta = 0 if self.files >= self.total_files else None
+            elif self.throughput:
+                eta = remaining / self.throughput
+            else:
+                eta = None
+        return ProgressSnapshot(
+            min(max(0, percent), 100), self.bytes, total_bytes, self.files, self.total_files, self.throughput, eta,
+        )
+
+
+class FileProgress:
+    """Bytes received for one file; add is passed to download_file as its progress callback."""
+
+    __slots__ = ('progress', 'expected_size', 'received')
+
+    def __init__(self, progress, expected_size):
+        self.progress = progress
+        self.expected_size = expected_size
+        self.received = 0
+
+    def add(self, size):
+        self.received += size
+        self.progress._received(size)
+
+    def finish(self, success):
+        """
+        Settle the file in the totals.
+
+        A downloaded file counts with its listed size, or with what was received when it
+        has none. A failed file takes back the bytes it added.
+        """
+        if not success:
+            self.progress._finished(-self.received, False)
+        elif self.expected_size is None:
+            self.progress._finished(0, True)
+        else:
+            self.progress._finished(self.expected_size - self.received, True)
+
+
+def format_progress(percent, snapshot=None):
+    """
+    Describe sync progress for the status line.
+
+    :param percent: Percentage done.
+    :param snapshot: Optional ProgressSnapshot with bytes, throughput and ETA.
+    :return: Text such as 'Progress: 42.00% (12.3 of 80.1 MB, 1.4 MB/s, 48 s left)'.
+    """
+    message = f'Progress: {percent:.2f}%'
+    if snapshot is None:
+        return message
+    details = []
+    if snapshot.total_bytes:
+        details.append(f'{snapshot.bytes / 1e6:.1f} of {snapshot.total_bytes / 1e6:.1f} MB')
+    elif snapshot.bytes:
+        details.append(f'{snapshot.bytes / 1e6:.1f} MB')
+    if snapshot.throughput is not None:
+        details.append(f'{snapshot.throughput / 1e6:.1f} MB/s')
+    if snapshot.eta:
+        details.append(f'{format_duration(snapshot.eta)} left')
+    return f'{message} ({", ".join(details)})' if details else message
+
+
+def format_duration(seconds):
+    seconds = max(1, int(round(seconds)))
+    if seconds < 60:
+        return f'{seconds} s'
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f'{minutes} min {seconds:02d} s'
+    hours, minutes = divmod(minutes, 60)
+    return f'{hours} h {minutes:02d} min'
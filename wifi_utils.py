@@ -1,15 +1,207 @@
 # wifi_utils.py
+import json
 import os
+import pathlib
+import socket
 import subprocess
 import logging
 import threading
+import struct
 import time
 import platform
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from xml.sax.saxutils import escape
 
+from timings import NULL_TIMINGS
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Seconds to wait for the ez Share web server to answer after joining its network.
+READINESS_TIMEOUT = 20
+# Readiness polls start this far apart and back off exponentially up to the maximum.
+READINESS_POLL_INITIAL = 0.05
+READINESS_POLL_MAX = 1.0
+# Seconds a single readiness probe may take to connect and read the status line.
+READINESS_PROBE_TIMEOUT = 1.0
+# Discovered Wi-Fi interfaces are remembered per platform in this file of the cache directory.
+INTERFACE_CACHE_FILE_NAME = 'wifi_interface.json'
+SYS_CLASS_NET = pathlib.Path('/sys/class/net')
+# Linux ioctl returning the IPv4 address of an interface.
+SIOCGIFADDR = 0x8915
+# Seconds to wait for macOS to report a Wi-Fi power change after a disconnect.
+POWER_CHANGE_TIMEOUT = 10
+
+_interface_cache = {}
+_interface_cache_lock = threading.Lock()
+
+
+def get_cache_dir():
+    """Get the per-user directory for ezShareCPAP caches."""
+    system = platform.system()
+    home = pathlib.Path.home()
+    if system == 'Darwin':
+        return home / 'Library' / 'Caches' / 'ezShareCPAP'
+    if system == 'Windows':
+        return pathlib.Path(os.getenv('LOCALAPPDATA', home / 'AppData' / 'Local')) / 'ezShareCPAP'
+    return pathlib.Path(os.getenv('XDG_CACHE_HOME', home / '.cache')) / 'ezShareCPAP'
+
+
+def get_interface_cache_file():
+    return get_cache_dir() / INTERFACE_CACHE_FILE_NAME
+
+
+def interface_present(system, interface):
+    """
+    Cheaply check that a cached interface still exists.
+
+    Linux interfaces are looked up in /sys/class/net and macOS interfaces in the kernel
+    interface list. Windows adapter names cannot be checked without a subprocess and are
+    trusted until a connection attempt fails.
+    """
+    if system == 'Windows':
+        return True
+    if system == 'Darwin':
+        try:
+            return interface in {name for _, name in socket.if_nameindex()}
+        except OSError:
+            return False
+    device = SYS_CLASS_NET / interface
+    return (device / 'wireless').is_dir() or (device / 'phy80211').exists()
+
+
+def load_cached_interface(system):
+    """
+    Get the Wi-Fi interface found by an earlier lookup on this platform.
+
+    :return: Interface name, or None if nothing is cached or the interface is gone.
+    """
+    with _interface_cache_lock:
+        interface = _interface_cache.get(system)
+        if interface is None:
+            try:
+                with get_interface_cache_file().open('r', encoding='utf-8') as f:
+                    interface = json.load(f).get(system)
+            except (OSError, ValueError, AttributeError):
+                interface = None
+        if interface and interface_present(system, interface):
+            _interface_cache[system] = interface
+            return interface
+        _interface_cache.pop(system, None)
+        return None
+
+
+def save_cached_interface(system, interface):
+    """Remember a discovered Wi-Fi interface in this process and on disk, or forget it when interface is None."""
+    with _interface_cache_lock:
+        if interface is None:
+            _interface_cache.pop(system, None)
+        else:
+            _interface_cache[system] = interface
+        cache_file = get_interface_cache_file()
+        try:
+            with cache_file.open('r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if not isinstance(cached, dict):
+                cached = {}
+        except (OSError, ValueError):
+            cached = {}
+        if cached.get(system) == interface:
+            return
+        if interface is None:
+            cached.pop(system, None)
+        else:
+            cached[system] = interface
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with cache_file.open('w', encoding='utf-8') as f:
+                json.dump(cached, f)
+        except OSError as e:
+            logger.debug(f"Could not write Wi-Fi interface cache {cache_file}: {e}")
+
+
+def probe_http_server(host, port=80, timeout=READINESS_PROBE_TIMEOUT):
+    """
+    Check once whether an HTTP server answers a HEAD request.
+
+    :param host: Host name or address of the server.
+    :param port: TCP port of the server.
+    :param timeout: Seconds allowed for connecting and reading the status line.
+    :return: True if the server replied with an HTTP status line.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.sendall(f'HEAD / HTTP/1.0\r\nHost: {host}\r\n\r\n'.encode('ascii'))
+            return sock.recv(5) == b'HTTP/'
+    except OSError:
+        return False
+
+
+def poll_until(condition, deadline, is_running=None):
+    """
+    Poll a condition, backing off exponentially between checks, until it holds.
+
+    :param condition: Function returning True once the awaited state is reached.
+    :param deadline: time.monotonic() value after which polling gives up.
+    :param is_running: Optional function to check if the process should continue running.
+    :return: True if the condition held before the deadline, False on timeout or cancellation.
+    """
+    interval = READINESS_POLL_INITIAL
+    while True:
+        if condition():
+            return True
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or (is_running is not None and not is_running()):
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, READINESS_POLL_MAX)
+
+
+def wait_for_http_server(host, port=80, timeout=READINESS_TIMEOUT, is_running=None):
+    """
+    Poll an HTTP server until it answers, backing off exponentially between probes.
+
+    :param host: Host name or address of the server.
+    :param port: TCP port of the server.
+    :param timeout: Seconds to keep polling.
+    :param is_running: Optional function to check if the process should continue running.
+    :return: Seconds until the server answered, or None on timeout or cancellation.
+    """
+    started = time.monotonic()
+    if poll_until(lambda: probe_http_server(host, port), started + timeout, is_running):
+        return time.monotonic() - started
+    return None
+
+
+def linux_link_ready(interface):
+    """
+    Check that a Linux interface is up and has an IPv4 address.
+
+    The link state is read from /sys/class/net and the address is queried with an
+    ioctl, so polling does not start a subprocess.
+    """
+    try:
+        operstate = (SYS_CLASS_NET / interface / 'operstate').read_text().strip()
+    except OSError:
+        return False
+    if operstate not in ('up', 'unknown'):
+        return False
+    if fcntl is None:
+        return True
+    request = struct.pack('256s', interface[:15].encode())
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+    except OSError:
+        return False
+    return True
+
+
 class ConnectionManager:
     def __init__(self):
         self.connection_lock = threading.Lock()
@@ -19,19 +211,31 @@ class ConnectionManager:
         self.windows_profile_name = None
         self.windows_host_route = None
         self.linux_profile_name = None
+        self.keep_linux_profile = False
+        self.ready_time = None
+        self.timings = NULL_TIMINGS
 
     def find_wifi_interface(self):
+        cached = load_cached_interface(self.system)
+        if cached:
+            logger.debug(f"Using cached Wi-Fi interface {cached} on {self.system}.")
+            self.interface = cached
+            return True
+
         logger.debug(f"Finding Wi-Fi interface on {self.system}.")
         try:
             if self.system == 'Darwin':  # macOS
-                return self._find_wifi_interface_macos()
+                found = self._find_wifi_interface_macos()
             elif self.system == 'Windows':
-                return self._find_wifi_interface_windows()
+                found = self._find_wifi_interface_windows()
             else:  # Linux
-                return self._find_wifi_interface_linux()
+                found = self._find_wifi_interface_linux()
         except Exception as e:
             logger.exception(f"Exception during Wi-Fi interface lookup: {e}")
             return False
+        if found:
+            save_cached_interface(self.system, self.interface)
+        return found
 
     def _find_wifi_interface_macos(self):
         """Find Wi-Fi interface on macOS."""
@@ -131,76 +335,103 @@ class ConnectionManager:
         return False
 
     def _find_wifi_interface_linux(self):
-        """Find Wi-Fi interface on Linux."""
+        """
+        Find Wi-Fi interface on Linux.
+
+        NetworkManager, iwconfig and ip are queried at the same time. Their answers are
+        taken in that order of preference, so a later probe only matters when the
+        preferred ones found nothing.
+        """
+        probes = [
+            self._linux_interface_from_nmcli,
+            self._linux_interface_from_iwconfig,
+            self._linux_interface_from_ip,
+        ]
+        executor = ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix='ezShareWifiLookup')
         try:
-            # Prefer NetworkManager because the connect path uses nmcli.
-            try:
-                result = subprocess.run(
-                    ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE", "device", "status"],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    for line in result.stdout.splitlines():
-                        parts = line.split(":")
-                        if len(parts) >= 2 and parts[1] == "wifi":
-                            self.interface = parts[0]
-                            logger.info(f"Wi-Fi interface found: {self.interface}")
-                            return True
-            except FileNotFoundError:
-                logger.debug("nmcli not found while looking up Linux Wi-Fi interface.")
+            futures = [executor.submit(probe) for probe in probes]
+            for future in futures:
+                try:
+                    interface = future.result()
+                except Exception as e:
+                    logger.debug(f"Linux Wi-Fi interface probe failed: {e}")
+                    continue
+                if interface:
+                    self.interface = interface
+                    logger.info(f"Wi-Fi interface found: {self.interface}")
+                    return True
+        finally:
+            # Slower probes are not waited for once a preferred one has answered.
+            executor.shutdown(wait=False)
 
-            # Try to find wireless interface using iwconfig.
-            result = subprocess.run(
-                ["bash", "-c", "iwconfig 2>/dev/null | awk '/IEEE 802.11/ {print $1; exit}'"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                self.interface = result.stdout.strip()
-                logger.info(f"Wi-Fi interface found: {self.interface}")
-                return True
-            
-            # Fallback: try ip command
+        logger.error("Wi-Fi interface not found on Linux.")
+        return False
+
+    @staticmethod
+    def _linux_interface_from_nmcli():
+        # Preferred because the connect path uses nmcli.
+        try:
             result = subprocess.run(
-                ["bash", "-c", "ip link show | grep -E 'wl[a-z0-9]+' | awk '{print $2}' | tr -d ':' | head -1"],
+                ["nmcli", "-t", "-f", "DEVICE,TYPE,STATE", "device", "status"],
                 capture_output=True,
                 text=True,
                 timeout=5
             )
-            if result.returncode == 0 and result.stdout.strip():
-                self.interface = result.stdout.strip()
-                logger.info(f"Wi-Fi interface found: {self.interface}")
-                return True
-            
-            logger.error("Wi-Fi interface not found on Linux.")
-            return False
-        except Exception as e:
-            logger.exception(f"Error finding Linux Wi-Fi interface: {e}")
-            return False
+        except FileNotFoundError:
+            logger.debug("nmcli not found while looking up Linux Wi-Fi interface.")
+            return None
+        if result.returncode == 0:
+            for line in result.stdout.splitlines():
+                parts = line.split(":")
+                if len(parts) >= 2 and parts[1] == "wifi":
+                    return parts[0]
+        return None
+
+    @staticmethod
+    def _linux_interface_from_iwconfig():
+        result = subprocess.run(
+            ["bash", "-c", "iwconfig 2>/dev/null | awk '/IEEE 802.11/ {print $1; exit}'"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
+
+    @staticmethod
+    def _linux_interface_from_ip():
+        result = subprocess.run(
+            ["bash", "-c", "ip link show | grep -E 'wl[a-z0-9]+' | awk '{print $2}' | tr -d ':' | head -1"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        return result.stdout.strip() if result.returncode == 0 else None
 
     def connect(self, ssid, psk, target_host="192.168.4.1"):
         with self.connection_lock:
             logger.debug(f"Starting Wi-Fi connection process on {self.system}: SSID={ssid}")
-            if not self.interface and not self.find_wifi_interface():
+            with self.timings.phase('interface'):
+                found = bool(self.interface) or self.find_wifi_interface()
+            if not found:
                 logger.error("No Wi-Fi interface found. Cannot connect to Wi-Fi.")
                 raise RuntimeError("Failed to find a Wi-Fi interface for connection.")
 
             try:
-                if self.system == 'Darwin':  # macOS
-                    self._connect_macos(ssid, psk)
-                elif self.system == 'Windows':
-                    self._connect_windows(ssid, psk)
-                    self._ensure_windows_host_route(target_host)
-                else:  # Linux
-                    self._connect_linux(ssid, psk)
+                with self.timings.phase('associate'):
+                    if self.system == 'Darwin':  # macOS
+                        self._connect_macos(ssid, psk)
+                    elif self.system == 'Windows':
+                        self._connect_windows(ssid, psk)
+                        self._ensure_windows_host_route(target_host)
+                    else:  # Linux
+                        self._connect_linux(ssid, psk)
                 
                 logger.info(f"Wi-Fi connected successfully to SSID={ssid} on interface={self.interface}.")
                 self.connected = True
             except Exception as e:
                 logger.exception(f"Exception during Wi-Fi connection: {e}")
+                # The cached interface may be stale; the next run looks it up again.
+                save_cached_interface(self.system, None)
                 raise RuntimeError(f"Wi-Fi connection failed: {e}")
 
     def _connect_macos(self, ssid, psk):
@@ -398,8 +629,29 @@ if ($route) {{
         self.windows_host_route = None
 
     def _connect_linux(self, ssid, psk):
-        """Connect to Wi-Fi on Linux using NetworkManager."""
+        """
+        Connect to Wi-Fi on Linux using NetworkManager.
+
+        With keep_linux_profile set, an existing ezShareCPAP profile whose interface, SSID
+        and PSK match is brought up directly instead of being recreated.
+        """
         profile_name = f"ezShareCPAP-{ssid}"
+        if self.keep_linux_profile and self._linux_profile_matches(profile_name, ssid, psk):
+            try:
+                result = subprocess.run(
+                    ["nmcli", "con", "up", profile_name],
+                    capture_output=True,
+                    text=True,
+                    timeout=15
+                )
+            except FileNotFoundError:
+                raise RuntimeError("nmcli not found. Please install NetworkManager (sudo apt install network-manager on Debian/Ubuntu)")
+            if result.returncode == 0:
+                logger.debug(f"Reused NetworkManager profile {profile_name}.")
+                self.linux_profile_name = profile_name
+                return
+            logger.warning(f"Could not bring up saved profile {profile_name}, recreating it: {self._command_error(result)}")
+
         profile_added = False
         try:
             self._delete_linux_profile(profile_name)
@@ -471,6 +723,27 @@ if ($route) {{
                 self._delete_linux_profile(profile_name)
             raise RuntimeError(f"Linux Wi-Fi connection failed: {e}")
 
+    def _linux_profile_matches(self, profile_name, ssid, psk):
+        """Check whether a saved NetworkManager profile has the interface, SSID and PSK of this connection."""
+        try:
+            result = subprocess.run(
+                [
+                    "nmcli", "--show-secrets", "-g",
+                    "connection.interface-name,802-11-wireless.ssid,802-11-wireless-security.psk",
+                    "con", "show", profile_name,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=15
+            )
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.debug(f"Could not read NetworkManager profile {profile_name}: {e}")
+            return False
+        if result.returncode != 0:
+            return False
+        values = [value.replace("\\:", ":").replace("\\\\", "\\") for value in result.stdout.splitlines()]
+        return values == [self.interface or "", ssid, psk or ""]
+
     def disconnect(self, ssid):
         with self.connection_lock:
             logger.debug(f"Attempting to disconnect from Wi-Fi SSID={ssid} on {self.system}")
@@ -479,12 +752,13 @@ if ($route) {{
                 return False
 
             try:
-                if self.system == 'Darwin':  # macOS
-                    self._disconnect_macos(ssid)
-                elif self.system == 'Windows':
-                    self._disconnect_windows(ssid)
-                else:  # Linux
-                    self._disconnect_linux(ssid)
+                with self.timings.phase('disconnect'):
+                    if self.system == 'Darwin':  # macOS
+                        self._disconnect_macos(ssid)
+                    elif self.system == 'Windows':
+                        self._disconnect_windows(ssid)
+                    else:  # Linux
+                        self._disconnect_linux(ssid)
                 
                 logger.info(f"Wi-Fi disconnected successfully from SSID={ssid} on interface={self.interface}.")
                 self.connected = False
@@ -503,14 +777,17 @@ if ($route) {{
         if self._networksetup_failed(result):
             raise RuntimeError(f"macOS Wi-Fi power-off failed: {self._command_error(result)}")
 
-        time.sleep(1)
+        deadline = time.monotonic() + POWER_CHANGE_TIMEOUT
+        if not poll_until(lambda: self._macos_power_state() in ('off', None), deadline):
+            logger.warning(f"macOS did not report Wi-Fi power off on {self.interface}; turning it on anyway.")
 
         turn_on_command = ["networksetup", "-setairportpower", self.interface, "on"]
         result = subprocess.run(turn_on_command, capture_output=True, text=True, timeout=10)
         if self._networksetup_failed(result):
             raise RuntimeError(f"macOS Wi-Fi power-on failed: {self._command_error(result)}")
 
-        time.sleep(2)
+        if not poll_until(lambda: self._macos_power_state() in ('on', None), deadline):
+            logger.warning(f"macOS did not report Wi-Fi power on for {self.interface}.")
 
         if ssid and self._macos_current_ssid() == ssid:
             raise RuntimeError(f"macOS Wi-Fi is still connected to SSID '{ssid}' after disconnect.")
@@ -528,6 +805,19 @@ if ($route) {{
                 f"Could not remove macOS preferred Wi-Fi network '{ssid}': {self._command_error(result)}"
             )
 
+    def _macos_power_state(self):
+        """Get 'on' or 'off' from networksetup, or None if the power state could not be read."""
+        result = subprocess.run(
+            ["networksetup", "-getairportpower", self.interface],
+            capture_output=True,
+            text=True,
+            timeout=10
+        )
+        if self._networksetup_failed(result):
+            return None
+        state = result.stdout.strip().rsplit(':', 1)[-1].strip().lower()
+        return state if state in ('on', 'off') else None
+
     def _macos_current_ssid(self):
         result = subprocess.run(
             ["networksetup", "-getairportnetwork", self.interface],
@@ -577,13 +867,12 @@ if ($route) {{
         return result.returncode != 0 or "AuthorizationCreate() failed" in output
 
     def _disconnect_linux(self, ssid):
-        """Disconnect Wi-Fi on Linux."""
+        """Disconnect Wi-Fi on Linux. The profile is kept for the next run when keep_linux_profile is set."""
         profile_name = self.linux_profile_name or f"ezShareCPAP-{ssid}"
-        commands = [
-            ["nmcli", "con", "down", "id", profile_name],
-            ["nmcli", "con", "delete", "id", profile_name],
-            ["nmcli", "dev", "disconnect", self.interface],
-        ]
+        commands = [["nmcli", "con", "down", "id", profile_name]]
+        if not self.keep_linux_profile:
+            commands.append(["nmcli", "con", "delete", "id", profile_name])
+        commands.append(["nmcli", "dev", "disconnect", self.interface])
         for command in commands:
             try:
                 result = subprocess.run(
@@ -593,7 +882,7 @@ if ($route) {{
                     timeout=10
                 )
                 if result.returncode == 0:
-                    if command[1:3] == ["con", "delete"]:
+                    if command[1:3] == ["con", "delete"] or (self.keep_linux_profile and command[1:3] == ["con", "down"]):
                         self.linux_profile_name = None
                         return
             except FileNotFoundError:
@@ -615,35 +904,48 @@ if ($route) {{
         except Exception as e:
             logger.debug(f"Could not delete Linux Wi-Fi profile '{profile_name}': {e}")
 
-    def verify_connection(self, max_attempts=10):
-        logger.debug(f"Verifying Wi-Fi connection on {self.system} by pinging 192.168.4.1.")
-        attempt_count = 0
-        while attempt_count < max_attempts:
-            # Wait briefly before each attempt
-            time.sleep(1)
-            try:
-                if self.system == 'Windows':
-                    ping_command = ["ping", "-n", "2", "192.168.4.1"]
-                else:  # macOS and Linux
-                    ping_command = ["ping", "-c", "2", "192.168.4.1"]
-                
-                result = subprocess.run(ping_command, capture_output=True, text=True, timeout=5)
-
-                if result.returncode == 0:
-                    logger.info(f"Ping successful on interface {self.interface}. Connection verified.")
-                    return True
-                else:
-                    logger.warning(f"Ping failed (attempt {attempt_count + 1}/{max_attempts}): {result.stderr}")
-                    attempt_count += 1
-                    continue
-            except subprocess.TimeoutExpired:
-                logger.warning(f"Ping timed out (attempt {attempt_count + 1}/{max_attempts}).")
-                attempt_count += 1
-                continue
-            except Exception as e:
-                logger.warning(f"Ping failed with exception (attempt {attempt_count + 1}/{max_attempts}): {e}")
-                attempt_count += 1
-                continue
+    def link_ready(self):
+        """
+        Check that the Wi-Fi interface has an address on the joined network.
 
-        logger.error(f"Failed to verify connection after {max_attempts} attempts.")
-        return False
+        Windows adapters are not checked; the web server probe covers them.
+        """
+        if not self.interface or self.system == 'Windows':
+            return True
+        if self.system == 'Darwin':
+            result = subprocess.run(
+                ["ipconfig", "getifaddr", self.interface], capture_output=True, text=True, timeout=5
+            )
+            return result.returncode == 0 and bool(result.stdout.strip())
+        return linux_link_ready(self.interface)
+
+    def verify_connection(self, target_host="192.168.4.1", port=80, timeout=READINESS_TIMEOUT, is_running=None):
+        """
+        Wait until the interface has an address and the ez Share web server answers.
+
+        Both waits share one deadline and poll with exponential backoff, so the call
+        returns as soon as the card is reachable.
+
+        :param target_host: Address of the ez Share web server.
+        :param port: TCP port of the web server.
+        :param timeout: Seconds allowed for the whole wait.
+        :param is_running: Optional function to check if the process should continue running.
+        :return: True once the web server answered.
+        """
+        logger.debug(f"Verifying Wi-Fi connection on {self.system} by probing http://{target_host}:{port}/.")
+        started = time.monotonic()
+        deadline = started + timeout
+        self.ready_time = None
+        with self.timings.phase('address'):
+            linked = poll_until(self.link_ready, deadline, is_running)
+        if not linked:
+            logger.error(f"Wi-Fi interface {self.interface} did not get an address within {timeout} seconds.")
+            return False
+        with self.timings.phase('server'):
+            answered = wait_for_http_server(target_host, port, max(0, deadline - time.monotonic()), is_running)
+        if answered is None:
+            logger.error(f"ez Share web server at {target_host}:{port} did not answer within {timeout} seconds.")
+            return False
+        self.ready_time = time.monotonic() - started
+        logger.info(f"ez Share web server answered after {self.ready_time:.2f} seconds. Connection verified.")
+        return True
@@ -27,6 +27,8 @@ class EzShareWorker(threading.Thread):
         logging.debug(f"{self.name} updating progress: {value}")
         if value == 'no_files':
             self.queue.put(('no_files',))
+        elif value == 'priority_complete':
+            self.queue.put(('priority_complete',))
         else:
             self.queue.put(('progress', min(max(0, value), 100)))
 